@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+
+"""A small parser for the BEL terms listed as cross-references in CONSO.
+
+It only covers what's needed to validate terms like ``p(HGNC:MAPT, frag(569_591))``: checking that functions
+are known and parentheses are balanced, and extracting the namespace/identifier pairs so they can be looked up
+in the local namespaces in the ``external/`` directory.
+
+Parse results are kept in a :class:`ParseCache`, keyed by a hash of the expression, that's saved next to the
+indexes in ``external/.index/`` so that later runs only parse the expressions that are new.
+"""
+
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
+
+from .external import INDEX_DIRECTORY
+from .resources import EXTERNAL_DIRECTORY
+
+__all__ = [
+    'BELSyntaxError',
+    'BEL_FUNCTIONS',
+    'PARSER_VERSION',
+    'ParseCache',
+    'parse_bel',
+]
+
+#: Changes whenever the results of :func:`parse_bel` might change, so saved results are thrown out
+PARSER_VERSION = 2
+CACHE_PATH = os.path.join(INDEX_DIRECTORY, 'bel.json')
+
+#: Functions from BEL 1.0 and 2.0, in both their short and long forms
+BEL_FUNCTIONS = {
+    'a', 'abundance',
+    'act', 'activity',
+    'bp', 'biologicalProcess',
+    'cat', 'catalyticActivity',
+    'chap', 'chaperoneActivity',
+    'complex', 'complexAbundance',
+    'composite', 'compositeAbundance',
+    'deg', 'degradation',
+    'frag', 'fragment',
+    'fromLoc',
+    'fus', 'fusion',
+    'g', 'geneAbundance',
+    'gmod', 'geneModification',
+    'gtp', 'gtpBoundActivity',
+    'kin', 'kinaseActivity',
+    'list',
+    'loc', 'location',
+    'm', 'microRNAAbundance',
+    'ma', 'molecularActivity',
+    'path', 'pathology',
+    'pep', 'peptidaseActivity',
+    'phos', 'phosphataseActivity',
+    'p', 'proteinAbundance',
+    'pmod', 'proteinModification',
+    'pop', 'populationAbundance',
+    'products',
+    'r', 'rnaAbundance',
+    'reactants',
+    'ribo', 'ribosylationActivity',
+    'rxn', 'reaction',
+    'sec', 'cellSecretion',
+    'sub', 'substitution',
+    'surf', 'cellSurfaceExpression',
+    'tloc', 'translocation',
+    'toLoc',
+    'tport', 'transportActivity',
+    'trunc', 'truncation',
+    'tscript', 'transcriptionalActivity',
+    'var', 'variant',
+}
+
+TOKEN = re.compile(r'\s*(?:(?P<string>"(?:[^"\\]|\\.)*")|(?P<word>[\w.\-?*+/\[\]\']+)|(?P<punctuation>[(),:]))')
+
+
+class BELSyntaxError(ValueError):
+    """Raised when a BEL term can't be parsed."""
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    rv = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = TOKEN.match(expression, position)
+        if match is None:
+            raise BELSyntaxError(f'unexpected character at position {position}: {expression}')
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'string':
+            value = value[1:-1].replace('\\"', '"')
+        rv.append((kind, value))
+        position = match.end()
+    return rv
+
+
+@lru_cache(maxsize=None)
+def parse_bel(expression: str) -> Tuple[Tuple[str, str], ...]:
+    """Parse a BEL term and return its namespace/identifier pairs.
+
+    Results are cached on the expression, since the same terms show up many times. To keep the results
+    between runs, use a :class:`ParseCache`.
+
+    :raises BELSyntaxError: if the expression isn't a single, well-formed BEL term
+
+    >>> parse_bel('p(HGNC:MAPT, frag(569_591))')
+    (('HGNC', 'MAPT'),)
+    >>> parse_bel('complex(p(HGNC:CHRNA3), p(HGNC:CHRNB4))')
+    (('HGNC', 'CHRNA3'), ('HGNC', 'CHRNB4'))
+    >>> parse_bel('a(CHEBI:CHEBI:1)')
+    (('CHEBI', 'CHEBI:1'),)
+    """
+    tokens = _tokenize(expression)
+    pairs: List[Tuple[str, str]] = []
+    position = _parse_term(expression, tokens, 0, pairs)
+    if position != len(tokens):
+        raise BELSyntaxError(f'unexpected content after the term: {expression}')
+    return tuple(pairs)
+
+
+def _peek(tokens, position: int) -> Tuple[str, str]:
+    if position < len(tokens):
+        return tokens[position]
+    return '', ''
+
+
+def _parse_term(expression: str, tokens, position: int, pairs: List[Tuple[str, str]]) -> int:
+    kind, function = _peek(tokens, position)
+    if kind != 'word' or _peek(tokens, position + 1) != ('punctuation', '('):
+        raise BELSyntaxError(f'expected a function at token {position}: {expression}')
+    if function not in BEL_FUNCTIONS:
+        raise BELSyntaxError(f'unknown function {function}: {expression}')
+    position += 2
+
+    if _peek(tokens, position) == ('punctuation', ')'):
+        return position + 1
+
+    while True:
+        position = _parse_argument(expression, tokens, position, pairs)
+        kind, value = _peek(tokens, position)
+        if (kind, value) == ('punctuation', ')'):
+            return position + 1
+        if (kind, value) != ('punctuation', ','):
+            raise BELSyntaxError(f'unbalanced parentheses: {expression}')
+        position += 1
+
+
+def _parse_argument(expression: str, tokens, position: int, pairs: List[Tuple[str, str]]) -> int:
+    kind, value = _peek(tokens, position)
+    next_token = _peek(tokens, position + 1)
+    if kind == 'word' and next_token == ('punctuation', '('):
+        return _parse_term(expression, tokens, position, pairs)
+    if kind == 'word' and next_token == ('punctuation', ':'):
+        identifier_kind, identifier = _peek(tokens, position + 2)
+        if identifier_kind not in {'word', 'string'}:
+            raise BELSyntaxError(f'missing identifier for namespace {value}: {expression}')
+        position += 3
+        # identifiers can have colons in them, like in CHEBI:CHEBI:1
+        while _peek(tokens, position) == ('punctuation', ':') and _peek(tokens, position + 1)[0] == 'word':
+            identifier = f'{identifier}:{_peek(tokens, position + 1)[1]}'
+            position += 2
+        pairs.append((value, identifier))
+        return position
+    if kind in {'word', 'string'}:
+        return position + 1
+    raise BELSyntaxError(f'unexpected token at {position}: {expression}')
+
+
+class ParseCache:
+    """The results of :func:`parse_bel`, saved between runs and keyed by a hash of the expression."""
+
+    def __init__(self, path: Optional[str] = None):
+        """Load the saved results.
+
+        :param path: The path of the cache. Defaults to :data:`CACHE_PATH` if the ``external/`` directory
+            exists, otherwise nothing is saved.
+        """
+        if path is None and os.path.isdir(EXTERNAL_DIRECTORY):
+            path = CACHE_PATH
+        self.path = path
+        #: A mapping from the hashes of expressions to either their pairs or the message of their syntax error
+        self.results: Dict[str, Union[List[List[str]], str]] = {}
+        self.changed = False
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                data = json.load(file)
+            if data.get('version') == PARSER_VERSION:
+                self.results = data['results']
+
+    def parse(self, expression: str) -> Tuple[Tuple[str, str], ...]:
+        """Parse a BEL term with :func:`parse_bel`, unless it's been parsed before.
+
+        :raises BELSyntaxError: if the expression isn't a single, well-formed BEL term
+        """
+        key = hashlib.blake2b(expression.encode('utf-8'), digest_size=16).hexdigest()
+        result = self.results.get(key)
+        if result is None:
+            try:
+                result = [list(pair) for pair in parse_bel(expression)]
+            except BELSyntaxError as e:
+                result = str(e)
+            self.results[key] = result
+            self.changed = True
+        if isinstance(result, str):
+            raise BELSyntaxError(result)
+        return tuple((namespace, identifier) for namespace, identifier in result)
+
+    def save(self) -> None:
+        """Save the results if there are new ones."""
+        if self.path is None or not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            with open(temporary_path, 'w') as file:
+                json.dump({'version': PARSER_VERSION, 'results': self.results}, file, sort_keys=True)
+            os.replace(temporary_path, self.path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        self.changed = False
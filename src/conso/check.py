@@ -2,30 +2,23 @@
 
 """A script to check the sanctity of the CONSO resources."""
 
-import csv
-import re
+import os
 import sys
 from collections import defaultdict
-from typing import Iterable, Mapping, Optional, Set, Tuple
+from typing import Iterable, List, Mapping, Optional, Set, Tuple, Union
 
 import click
-import pandas as pd
 
-from .resources import AUTHORS_PATH, CLASSES_PATH, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, XREFS_PATH
-
-CONSO = 'CONSO'
-CONSO_IDENTIFIER = re.compile(r'^CONSO(?P<number>\d{5})$')
-IDENTIFIER_COLUMN = 0
-CURATOR_COLUMN = 1
-WITHDRAWN_COLUMN = 2
-NAME_COLUMN = 2
-TYPE_COLUMN = 3
-REFERENCES_COLUMN = 4
-DESCRIPTION_COLUMN = 5
-NUMBER_TERM_COLUMNS = 6
-
-VALID_SOURCES = {'pmc', 'pubmed', 'doi', 'pubchem.compound', 'ncit'}
-VALID_SYNONYM_TYPES = {'EXACT', 'BROAD', 'NARROW', 'RELATED', '?'}
+from .resolve import strip_prefix
+from .resources import (
+    AUTHORS_PATH, CLASSES_PATH, EXTERNAL_DIRECTORY, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, XREFS_PATH,
+)
+from .resources.constants import (  # noqa: F401
+    CONSO, CONSO_IDENTIFIER, CURATOR_COLUMN, DESCRIPTION_COLUMN, IDENTIFIER_COLUMN, NAME_COLUMN, NUMBER_SYNONYM_COLUMNS,
+    NUMBER_TERM_COLUMNS, REFERENCES_COLUMN, TYPE_COLUMN, VALID_SOURCES, VALID_SYNONYM_TYPES, WITHDRAWN_COLUMN,
+)
+from .utils import Tables, get_lines, get_rows
+from .validate import Table, get_synonym_messages, get_term_messages, read_table, validate_synonyms, validate_terms
 
 
 def is_ascii(s: str) -> bool:
@@ -37,124 +30,46 @@ def get_identifier_to_name(
     *,
     classes: Set[str],
     authors: Mapping[str, Tuple[str, str]],
+    table: Optional[Table] = None,
 ) -> Mapping[str, str]:
-    """Generate a mapping from terms' identifiers to their names."""
-    with open(TERMS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        return dict(_get_terms_helper(reader, classes, authors))
-
-
-def _get_terms_helper(
-    reader,
-    classes: Set[str],
-    authors: Mapping[str, Tuple[str, str]],
-) -> Iterable[Tuple[str, str]]:
-    errors = 0
-
-    def _print_fail(s):
-        nonlocal errors
-        errors += 1
-        print(s)
-
-    for i, line in enumerate(reader, start=2):
-        if not line:
-            continue
-
-        if line[-1].endswith('\t') or line[-1].endswith(' '):
-            _print_fail(f'{TERMS_PATH}: Trailing whitespace on line {i}')
-
-        for column_number, column in enumerate(line, start=1):
-            if column != column.strip():
-                _print_fail(f'{TERMS_PATH}, line {i}, column {column_number}: Extra white space: {column}')
-
-        identifier = line[IDENTIFIER_COLUMN]
-        match = CONSO_IDENTIFIER.match(identifier)
-
-        if match is None:
-            _print_fail(f'{TERMS_PATH}, line {i}: Invalid identifier chosen: {line}')
-            continue
-
-        current_number = int(match.groups()[0])
-        if i - 1 != current_number:  # current_number <= last_number:
-            _print_fail(f'{TERMS_PATH}, line {i}: Indexing scheme broken: {identifier}')
-            continue
-
-        if i > 346 and not is_ascii(line[NAME_COLUMN]):  # introduced later
-            _print_fail(f'{TERMS_PATH}, line {i}: Name contains non-ascii: {line[NAME_COLUMN]}')
-
-        if line[CURATOR_COLUMN] not in authors:
-            _print_fail(f'{TERMS_PATH}, line {i}: Invalid curator: {line[CURATOR_COLUMN]}')
-
-        if len(line) < NUMBER_TERM_COLUMNS:
-            _print_fail(
-                f'{TERMS_PATH}, line {i}: Not enough fields (only found {len(line)}/{NUMBER_TERM_COLUMNS}): {line}')
-            continue
-
-        if len(line) > NUMBER_TERM_COLUMNS:
-            _print_fail(f'{TERMS_PATH}, line {i}: Too many fields '
-                        f'(found {len(line)}/{NUMBER_TERM_COLUMNS}) on line {i}: {line}')
-            continue
-
-        if line[WITHDRAWN_COLUMN] == 'WITHDRAWN':
-            print(f'note: {identifier} was withdrawn')
-            if not all(entry == '.' for entry in line[WITHDRAWN_COLUMN + 1:]):
-                _print_fail(f'{TERMS_PATH}: Wrong formatting for withdrawn term line {i}: '
-                            f'Use periods as placeholders.')
-            continue
+    """Generate a mapping from terms' identifiers to their names.
 
-        if any(not column for column in line):
-            _print_fail(f'{TERMS_PATH}, line {i}: Missing entries: {line}')
-            continue
+    The rules are applied column-wise by :func:`conso.validate.validate_terms`.
 
-        if line[TYPE_COLUMN] not in classes:
-            _print_fail(f'{TERMS_PATH}, line {i}: Invalid class: {line[TYPE_COLUMN]}.')
-            continue
+    :param table: The terms table, if it was already read
+    """
+    if table is None:
+        table = read_table(TERMS_PATH)
+    results = validate_terms(table, classes=classes, authors=authors, valid_sources=VALID_SOURCES)
 
-        references = line[REFERENCES_COLUMN].split(',')
-        references_split = [reference.strip().split(':') for reference in references]
+    for i in sorted({*results['withdrawn'], *results['malformed_withdrawn']}):
+        print(f'note: {table.fields.at[i, IDENTIFIER_COLUMN]} was withdrawn')
 
-        if not all(len(reference) == 2 for reference in references_split):
-            _print_fail(f'{TERMS_PATH}, line {i}: problematic references: {references_split}')
-            continue
-
-        if any(len(x) != 2 for x in references_split):
-            _print_fail(f'{TERMS_PATH}, line {i}: missing reference {references_split}')
-            continue
-
-        if any(source not in VALID_SOURCES for source, reference in references_split):
-            _print_fail(
-                f'{TERMS_PATH}, line {i} : invalid reference type '
-                f'(note: always use lowercase pubmed, pmc, etc.): {references_split}',
-            )
-            continue
-
-        if '"' in line[DESCRIPTION_COLUMN]:
-            _print_fail(f'{TERMS_PATH}, line {i}: can not use double quote in description column')
-            continue
-
-        yield identifier, line[NAME_COLUMN]
-
-    if errors:
-        print(f'Found {errors} errors. Exiting with code: 1')  # noqa:T001
+    messages = get_term_messages(table, results)
+    for _, message in messages:
+        print(message)
+    if messages:
+        print(f'Found {len(messages)} errors. Exiting with code: 1')  # noqa:T001
         sys.exit(1)
 
+    valid = table.fields.loc[results['valid']]
+    return dict(zip(valid[IDENTIFIER_COLUMN], valid[NAME_COLUMN]))
+
 
-def get_types() -> Set[str]:
+def get_types(tables: Optional[Tables] = None) -> Set[str]:
     """Get the set of all types used in CONSO."""
-    with open(CLASSES_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        return {
-            line[0]
-            for line in _get_types_helper(reader)
-        }
+    return {
+        line[0]
+        for line in _get_types_helper(iter(get_rows(tables, 'classes', CLASSES_PATH)))
+    }
 
 
-def get_authors() -> Mapping[str, Tuple[str, str]]:
+def get_authors(tables: Optional[Tables] = None) -> Mapping[str, Tuple[str, str]]:
     """Get the mapping from curator names to ORCID identifiers."""
-    authors_df = pd.read_csv(AUTHORS_PATH, sep='\t')
-    return dict(authors_df[['ORCID', 'Name']].values)
+    return {
+        orcid: name
+        for orcid, name, *_ in get_rows(tables, 'authors', AUTHORS_PATH)
+    }
 
 
 def _get_types_helper(lines: Iterable[Tuple[str, ...]]):
@@ -172,17 +87,14 @@ def _get_types_helper(lines: Iterable[Tuple[str, ...]]):
         last_line = line
 
 
-def check_xrefs_file(*, identifier_to_name: Mapping[str, str]):
+def check_xrefs_file(*, identifier_to_name: Mapping[str, str], tables: Optional[Tables] = None):
     """Validate the cross-references file."""
-    with open(XREFS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        yield from _check_xrefs_file_helper(reader, identifier_to_name)
+    return list(_check_xrefs_file_helper(get_lines(tables, 'xrefs', XREFS_PATH), identifier_to_name))
 
 
-def _check_xrefs_file_helper(reader, identifier_to_name: Mapping[str, str]):
+def _check_xrefs_file_helper(lines, identifier_to_name: Mapping[str, str]):
     current_identifier = 0
-    for i, line in enumerate(reader, start=2):
+    for i, line in lines:
         if len(line) != 3:
             raise Exception(f'{XREFS_PATH}: Not the right number fields (found {len(line)}) on line {i}: {line}')
 
@@ -202,53 +114,119 @@ def _check_xrefs_file_helper(reader, identifier_to_name: Mapping[str, str]):
         yield line
 
 
-def check_synonyms_file(*, identifier_to_name: Mapping[str, str]):
-    """Validate the synonyms file."""
-    with open(SYNONYMS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        return list(_check_synonyms_helper(reader, identifier_to_name))
-
-
-def _check_synonyms_helper(reader, identifier_to_name: Mapping[str, str]):
-    current_identifier = 0
-    for i, line in enumerate(reader, start=2):
-        if line[-1].rstrip() != line[-1]:
-            raise Exception(f'{SYNONYMS_PATH}: Trailing whitespace on line {i}')
-
-        if len(line) != 4:
-            raise Exception(f'{SYNONYMS_PATH}: Not the right number fields (found {len(line)}) on line {i}: {line}')
-
-        if any(not column for column in line):
-            raise Exception(f'{SYNONYMS_PATH}: Missing entries on line {i}: {line}')
+def check_xrefs_external(tables: Optional[Tables] = None) -> None:
+    """Check that cross-references exist in the corresponding namespaces in the ``external/`` directory."""
+    from .external import contains, get_index, get_namespace_path
 
-        term = line[0]
+    if not os.path.isdir(EXTERNAL_DIRECTORY):
+        return
 
-        if term not in identifier_to_name:
-            raise Exception(f'{SYNONYMS_PATH}: Invalid identifier on line {i}: {term}')
-
-        new_identifier = int(CONSO_IDENTIFIER.match(term).groups()[0])
-        if new_identifier < current_identifier:
-            raise Exception(f'{SYNONYMS_PATH}: Not monotonic increasing on line {i}: {term}')
-        current_identifier = new_identifier
-
-        specificity = line[3]
-        if specificity not in VALID_SYNONYM_TYPES:
-            raise Exception(f'{SYNONYMS_PATH}: Invalid specificity on line {i}: {specificity}')
-
-        yield line
+    db_map = defaultdict(list)
+    for conso_id, db, db_id in get_rows(tables, 'xrefs', XREFS_PATH):
+        db_map[db].append((conso_id, db_id))
 
+    for db, entries in sorted(db_map.items()):
+        path = get_namespace_path(db)
+        if path is None:
+            continue
+        index = get_index(path)
+        found = contains(index, (db_id for _, db_id in entries))
+        # some namespaces don't repeat the prefix in their identifiers (e.g., CHEBI:1234 is listed as 1234)
+        found |= contains(index, (strip_prefix(db, db_id) for _, db_id in entries))
+
+        missing = [entry for entry, is_found in zip(entries, found) if not is_found]
+        if missing:
+            ratio = f'{len(missing)}/{len(entries)}'
+            n_spacers = 39 + len(ratio) + len(db)
+            print('', '#' * n_spacers, f'# xrefs to {db} missing from namespace ({ratio}) #', '#' * n_spacers, sep='\n')
+            for conso_id, db_id in missing:
+                print(conso_id, db, db_id, sep='\t')
+
+
+def check_bel_xrefs(tables: Optional[Tables] = None) -> None:
+    """Check that BEL cross-references are well-formed and only use identifiers in the external namespaces."""
+    from .bel import BELSyntaxError, ParseCache
+    from .external import contains, get_index, get_namespace_path
+
+    cache = ParseCache()
+    malformed = []
+    dangling = []
+    for i, (conso_id, db, db_id) in get_lines(tables, 'xrefs', XREFS_PATH):
+        if db.lower() != 'bel':
+            continue
+        try:
+            pairs = cache.parse(db_id)
+        except BELSyntaxError as e:
+            malformed.append((i, e))
+            continue
 
-def check_relations_file(*, identifier_to_name: Mapping[str, str]):
+        for namespace, identifier in pairs:
+            paths = [
+                path
+                for path in (get_namespace_path(namespace, names=True), get_namespace_path(namespace))
+                if path is not None
+            ]
+            if paths and not any(contains(get_index(path), [identifier])[0] for path in paths):
+                dangling.append((conso_id, namespace, identifier, db_id))
+    cache.save()
+
+    if dangling:
+        s = 35 + len(str(len(dangling)))
+        print('', '#' * s, f'# BEL with dangling references ({len(dangling)}) #', '#' * s, sep='\n')
+        for entry in dangling:
+            print(*entry, sep='\t')
+
+    for i, e in malformed:
+        print(f'{XREFS_PATH}: Malformed BEL on line {i}: {e}')
+    if malformed:
+        raise Exception(f'{XREFS_PATH}: Found {len(malformed)} malformed BEL terms')
+
+
+def check_synonyms_file(
+    *,
+    identifier_to_name: Mapping[str, str],
+    table: Optional[Table] = None,
+) -> List[List[str]]:
+    """Validate the synonyms file.
+
+    The rules are applied column-wise by :func:`conso.validate.validate_synonyms`.
+
+    :param table: The synonyms table, if it was already read
+    """
+    if table is None:
+        table = read_table(SYNONYMS_PATH)
+    results = validate_synonyms(table, identifiers=identifier_to_name, valid_synonym_types=VALID_SYNONYM_TYPES)
+    messages = get_synonym_messages(table, results)
+    if messages:
+        raise Exception('\n'.join(message for _, message in messages))
+    return table.fields[list(range(NUMBER_SYNONYM_COLUMNS))].values.tolist()
+
+
+def check_synonym_collisions(tables: Optional[Tables] = None) -> None:
+    """Report names and synonyms that normalize to the same label as another term's."""
+    from .labels import get_label_index
+
+    collisions = get_label_index(tables).get_collisions()
+    if not collisions:
+        return
+
+    n_name = sum(collision.has_name for collision in collisions)
+    title = f'# Labels shared by more than one term ({len(collisions)}, {n_name} with a name) #'
+    print('', '#' * len(title), title, '#' * len(title), sep='\n')
+    for key, labels in collisions:
+        print(key)
+        for identifier, label, specificity in labels:
+            print('', identifier, label, specificity, sep='\t')
+
+
+def check_relations_file(*, identifier_to_name: Mapping[str, str], tables: Optional[Tables] = None):
     """Validate the relations file."""
-    with open(RELATIONS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        return list(_check_relations_file_helper(RELATIONS_PATH, reader, identifier_to_name))
+    lines = get_lines(tables, 'relations', RELATIONS_PATH)
+    return list(_check_relations_file_helper(RELATIONS_PATH, lines, identifier_to_name))
 
 
-def _check_relations_file_helper(path, reader, identifier_to_name: Mapping[str, str]) -> Tuple[str, ...]:
-    for i, line in enumerate(reader, start=2):
+def _check_relations_file_helper(path, lines, identifier_to_name: Mapping[str, str]) -> Tuple[str, ...]:
+    for i, line in lines:
         if len(line) != 7:
             raise Exception(f'{path}: Not the right number fields (found {len(line)}) on line {i}: {line}')
 
@@ -268,137 +246,102 @@ def _check_relations_file_helper(path, reader, identifier_to_name: Mapping[str,
         yield line
 
 
-def check_class_has_xref(cls, xrefs) -> None:
-    """Check that members of a given class have certain cross-references."""
-    with open(TERMS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        entries = {
-            conso_id: (CONSO, conso_id, name)
-            for conso_id, curator, name, _cls, refs, definition in reader
-            if _cls == cls
-        }
+def check_relations_graph(tables: Optional[Tables] = None) -> None:
+    """Check the relations for cycles, self-loops, duplicate edges, and edges to withdrawn terms."""
+    from .graph import get_graph_problems
+
+    problems = get_graph_problems(tables)
+    if not problems:
+        return
+
+    for relation, cycle in problems.cycles:
+        print(f'{RELATIONS_PATH}: Cycle in {relation}:', ' -> '.join(f'{ns}:{i}' for ns, i in (*cycle, cycle[0])))
+    for i, line in problems.self_loops:
+        print(f'{RELATIONS_PATH}: Self-loop on line {i}: {line}')
+    for i, first, line in problems.duplicates:
+        print(f'{RELATIONS_PATH}: Duplicate of line {first} on line {i}: {line}')
+    for i, line in problems.withdrawn:
+        print(f'{RELATIONS_PATH}: Relation with withdrawn term on line {i}: {line}')
+
+    n_problems = sum(map(len, problems))
+    raise Exception(f'{RELATIONS_PATH}: Found {n_problems} problems in the relation graph')
+
+
+def _print_violations(rule, n_members: int, violations) -> None:
+    missing = [violation for violation in violations if violation.count < rule.minimum]
+    extra = [
+        violation
+        for violation in violations
+        if rule.maximum is not None and violation.count > rule.maximum
+    ]
+    if missing:
+        title = f'# {rule.cls} missing {rule.kind} to {rule.label} ({len(missing)}/{n_members}) #'
+        print('', '#' * len(title), title, '#' * len(title), sep='\n')
+        for identifier, name, _ in sorted(missing):
+            if rule.kind == 'xref':
+                print(identifier, name, rule.targets[0], '?', sep='\t')
+            else:
+                print(CONSO, identifier, name, rule.targets[0], rule.target_namespace or '?', '?', '?', sep='\t')
+    if extra:
+        title = f'# {rule.cls} with more than {rule.maximum} {rule.kind} to {rule.label} ({len(extra)}/{n_members}) #'
+        print('', '#' * len(title), title, '#' * len(title), sep='\n')
+        for identifier, name, count in sorted(extra):
+            print(identifier, name, count, sep='\t')
+
+
+def _check_rules(rules, tables: Optional[Tables] = None) -> None:
+    from .rules import RuleIndex, get_violations
+
+    for rule, n_members, violations in get_violations(rules, RuleIndex.from_resources(tables)):
+        _print_violations(rule, n_members, violations)
+
+
+def check_rules(tables: Optional[Tables] = None) -> None:
+    """Check the class-level completeness rules in ``rules.tsv``."""
+    from .rules import get_rules
 
-    db_map = defaultdict(dict)
-    with open(XREFS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        for conso_id, db, db_id in reader:
-            if db_id in {'?', '', 'N/A', 'n/a'}:
-                continue
+    _check_rules(get_rules(tables=tables), tables)
 
-            db_map[db][conso_id] = db_id
+
+def check_class_has_xref(cls: str, xrefs: Union[str, Iterable[str]]) -> None:
+    """Check that members of a given class have certain cross-references.
+
+    .. deprecated:: Add a rule to ``rules.tsv`` and use :func:`check_rules` instead.
+    """
+    from .rules import Rule
 
     if isinstance(xrefs, str):
         xrefs = [xrefs]
-    for xref in xrefs:
-        _check_missing_xref(cls, entries, db_map, xref)
-
-
-def check_class_has_relation(
-    cls: str,
-    relation: str,
-    object_namespace: Optional[str] = None,
-) -> None:
-    """Check that members of the given class have a given relation with a cardinality of 1."""
-    with open(TERMS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        entries = {
-            (CONSO, conso_id, name)
-            for conso_id, curator, name, cls_, refs, definition in reader
-            if cls_ == cls
-        }
-
-    with open(RELATIONS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-
-        rd = defaultdict(lambda: defaultdict(list))
-        for source_ns, source_id, source_name, rel, target_ns, target_id, target_name in reader:
-            rd[rel][source_ns, source_id, source_name].append((target_ns, target_id, target_name))
-
-    missing_role = {
-        entry
-        for entry in entries
-        if entry not in rd[relation]
-    }
-    if missing_role:
-        s = 29 + len(relation) + len(cls)
-        print('', '#' * s, f'# {cls} missing relation {relation} ({len(missing_role)}/{len(entries)}) #', '#' * s,
-              sep='\n')
-        for entry in sorted(missing_role):
-            print(*entry, relation, object_namespace or '?', '?', '?', sep='\t')
-
-
-def check_chemical_roles():
-    """Check that all chemicals have at least one role."""
-    with open(TERMS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        chemicals = {
-            (CONSO, conso_id, name)
-            for conso_id, curator, name, cls, refs, definition in reader
-            if cls == 'chemical'
-        }
-
-    with open(RELATIONS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-
-        roles = defaultdict(list)
-        inhibitors = defaultdict(list)
-        agonists = defaultdict(list)
-        antagonists = defaultdict(list)
-        for source_ns, source_id, source_name, rel, target_ns, target_id, target_name in reader:
-            if rel == 'has_role':
-                roles[source_ns, source_id, source_name].append((target_ns, target_id, target_name))
-            elif rel == 'inhibitor_of':
-                inhibitors[source_ns, source_id, source_name].append((target_ns, target_id, target_name))
-            elif rel == 'agonist_of':
-                agonists[source_ns, source_id, source_name].append((target_ns, target_id, target_name))
-            elif rel == 'antagonist_of':
-                antagonists[source_ns, source_id, source_name].append((target_ns, target_id, target_name))
-
-    missing_role = {
-        chemical
-        for chemical in chemicals
-        if all(chemical not in d for d in (roles, inhibitors, agonists, antagonists))
-    }
-    if missing_role:
-        print('', '#' * 25, f'# Missing roles ({len(missing_role)}/{len(chemicals)}) #', '#' * 25, sep='\n')
-        for chemical in sorted(missing_role):
-            print(f'{":".join(chemical[1:])}')
+    _check_rules([Rule(cls=cls, kind='xref', targets=(xref,)) for xref in xrefs])
+
+
+def check_class_has_relation(cls: str, relation: str, object_namespace: Optional[str] = None) -> None:
+    """Check that members of the given class have a given relation.
+
+    .. deprecated:: Add a rule to ``rules.tsv`` and use :func:`check_rules` instead.
+    """
+    from .rules import Rule
+
+    _check_rules([Rule(cls=cls, kind='relation', targets=(relation,), target_namespace=object_namespace)])
+
+
+def check_chemical_roles() -> None:
+    """Check that all chemicals have at least one role.
+
+    .. deprecated:: Use :func:`check_rules` instead.
+    """
+    from .rules import Rule
+
+    targets = ('has_role', 'agonist_of', 'antagonist_of', 'inhibitor_of')
+    _check_rules([Rule(cls='chemical', kind='relation', targets=targets)])
 
 
 def check_chemical_structures() -> None:
-    """Check that all chemicals have an InChI and SMILES structure."""
-    xrefs = [
-        'inchi',
-        'smiles',
-        # 'chebi',
-        # 'cas',
-    ]
-    check_class_has_xref('chemical', xrefs)
-
-
-def _check_missing_xref(
-    cls: str,
-    entries: Mapping[str, Tuple[str, str, str]],
-    db_map: Mapping[str, Mapping[str, str]],
-    db: str,
-) -> None:
-    missing_entries = {
-        entry
-        for entry in entries
-        if entry not in db_map[db]
-    }
-    if missing_entries:
-        ratio = f'{len(missing_entries)}/{len(entries)}'
-        n_spacers = 24 + len(ratio) + len(db) + len(cls)
-        print('', '#' * n_spacers, f'# {cls} missing xref to {db} ({ratio}) #', '#' * n_spacers, sep='\n')
-        for entry in sorted(missing_entries):
-            print(*entries[entry][1:], db, '?', sep='\t')
+    """Check that all chemicals have an InChI and SMILES structure.
+
+    .. deprecated:: Use :func:`check_rules` instead.
+    """
+    check_class_has_xref('chemical', ['inchi', 'smiles'])
 
 
 @click.command()
@@ -409,15 +352,14 @@ def check():
     identifier_to_name = get_identifier_to_name(classes=classes, authors=authors)
 
     check_synonyms_file(identifier_to_name=identifier_to_name)
+    check_synonym_collisions()
     check_xrefs_file(identifier_to_name=identifier_to_name)
+    check_relations_graph()
     check_relations_file(identifier_to_name=identifier_to_name)
+    check_xrefs_external()
+    check_bel_xrefs()
 
-    check_class_has_xref('isoform', 'uniprot.isoform')
-    check_class_has_relation('isoform', 'has_reference_protein', object_namespace='uniprot')
-    check_class_has_relation('protein isoform family', 'has_reference_protein', object_namespace='uniprot')
-    check_chemical_structures()
-    check_chemical_roles()
-    check_class_has_relation('antibody', 'has_antibody_target')
+    check_rules()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""Similarity search over the chemical structures in CONSO.
+
+Each chemical's SMILES cross-reference is turned into a Morgan fingerprint with RDKit and stored as a row
+of a bit-packed NumPy matrix. Tanimoto similarities against the whole matrix are computed at once with a
+popcount lookup table, so there's no per-pair Python loop.
+"""
+
+import csv
+from typing import Iterable, List, Mapping, Optional, Tuple
+
+import click
+import numpy as np
+
+from .resources import TERMS_PATH, XREFS_PATH
+
+__all__ = [
+    'ChemicalIndex',
+    'get_smiles',
+    'similar',
+]
+
+#: The number of bits in each fingerprint
+N_BITS = 2048
+#: The radius of the Morgan fingerprints
+RADIUS = 2
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+
+def get_smiles() -> Mapping[str, str]:
+    """Get a mapping from CONSO identifiers to SMILES strings."""
+    with open(XREFS_PATH) as file:
+        reader = csv.reader(file, delimiter='\t')
+        _ = next(reader)  # skip the header
+        return {
+            conso_id: db_id
+            for conso_id, db, db_id in reader
+            if db == 'smiles'
+        }
+
+
+def _popcount(packed: np.ndarray) -> np.ndarray:
+    """Count the set bits in each row of a packed bit matrix."""
+    return _POPCOUNT[packed].sum(axis=-1, dtype=np.uint32)
+
+
+def get_fingerprint(smiles: str) -> Optional[np.ndarray]:
+    """Get a packed Morgan fingerprint for a SMILES string, or None if RDKit can't parse it."""
+    from rdkit import Chem, RDLogger
+    from rdkit.Chem import rdFingerprintGenerator
+
+    RDLogger.DisableLog('rdApp.*')
+    molecule = Chem.MolFromSmiles(smiles)
+    if molecule is None:
+        return None
+    generator = rdFingerprintGenerator.GetMorganGenerator(radius=RADIUS, fpSize=N_BITS)
+    return np.packbits(generator.GetFingerprintAsNumPy(molecule).astype(bool))
+
+
+class ChemicalIndex:
+    """A bit-packed matrix of chemical fingerprints, one row per CONSO term."""
+
+    def __init__(self, identifiers: List[str], fingerprints: np.ndarray):
+        """Initialize the index.
+
+        :param identifiers: The CONSO identifiers, in the same order as the rows of the matrix
+        :param fingerprints: A matrix of packed fingerprints with shape (len(identifiers), N_BITS / 8)
+        """
+        self.identifiers = identifiers
+        self.fingerprints = fingerprints
+        self.counts = _popcount(fingerprints)
+        self._identifier_to_row = {identifier: i for i, identifier in enumerate(identifiers)}
+
+    @classmethod
+    def from_smiles(cls, smiles: Mapping[str, str]) -> 'ChemicalIndex':
+        """Build an index from a mapping of CONSO identifiers to SMILES, skipping ones that don't parse."""
+        identifiers, fingerprints = [], []
+        for identifier, value in sorted(smiles.items()):
+            fingerprint = get_fingerprint(value)
+            if fingerprint is None:
+                continue
+            identifiers.append(identifier)
+            fingerprints.append(fingerprint)
+        return cls(identifiers, np.array(fingerprints, dtype=np.uint8).reshape(len(identifiers), N_BITS // 8))
+
+    @classmethod
+    def from_resources(cls) -> 'ChemicalIndex':
+        """Build an index from the SMILES cross-references in CONSO."""
+        return cls.from_smiles(get_smiles())
+
+    def save(self, path: str) -> None:
+        """Save the index as a NumPy archive."""
+        np.savez_compressed(path, identifiers=np.array(self.identifiers), fingerprints=self.fingerprints)
+
+    @classmethod
+    def load(cls, path: str) -> 'ChemicalIndex':
+        """Load an index saved with :meth:`save`."""
+        with np.load(path) as archive:
+            return cls(archive['identifiers'].tolist(), archive['fingerprints'])
+
+    def get_fingerprint(self, query: str) -> np.ndarray:
+        """Get the fingerprint for a CONSO identifier in the index or for a SMILES string."""
+        if query in self._identifier_to_row:
+            return self.fingerprints[self._identifier_to_row[query]]
+        fingerprint = get_fingerprint(query)
+        if fingerprint is None:
+            raise ValueError(f'not a CONSO chemical or valid SMILES: {query}')
+        return fingerprint
+
+    def tanimoto(self, fingerprint: np.ndarray) -> np.ndarray:
+        """Calculate the Tanimoto similarity of the given packed fingerprint to every row."""
+        intersection = _popcount(self.fingerprints & fingerprint)
+        union = self.counts + _popcount(fingerprint) - intersection
+        return np.divide(intersection, union, out=np.zeros(len(union)), where=union > 0)
+
+    def nearest(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Get the k most similar chemicals to the query, excluding the query itself."""
+        similarities = self.tanimoto(self.get_fingerprint(query))
+        if query in self._identifier_to_row:
+            similarities[self._identifier_to_row[query]] = -1.0
+        k = min(k, len(similarities))
+        top = np.argpartition(-similarities, k - 1)[:k] if k else np.zeros(0, dtype=int)
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        return [
+            (self.identifiers[i], float(similarities[i]))
+            for i in top
+            if similarities[i] >= 0
+        ]
+
+    def above(self, query: str, threshold: float) -> List[Tuple[str, float]]:
+        """Get all chemicals whose similarity to the query is at least the threshold, excluding the query."""
+        similarities = self.tanimoto(self.get_fingerprint(query))
+        if query in self._identifier_to_row:
+            similarities[self._identifier_to_row[query]] = -1.0
+        hits = np.flatnonzero(similarities >= threshold)
+        hits = hits[np.argsort(-similarities[hits], kind='stable')]
+        return [(self.identifiers[i], float(similarities[i])) for i in hits]
+
+    def pairs(self, threshold: float, block_size: int = 1024) -> Iterable[Tuple[str, str, float]]:
+        """Iterate over all pairs of chemicals with at least the given similarity, for near-duplicate detection.
+
+        The all-by-all intersection counts are calculated block by block with a matrix multiplication over
+        the unpacked fingerprints, so memory stays bounded by the block size.
+        """
+        bits = np.unpackbits(self.fingerprints, axis=1).astype(np.float32)
+        counts = self.counts.astype(np.float32)
+        for start in range(0, len(bits), block_size):
+            block = bits[start:start + block_size]
+            intersection = block @ bits.T
+            union = counts[start:start + block_size, None] + counts[None, :] - intersection
+            similarities = np.divide(intersection, union, out=np.zeros_like(union), where=union > 0)
+            rows, columns = np.nonzero(similarities >= threshold)
+            rows += start
+            for row, column in zip(rows, columns):
+                if row < column:
+                    yield self.identifiers[row], self.identifiers[column], float(similarities[row - start, column])
+
+
+def _get_names() -> Mapping[str, str]:
+    with open(TERMS_PATH) as file:
+        reader = csv.reader(file, delimiter='\t')
+        _ = next(reader)  # skip the header
+        return {line[0]: line[2] for line in reader}
+
+
+@click.command()
+@click.argument('query', required=False)
+@click.option('-k', '--top', type=click.IntRange(min=1), default=5, show_default=True, help='Number of nearest neighbors to show')
+@click.option('-t', '--threshold', type=float, help='Show all chemicals with at least this similarity')
+@click.option('--duplicates', is_flag=True, help='Show all pairs of chemicals above the threshold (default: 0.9)')
+def similar(query: Optional[str], top: int, threshold: Optional[float], duplicates: bool):
+    """Find chemicals similar to a CONSO identifier or SMILES string."""
+    index = ChemicalIndex.from_resources()
+    names = _get_names()
+
+    if duplicates:
+        for left, right, similarity in index.pairs(0.9 if threshold is None else threshold):
+            click.echo(f'{left}\t{names.get(left, "")}\t{right}\t{names.get(right, "")}\t{similarity:.3f}')
+        return
+
+    if query is None:
+        raise click.UsageError('give a query or use --duplicates')
+
+    try:
+        results = index.nearest(query, k=top) if threshold is None else index.above(query, threshold)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='QUERY')
+    for identifier, similarity in results:
+        click.echo(f'{identifier}\t{names.get(identifier, "")}\t{similarity:.3f}')
+
+
+if __name__ == '__main__':
+    similar()
@@ -5,9 +5,16 @@
 import click
 
 from .check import check
+from .chemistry import similar
+from .closure import closure
+from .dedupe import dedupe
+from .diff import diff
 from .enrich import enrich
 from .export.cli import export
+from .importer import import_
+from .resolve import resolve
 from .sort_table import sort
+from .watch import watch
 
 
 @click.group()
@@ -19,6 +26,13 @@ main.add_command(check)
 main.add_command(sort)
 main.add_command(export)
 main.add_command(enrich)
+main.add_command(similar)
+main.add_command(diff)
+main.add_command(resolve)
+main.add_command(import_)
+main.add_command(closure)
+main.add_command(dedupe)
+main.add_command(watch)
 
 if __name__ == '__main__':
     main()
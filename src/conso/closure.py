@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+"""Infer cross-references from the closure of the equivalences between identifiers.
+
+Each CONSO term is equivalent to the identifiers it cross-references in ``xrefs.tsv``, and further equivalences
+between external identifiers can be given as mapping files. All of them are unioned into a disjoint-set
+structure, so the clusters of equivalent identifiers are found in near-linear time instead of by comparing
+pairs of cross-references. A cluster that contains more than one CONSO term means that those terms are
+probably duplicates (or that one of their cross-references is wrong), and in a cluster with a single CONSO
+term, every identifier it doesn't already cross-reference directly is a proposed cross-reference.
+
+Databases whose entries aren't identifiers, like BEL terms and URLs, aren't treated as equivalences.
+Identifiers are normalized the same way as in :mod:`conso.resolve`, and withdrawn terms are skipped.
+"""
+
+from collections import defaultdict
+from typing import Dict, Generic, Hashable, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, TypeVar
+
+import click
+
+from .resolve import Key, normalize_xref
+from .resources import TERMS_PATH, XREFS_PATH
+from .resources.constants import CONSO
+from .utils import iterate_rows
+
+__all__ = [
+    'NON_EQUIVALENCE_DATABASES',
+    'DisjointSet',
+    'Cluster',
+    'Proposal',
+    'XrefClosure',
+    'get_xref_closure',
+    'closure',
+]
+
+
+#: The (lowercase) databases in ``xrefs.tsv`` whose entries don't identify the same entity as the term
+NON_EQUIVALENCE_DATABASES = {'bel', 'url', 'iupac', 'database'}
+
+X = TypeVar('X', bound=Hashable)
+
+
+class DisjointSet(Generic[X]):
+    """A union-find structure with union by size and path halving.
+
+    >>> disjoint_set = DisjointSet()
+    >>> disjoint_set.union(1, 2)
+    >>> disjoint_set.union(3, 4)
+    >>> disjoint_set.union(2, 4)
+    >>> disjoint_set.add(5)
+    >>> sorted(sorted(component) for component in disjoint_set.get_components())
+    [[1, 2, 3, 4], [5]]
+    """
+
+    def __init__(self):  # noqa: D107
+        self.parents: Dict[X, X] = {}
+        self.sizes: Dict[X, int] = {}
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.parents)
+
+    def add(self, element: X) -> None:
+        """Add an element in its own set, unless it's already there."""
+        if element not in self.parents:
+            self.parents[element] = element
+            self.sizes[element] = 1
+
+    def find(self, element: X) -> X:
+        """Get the representative of the set containing the element."""
+        parents = self.parents
+        while parents[element] != element:
+            parents[element] = parents[parents[element]]
+            element = parents[element]
+        return element
+
+    def union(self, a: X, b: X) -> None:
+        """Merge the sets containing the two elements, adding them if necessary."""
+        self.add(a)
+        self.add(b)
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return
+        if self.sizes[a] < self.sizes[b]:
+            a, b = b, a
+        self.parents[b] = a
+        self.sizes[a] += self.sizes.pop(b)
+
+    def get_components(self) -> List[List[X]]:
+        """Get the elements of each set."""
+        components = defaultdict(list)
+        for element in self.parents:
+            components[self.find(element)].append(element)
+        return list(components.values())
+
+
+class Cluster(NamedTuple):
+    """A set of equivalent identifiers containing more than one CONSO term."""
+
+    #: The CONSO identifiers in the cluster
+    identifiers: List[str]
+    #: The external ``(database, identifier)`` pairs in the cluster
+    keys: List[Key]
+
+
+class Proposal(NamedTuple):
+    """A cross-reference implied by the closure, in the same order as the columns of ``xrefs.tsv``."""
+
+    identifier: str
+    database: str
+    database_identifier: str
+
+
+class XrefClosure:
+    """The clusters of equivalent CONSO and external identifiers."""
+
+    def __init__(self, names: Mapping[str, str]):
+        """Start with the CONSO terms in their own clusters.
+
+        :param names: A mapping from the identifiers of the (non-withdrawn) CONSO terms to their names
+        """
+        self.names = names
+        self.disjoint_set: DisjointSet[Key] = DisjointSet()
+        for identifier in names:
+            self.disjoint_set.add((CONSO, identifier))
+        #: The external identifiers that each term cross-references directly
+        self.xrefs: Dict[str, Set[Key]] = defaultdict(set)
+        #: The first spelling of the database and identifier seen for each normalized key
+        self.labels: Dict[Key, Key] = {}
+
+    def _add_key(self, database: str, identifier: str) -> Key:
+        key = normalize_xref(database, identifier)
+        self.labels.setdefault(key, (database.strip(), identifier.strip()))
+        return key
+
+    def add_xref(self, identifier: str, database: str, database_identifier: str) -> None:
+        """Add the equivalence between a CONSO term and an external identifier."""
+        if identifier not in self.names or database.strip().lower() in NON_EQUIVALENCE_DATABASES:
+            return
+        key = self._add_key(database, database_identifier)
+        self.xrefs[identifier].add(key)
+        self.disjoint_set.union((CONSO, identifier), key)
+
+    def add_mapping(self, subject: str, object: str) -> bool:  # noqa: A002
+        """Add the equivalence between two CURIEs.
+
+        CONSO CURIEs for withdrawn or unknown terms are skipped.
+
+        :returns: If the mapping was added
+        """
+        keys = []
+        for curie in (subject, object):
+            database, delimiter, identifier = curie.strip().partition(':')
+            if database.lower() == 'conso':
+                if identifier not in self.names:
+                    return False
+                keys.append((CONSO, identifier))
+            elif not delimiter or not database or not identifier:
+                return False
+            else:
+                keys.append(self._add_key(database, identifier))
+        self.disjoint_set.union(*keys)
+        return True
+
+    @classmethod
+    def from_resources(cls, mapping_paths: Optional[Sequence[str]] = None) -> 'XrefClosure':
+        """Build the closure from ``terms.tsv``, ``xrefs.tsv``, and optionally some mapping files.
+
+        :param mapping_paths: Tab-separated files with a header, whose first two columns are equivalent CURIEs
+        """
+        names = {}
+        for line in iterate_rows(TERMS_PATH):
+            if line[2] != 'WITHDRAWN':
+                names[line[0]] = line[2]
+
+        rv = cls(names)
+        for identifier, database, database_identifier in iterate_rows(XREFS_PATH):
+            rv.add_xref(identifier, database, database_identifier)
+        for path in mapping_paths or []:
+            for line in iterate_rows(path):
+                rv.add_mapping(line[0], line[1])
+        return rv
+
+    def _get_components(self) -> Iterable[List[Key]]:
+        for component in self.disjoint_set.get_components():
+            if len(component) > 1:
+                yield component
+
+    def get_clusters(self) -> List[Cluster]:
+        """Get the clusters that contain more than one CONSO term, sorted by their first identifier."""
+        rv = []
+        for component in self._get_components():
+            identifiers = sorted(identifier for database, identifier in component if database == CONSO)
+            if len(identifiers) > 1:
+                keys = sorted(key for key in component if key[0] != CONSO)
+                rv.append(Cluster(identifiers, keys))
+        return sorted(rv)
+
+    def get_proposals(self) -> List[Proposal]:
+        """Get the cross-references implied for the CONSO terms that are alone in their cluster."""
+        rv = []
+        for component in self._get_components():
+            identifiers = [identifier for database, identifier in component if database == CONSO]
+            if len(identifiers) != 1:
+                continue
+            identifier = identifiers[0]
+            xrefs = self.xrefs[identifier]
+            rv.extend(
+                Proposal(identifier, *self.labels[key])
+                for key in component
+                if key[0] != CONSO and key not in xrefs
+            )
+        return sorted(rv)
+
+
+def get_xref_closure(mapping_paths: Optional[Sequence[str]] = None) -> XrefClosure:
+    """Build the cross-reference closure from the resources and the given mapping files."""
+    return XrefClosure.from_resources(mapping_paths=mapping_paths)
+
+
+@click.command()
+@click.option('-m', '--mappings', type=click.Path(exists=True, dir_okay=False), multiple=True,
+              help='A TSV with a header whose first two columns are equivalent CURIEs. Can be given several times.')
+def closure(mappings: Sequence[str]):
+    """Find terms merged by the closure of the xrefs and propose the xrefs it implies."""
+    xref_closure = get_xref_closure(mapping_paths=mappings)
+
+    clusters = xref_closure.get_clusters()
+    if clusters:
+        title = f'# Clusters with more than one term ({len(clusters)}) #'
+        click.echo('\n'.join(('#' * len(title), title, '#' * len(title))))
+        for identifiers, keys in clusters:
+            for identifier in identifiers:
+                click.echo(f'{identifier}\t{xref_closure.names[identifier]}')
+            for key in keys:
+                click.echo('\t{}:{}'.format(*xref_closure.labels[key]))
+
+    proposals = xref_closure.get_proposals()
+    if proposals:
+        title = f'# Implied xrefs ({len(proposals)}) #'
+        click.echo('\n'.join(('', '#' * len(title), title, '#' * len(title))))
+        for proposal in proposals:
+            click.echo('\t'.join(proposal))
+
+
+if __name__ == '__main__':
+    closure()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+
+"""Find terms that are probably duplicates of each other.
+
+Each term's name, synonyms, and description are turned into a row of a sparse TF-IDF matrix with SciPy,
+using the words as well as the character trigrams of the words in the name and synonyms, so names that
+differ by a few characters still overlap. Features that appear in more than a tenth of the terms are dropped,
+which keeps the products sparse, unless they only appear in two terms, so small sets of terms keep their
+features. Features that only appear in one term are dropped once the rows are normalized, since they can't
+contribute to any similarity.
+
+The cosine similarities between the terms of each type are calculated a block of rows at a time with a
+sparse matrix multiplication, and only the ``k`` most similar terms above the threshold are kept for each
+row, so neither the similarity matrix nor the pairs are ever held in memory all at once.
+"""
+
+import csv
+import re
+from collections import Counter, defaultdict
+from typing import Iterable, List, Mapping, NamedTuple, Optional, Sequence
+
+import click
+import numpy as np
+
+from .resources import SYNONYMS_PATH, TERMS_PATH
+
+__all__ = [
+    'Document',
+    'Candidate',
+    'TermMatrix',
+    'tokenize',
+    'get_documents',
+    'dedupe',
+]
+
+WORD = re.compile(r'[a-z0-9]+')
+#: The number of characters in the character n-grams of the names and synonyms
+NGRAM_SIZE = 3
+#: Features that appear in at most this many terms are kept regardless of the maximum document frequency
+MIN_MAX_DF_DOCUMENTS = 2
+
+
+class Document(NamedTuple):
+    """The text of a term that's compared to other terms."""
+
+    identifier: str
+    name: str
+    type: str
+    synonyms: Sequence[str]
+    description: str
+
+
+class Candidate(NamedTuple):
+    """A pair of terms of the same type that might be duplicates."""
+
+    type: str
+    similarity: float
+    identifier: str
+    other_identifier: str
+
+
+def tokenize(document: Document) -> List[str]:
+    """Get the words of a term and the character trigrams of the words in its name and synonyms.
+
+    >>> tokenize(Document('CONSO00001', 'Tau', 'protein', [], 'tau'))
+    ['tau', '#ta', '#tau', '#au', 'tau']
+    """
+    rv = []
+    for label in (document.name, *document.synonyms):
+        for word in WORD.findall(label.lower()):
+            rv.append(word)
+            padded = f' {word} '
+            rv.extend(
+                '#' + padded[i:i + NGRAM_SIZE].strip()
+                for i in range(len(padded) - NGRAM_SIZE + 1)
+            )
+    rv.extend(WORD.findall(document.description.lower()))
+    return rv
+
+
+def get_documents() -> List[Document]:
+    """Get the names, types, synonyms, and descriptions of the terms that aren't withdrawn."""
+    synonyms = defaultdict(list)
+    with open(SYNONYMS_PATH) as file:
+        reader = csv.reader(file, delimiter='\t', quoting=csv.QUOTE_NONE)
+        _ = next(reader)  # skip the header
+        for line in reader:
+            if line:
+                synonyms[line[0]].append(line[1])
+
+    with open(TERMS_PATH) as file:
+        reader = csv.reader(file, delimiter='\t', quoting=csv.QUOTE_NONE)
+        _ = next(reader)  # skip the header
+        return [
+            Document(line[0], line[2], line[3], synonyms.get(line[0], []), line[5])
+            for line in reader
+            if line and line[2] != 'WITHDRAWN'
+        ]
+
+
+class TermMatrix:
+    """A sparse, row-normalized TF-IDF matrix with one row per term."""
+
+    def __init__(self, documents: Sequence[Document], matrix):
+        """Initialize the matrix.
+
+        :param documents: The terms, in the same order as the rows of the matrix
+        :param matrix: A :class:`scipy.sparse.csr_matrix` with L2-normalized rows
+        """
+        self.documents = documents
+        self.matrix = matrix
+
+    @classmethod
+    def from_documents(cls, documents: Sequence[Document], max_df: float = 0.1) -> 'TermMatrix':
+        """Vectorize the terms.
+
+        :param documents: The terms to vectorize
+        :param max_df: Features that appear in more than this fraction of the terms are dropped, unless they
+            appear in at most :data:`MIN_MAX_DF_DOCUMENTS` terms
+        """
+        from scipy.sparse import csr_matrix
+
+        vocabulary = {}
+        indptr, indices, counts = [0], [], []
+        for document in documents:
+            for token, count in Counter(tokenize(document)).items():
+                indices.append(vocabulary.setdefault(token, len(vocabulary)))
+                counts.append(count)
+            indptr.append(len(indices))
+
+        indices = np.array(indices, dtype=np.int32)
+        counts = np.array(counts, dtype=np.float32)
+        n_documents = len(documents)
+        document_frequency = np.bincount(indices, minlength=len(vocabulary))
+        idf = np.log((1 + n_documents) / (1 + document_frequency)) + 1
+        data = (1 + np.log(counts)) * idf[indices]
+        data[document_frequency[indices] > max(max_df * n_documents, MIN_MAX_DF_DOCUMENTS)] = 0
+        matrix = csr_matrix((data.astype(np.float32), indices, np.array(indptr)), shape=(n_documents, len(vocabulary)))
+
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        matrix = csr_matrix(matrix.multiply(1 / norms[:, None]))
+        # Features in a single term are only needed for the norms
+        matrix.data[document_frequency[matrix.indices] < 2] = 0
+        matrix.eliminate_zeros()
+        return cls(documents, matrix)
+
+    @classmethod
+    def from_resources(cls) -> 'TermMatrix':
+        """Vectorize the terms in CONSO."""
+        return cls.from_documents(get_documents())
+
+    def get_candidates(
+        self,
+        threshold: float = 0.7,
+        top: int = 5,
+        block_size: int = 2048,
+        types: Optional[Iterable[str]] = None,
+    ) -> Mapping[str, List[Candidate]]:
+        """Find the most similar pairs of terms of each type.
+
+        :param threshold: The minimum cosine similarity of a pair
+        :param top: The maximum number of candidates kept for each term
+        :param block_size: The number of rows multiplied at a time
+        :param types: The types to check. Defaults to all of them.
+        :returns: A mapping from types to their candidates, sorted by decreasing similarity
+        """
+        rows_by_type = defaultdict(list)
+        for row, document in enumerate(self.documents):
+            rows_by_type[document.type].append(row)
+        if types is not None:
+            rows_by_type = {cls: rows_by_type[cls] for cls in types if cls in rows_by_type}
+
+        rv = {}
+        for cls, rows in sorted(rows_by_type.items()):
+            rows = np.array(rows)
+            matrix = self.matrix[rows]
+            candidates = []
+            for start in range(0, len(rows), block_size):
+                # Each pair is only kept once, from the side of the term that comes first, so the block only
+                # needs to be multiplied with the rows from its own start on
+                similarities = (matrix[start:start + block_size] @ matrix[start:].T).tocoo()
+                left, right = similarities.row + start, similarities.col + start
+                # Rounding in float32 can put the similarity of identical rows slightly above 1
+                data = np.minimum(similarities.data, 1.0)
+                mask = (right > left) & (data >= threshold)
+                left, right, data = left[mask], right[mask], data[mask]
+
+                order = np.lexsort((-data, left))
+                left, right, data = left[order], right[order], data[order]
+                rank = np.arange(len(left)) - np.searchsorted(left, left)
+                mask = rank < top
+                candidates.extend(
+                    Candidate(cls, float(similarity), self.documents[i].identifier, self.documents[j].identifier)
+                    for i, j, similarity in zip(rows[left[mask]], rows[right[mask]], data[mask])
+                )
+            rv[cls] = sorted(candidates, key=lambda candidate: -candidate.similarity)
+        return rv
+
+
+@click.command()
+@click.option('-t', '--threshold', type=float, default=0.7, show_default=True, help='Minimum cosine similarity')
+@click.option('-k', '--top', type=click.IntRange(min=1), default=5, show_default=True, help='Maximum number of candidates per term')
+@click.option('--type', 'types', multiple=True, help='Only check terms of this type. Can be given several times.')
+@click.option('--max-df', type=float, default=0.1, show_default=True,
+              help='Drop features that appear in more than this fraction of the terms')
+@click.option('--block-size', type=int, default=2048, show_default=True, help='Rows multiplied at a time')
+def dedupe(threshold: float, top: int, types: Sequence[str], max_df: float, block_size: int):
+    """Find candidate duplicate terms of the same type by the similarity of their text.
+
+    Outputs the type, the similarity, and the identifiers and names of each pair, ranked by similarity
+    within each type.
+    """
+    term_matrix = TermMatrix.from_documents(get_documents(), max_df=max_df)
+    names = {document.identifier: document.name for document in term_matrix.documents}
+    candidates = term_matrix.get_candidates(threshold=threshold, top=top, block_size=block_size, types=types or None)
+
+    for cls, cls_candidates in candidates.items():
+        for _, similarity, identifier, other_identifier in cls_candidates:
+            click.echo(f'{cls}\t{similarity:.3f}\t{identifier}\t{names[identifier]}\t'
+                       f'{other_identifier}\t{names[other_identifier]}')
+    n_candidates = sum(map(len, candidates.values()))
+    click.echo(f'found {n_candidates} candidates in {len(candidates)} types', err=True)
+
+
+if __name__ == '__main__':
+    dedupe()
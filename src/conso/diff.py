@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+"""Compare two versions of the CONSO resources.
+
+A version can be a directory (either the resources directory itself or a checkout of this repository) or
+a git revision. Rows are hashed into sets keyed on CONSO identifier, so the comparison is linear in the size
+of the resources. Besides a report, the differences can be written as patches for the BEL namespaces and
+the OBO export so downstream consumers don't need to reload the whole terminology.
+"""
+
+import csv
+import io
+import os
+import subprocess  # noqa: S404
+from collections import defaultdict
+from typing import Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+import click
+
+from .resources import HERE as RESOURCES_DIRECTORY
+from .resources.constants import CONSO
+
+__all__ = [
+    'Version',
+    'TableDiff',
+    'Diff',
+    'get_version',
+    'get_diff',
+    'write_belns_patch',
+    'write_obo_patch',
+    'diff',
+]
+
+RESOURCES_SUBDIRECTORY = os.path.join('src', 'conso', 'resources')
+TABLES = ['authors', 'classes', 'typedefs', 'terms', 'synonyms', 'xrefs', 'relations']
+
+Row = Tuple[str, ...]
+
+
+class Version(NamedTuple):
+    """The contents of one version of the resources."""
+
+    #: A mapping from classes to their BEL encodings
+    classes: Mapping[str, str]
+    #: A mapping from CONSO identifiers to their rows in ``terms.tsv``
+    terms: Mapping[str, Row]
+    #: A mapping from CONSO identifiers to their rows in ``synonyms.tsv``
+    synonyms: Mapping[str, Set[Row]]
+    #: A mapping from CONSO identifiers to their rows in ``xrefs.tsv``
+    xrefs: Mapping[str, Set[Row]]
+    #: A mapping from CONSO identifiers to the rows in ``relations.tsv`` in which they're the source
+    #: (or the target, if the source isn't from CONSO)
+    relations: Mapping[str, Set[Row]]
+    #: The rows of each of the tables in :data:`TABLES`, in the order they appear in the files
+    rows: Mapping[str, List[Row]]
+
+    def is_live(self, identifier: str) -> bool:
+        """Check if the term exists and hasn't been withdrawn."""
+        return identifier in self.terms and self.terms[identifier][2] != 'WITHDRAWN'
+
+
+class TableDiff(NamedTuple):
+    """The rows that were added and removed from a table, keyed by CONSO identifier."""
+
+    added: Mapping[str, Set[Row]]
+    removed: Mapping[str, Set[Row]]
+
+    def __len__(self) -> int:  # noqa: D105
+        return sum(map(len, self.added.values())) + sum(map(len, self.removed.values()))
+
+
+class Diff(NamedTuple):
+    """The differences between two versions of the resources."""
+
+    old: Version
+    new: Version
+    #: Terms that are live in the new version and weren't in the old one
+    added: List[str]
+    #: Terms that were live in the old version and were withdrawn or removed in the new one
+    withdrawn: List[str]
+    #: Live terms in both versions whose row, synonyms, xrefs, or relations changed
+    changed: List[str]
+    synonyms: TableDiff
+    xrefs: TableDiff
+    relations: TableDiff
+
+
+def _read_rows(text: str) -> Iterable[Row]:
+    reader = csv.reader(io.StringIO(text), delimiter='\t', quoting=csv.QUOTE_NONE)
+    _ = next(reader, None)  # skip the header
+    for line in reader:
+        if line:
+            yield tuple(line)
+
+
+def _read_directory(directory: str) -> Mapping[str, str]:
+    if os.path.isdir(os.path.join(directory, RESOURCES_SUBDIRECTORY)):
+        directory = os.path.join(directory, RESOURCES_SUBDIRECTORY)
+    rv = {}
+    for table in TABLES:
+        with open(os.path.join(directory, f'{table}.tsv')) as file:
+            rv[table] = file.read()
+    return rv
+
+
+def _read_revision(revision: str) -> Mapping[str, str]:
+    try:
+        root = subprocess.run(  # noqa: S603,S607
+            ['git', 'rev-parse', '--show-toplevel'],
+            cwd=RESOURCES_DIRECTORY, capture_output=True, check=True, text=True,
+        ).stdout.strip()
+    except subprocess.CalledProcessError as e:
+        raise click.BadParameter(
+            f'{revision} is not a directory, and the resources are not in a git checkout: {e.stderr.strip()}',
+        ) from None
+
+    try:
+        return {
+            table: subprocess.run(  # noqa: S603,S607
+                ['git', 'show', f'{revision}:{RESOURCES_SUBDIRECTORY}/{table}.tsv'],
+                cwd=root, capture_output=True, check=True, text=True,
+            ).stdout
+            for table in TABLES
+        }
+    except subprocess.CalledProcessError as e:
+        raise click.BadParameter(f'{revision} is not a directory or a git revision: {e.stderr.strip()}') from None
+
+
+def get_version(location: str) -> Version:
+    """Load a version of the resources from a directory or a git revision."""
+    texts = _read_directory(location) if os.path.isdir(location) else _read_revision(location)
+    rows = {table: list(_read_rows(text)) for table, text in texts.items()}
+
+    synonyms, xrefs, relations = defaultdict(set), defaultdict(set), defaultdict(set)
+    for row in rows['synonyms']:
+        synonyms[row[0]].add(row)
+    for row in rows['xrefs']:
+        xrefs[row[0]].add(row)
+    for row in rows['relations']:
+        relations[row[1] if row[0] == CONSO else row[5]].add(row)
+
+    return Version(
+        classes={row[0].strip(): row[1].strip() for row in rows['classes']},
+        terms={row[0]: row for row in rows['terms']},
+        synonyms=dict(synonyms),
+        xrefs=dict(xrefs),
+        relations=dict(relations),
+        rows=rows,
+    )
+
+
+def _diff_table(old: Mapping[str, Set[Row]], new: Mapping[str, Set[Row]]) -> TableDiff:
+    added, removed = {}, {}
+    for identifier in old.keys() | new.keys():
+        old_rows, new_rows = old.get(identifier, set()), new.get(identifier, set())
+        if old_rows != new_rows:
+            if new_rows - old_rows:
+                added[identifier] = new_rows - old_rows
+            if old_rows - new_rows:
+                removed[identifier] = old_rows - new_rows
+    return TableDiff(added=added, removed=removed)
+
+
+def get_diff(old: Version, new: Version) -> Diff:
+    """Compare two versions of the resources."""
+    synonyms = _diff_table(old.synonyms, new.synonyms)
+    xrefs = _diff_table(old.xrefs, new.xrefs)
+    relations = _diff_table(old.relations, new.relations)
+
+    touched = set()
+    for table_diff in (synonyms, xrefs, relations):
+        touched.update(table_diff.added)
+        touched.update(table_diff.removed)
+
+    added, withdrawn, changed = [], [], []
+    for identifier in sorted(old.terms.keys() | new.terms.keys()):
+        was_live, is_live = old.is_live(identifier), new.is_live(identifier)
+        if is_live and not was_live:
+            added.append(identifier)
+        elif was_live and not is_live:
+            withdrawn.append(identifier)
+        elif is_live and (old.terms[identifier] != new.terms[identifier] or identifier in touched):
+            changed.append(identifier)
+
+    return Diff(
+        old=old,
+        new=new,
+        added=added,
+        withdrawn=withdrawn,
+        changed=changed,
+        synonyms=synonyms,
+        xrefs=xrefs,
+        relations=relations,
+    )
+
+
+def write_belns_patch(d: Diff, path: str, names: bool = False) -> None:
+    """Write the BEL namespace entries that changed.
+
+    Each line has the change (``+`` or ``-``), then the value and its encoding in the same
+    ``value|encoding`` form as the ``[Values]`` section of the namespace.
+
+    :param d: The differences between two versions
+    :param path: The output path
+    :param names: Write the patch for the names namespace instead of the identifiers namespace
+    """
+    value_column = 2 if names else 0
+
+    def _entries(version: Version) -> Set[str]:
+        return {
+            f'{row[value_column]}|{version.classes.get(row[3], "")}'
+            for identifier, row in version.terms.items()
+            if version.is_live(identifier)
+        }
+
+    old_entries, new_entries = _entries(d.old), _entries(d.new)
+    with open(path, 'w') as file:
+        for entry in sorted(old_entries - new_entries):
+            print('-', entry, sep='', file=file)
+        for entry in sorted(new_entries - old_entries):
+            print('+', entry, sep='', file=file)
+
+
+def _split_stanzas(lines: Iterable[str]) -> List[List[str]]:
+    """Split the lines of an OBO file into its header and stanzas, without the blank lines between them."""
+    rv = [[]]
+    for line in lines:
+        if line.startswith('['):
+            rv.append([])
+        if line.strip():
+            rv[-1].append(line)
+    return rv
+
+
+def _get_stanza_identifier(stanza: Iterable[str]) -> Optional[str]:
+    for line in stanza:
+        if line.startswith('id: '):
+            return line[len('id: '):].strip().rpartition(':')[2]
+    return None
+
+
+def write_obo_patch(d: Diff, path: str) -> None:
+    """Write OBO stanzas for the added and changed terms, and obsolete stanzas for the withdrawn ones.
+
+    The stanzas are taken from the new version as rendered by :func:`conso.export.obo.get_obo`, so they're
+    the same as in the full OBO export.
+    """
+    from .export.obo import get_obo
+
+    identifiers = set(d.added + d.changed)
+    header, *stanzas = _split_stanzas(get_obo(d.new.rows).iterate_obo_lines())
+    with open(path, 'w') as file:
+        print(*header, '', sep='\n', file=file)
+        for stanza in stanzas:
+            if stanza[0] == '[Term]' and _get_stanza_identifier(stanza) in identifiers:
+                print(*stanza, '', sep='\n', file=file)
+        for identifier in d.withdrawn:
+            name = d.old.terms[identifier][2]
+            print('[Term]', f'id: {CONSO}:{identifier}', f'name: {name}', 'is_obsolete: true', '', sep='\n', file=file)
+
+
+def _echo_table_diff(label: str, table_diff: TableDiff) -> None:
+    click.echo(f'{label}: {sum(map(len, table_diff.added.values()))} added, '
+               f'{sum(map(len, table_diff.removed.values()))} removed')
+    for sign, rows_map in (('-', table_diff.removed), ('+', table_diff.added)):
+        for identifier in sorted(rows_map):
+            for row in sorted(rows_map[identifier]):
+                click.echo(f'  {sign} ' + '\t'.join(row))
+
+
+@click.command()
+@click.argument('old')
+@click.argument('new', required=False)
+@click.option('-o', '--output', help='A directory in which the BELNS and OBO patches are written')
+@click.option('-q', '--quiet', is_flag=True, help='Only show the summary')
+def diff(old: str, new: Optional[str], output: Optional[str], quiet: bool):
+    """Compare two versions of CONSO, given as directories or git revisions.
+
+    NEW defaults to the resources next to this package, wherever it's run from.
+    """
+    d = get_diff(get_version(old), get_version(new or RESOURCES_DIRECTORY))
+
+    for label, identifiers in (('Added', d.added), ('Withdrawn', d.withdrawn), ('Changed', d.changed)):
+        click.echo(f'{label} terms: {len(identifiers)}')
+        if not quiet:
+            for identifier in identifiers:
+                click.echo(f'  {identifier}\t{(d.new if label != "Withdrawn" else d.old).terms[identifier][2]}')
+
+    for label, table_diff in (('Synonyms', d.synonyms), ('Xrefs', d.xrefs), ('Relations', d.relations)):
+        if quiet:
+            click.echo(f'{label}: {len(table_diff)} rows changed')
+        else:
+            _echo_table_diff(label, table_diff)
+
+    if output:
+        os.makedirs(output, exist_ok=True)
+        write_belns_patch(d, os.path.join(output, 'conso.belns.patch'))
+        write_belns_patch(d, os.path.join(output, 'conso-names.belns.patch'), names=True)
+        write_obo_patch(d, os.path.join(output, 'conso.obo.patch'))
+
+
+if __name__ == '__main__':
+    diff()
@@ -3,20 +3,21 @@
 """A script for enriching the CONSO with external information."""
 
 import json
-from typing import Mapping, Optional
+from typing import List, Mapping, Optional, Tuple
 
 import click
 import pandas as pd
 from tqdm import tqdm
 
 from .resources import SYNONYMS_PATH, XREFS_PATH
+from .sort_table import merge_into
 
-SYNONYM_HEADER = ['identifier', 'synonym', 'reference', 'specificity']
-XREFS_HEADER = ['identifier', 'database', 'database_identifier']
 
+def enrich_pubchem_synonyms() -> List[Tuple[str, ...]]:
+    """Enrich synonyms file with information from PubChem.
 
-def enrich_pubchem_synonyms():
-    """Enrich synonyms file with information from PubChem."""
+    :returns: The synonyms that were added
+    """
     import pubchempy as pcp
 
     xrefs = pd.read_csv(XREFS_PATH, sep='\t')
@@ -34,19 +35,14 @@ def enrich_pubchem_synonyms():
         for synonym in pcp.Compound.from_cid(cid).synonyms
     ]
 
-    (
-        pd.concat([
-            pd.read_csv(SYNONYMS_PATH, sep='\t'),
-            pd.DataFrame(new_synonyms, columns=SYNONYM_HEADER),
-        ])
-        .drop_duplicates()
-        .sort_values(SYNONYM_HEADER)
-        .to_csv(SYNONYMS_PATH, sep='\t', index=False)
-    )
+    return merge_into(SYNONYMS_PATH, new_synonyms)
 
 
-def enrich_chebi_xrefs():
-    """Enrich xrefs file with information from ChEBI."""
+def enrich_chebi_xrefs() -> List[Tuple[str, ...]]:
+    """Enrich xrefs file with information from ChEBI.
+
+    :returns: The cross-references that were added
+    """
     import zeep
     wsdl = 'https://www.ebi.ac.uk/webservices/chebi/2.0/webservice?wsdl'
     client = zeep.Client(wsdl)
@@ -104,22 +100,19 @@ def enrich_chebi_xrefs():
             result['chebiId'],
         ))
 
-    (
-        pd.concat([
-            pd.read_csv(XREFS_PATH, sep='\t'),
-            pd.DataFrame(new_xrefs, columns=XREFS_HEADER),
-        ])
-        .drop_duplicates()
-        .sort_values(XREFS_HEADER)
-        .to_csv(XREFS_PATH, sep='\t', index=False)
-    )
+    return merge_into(XREFS_PATH, new_xrefs)
 
 
 @click.command()
 def enrich():
     """Enrich the ontology."""
-    enrich_pubchem_synonyms()
-    enrich_chebi_xrefs()
+    for path, added in (
+        (SYNONYMS_PATH, enrich_pubchem_synonyms()),
+        (XREFS_PATH, enrich_chebi_xrefs()),
+    ):
+        click.echo(f'{path}: added {len(added)} rows')
+        for row in added:
+            click.echo('\t'.join(row))
 
 
 if __name__ == '__main__':
@@ -2,58 +2,58 @@
 
 """Export the Curation of Neurodegeneration Supporting Ontology (CONSO) to BELNS."""
 
-import csv
 import json
 import os
-from typing import List, Mapping, Optional
+from typing import Iterable, Mapping, Optional, Sequence
 
 import click
 from bel_resources import write_namespace
 from bel_resources.constants import NAMESPACE_DOMAIN_OTHER
 
+from .manifest import BELNS_CREATED, BELNS_VOLATILE, update_manifest, write_if_changed
+from ..mapping import write_binary_mapping
 from ..resources import CLASSES_PATH, TERMS_PATH
+from ..utils import Tables, get_rows
 
+__all__ = [
+    'write_belns',
+    'belns',
+]
 
-def _get_classes() -> Mapping[str, str]:
-    with open(CLASSES_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        return {
-            line[0].strip(): line[1].strip()
-            for line in reader
-        }
+
+def _get_classes(tables: Optional[Tables] = None) -> Mapping[str, str]:
+    return {
+        line[0].strip(): line[1].strip()
+        for line in get_rows(tables, 'classes', CLASSES_PATH)
+    }
 
 
-def _get_terms() -> Mapping[str, str]:
-    classes = _get_classes()
+def _get_terms(tables: Optional[Tables] = None) -> Mapping[str, str]:
+    classes = _get_classes(tables)
     return {
         line[0]: classes[line[3]]
-        for line in _get_lines()
+        for line in _get_lines(tables)
     }
 
 
-def _get_labels() -> Mapping[str, str]:
-    classes = _get_classes()
+def _get_labels(tables: Optional[Tables] = None) -> Mapping[str, str]:
+    classes = _get_classes(tables)
     return {
         line[2]: classes[line[3]]
-        for line in _get_lines()
+        for line in _get_lines(tables)
     }
 
 
-def _get_mapping():
+def _get_mapping(tables: Optional[Tables] = None):
     return {
         line[0]: line[2]
-        for line in _get_lines()
+        for line in _get_lines(tables)
     }
 
 
-def _get_lines() -> List[str]:
-    with open(TERMS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        for line in reader:
-            if not line or line[2] == 'WITHDRAWN':
-                continue
+def _get_lines(tables: Optional[Tables] = None) -> Iterable[Sequence[str]]:
+    for line in get_rows(tables, 'terms', TERMS_PATH):
+        if line[2] != 'WITHDRAWN':
             yield line
 
 
@@ -77,9 +77,42 @@ def _write_namespace(path, values: Mapping[str, str], namespace_version: Optiona
         )
 
 
-def _write_mapping(path: str) -> None:
+def _write_mapping(path: str, mapping: Optional[Mapping[str, str]] = None) -> None:
     with open(path, 'w') as file:
-        json.dump(_get_mapping(), file, indent=2, sort_keys=True)
+        json.dump(mapping or _get_mapping(), file, indent=2, sort_keys=True)
+
+
+def _write_binary_mapping(path: str, mapping: Optional[Mapping[str, str]] = None) -> None:
+    write_binary_mapping(mapping or _get_mapping(), path)
+
+
+def write_belns(directory: str, version: Optional[str] = None, tables: Optional[Tables] = None) -> None:
+    """Write the BELNS namespaces and mappings to a directory and list them in its manifest.
+
+    :param directory: The directory of the exports
+    :param version: The version of the namespaces. Defaults to the date.
+    :param tables: The classes and terms tables, if they were already read
+    """
+    identifiers_path = os.path.join(directory, 'conso.belns')
+    names_path = os.path.join(directory, 'conso-names.belns')
+    mapping_path = os.path.join(directory, 'conso.belns.mapping')
+    binary_mapping_path = os.path.join(directory, 'conso.belns.mapping.bin')
+
+    terms, labels, mapping = _get_terms(tables), _get_labels(tables), _get_mapping(tables)
+    # Without an explicit version, the version is the date, so it changes every day
+    volatile = BELNS_VOLATILE if version is None else BELNS_CREATED
+    for path, write, path_volatile in (
+        (identifiers_path, lambda p: _write_namespace(p, terms, namespace_version=version), volatile),
+        (names_path, lambda p: _write_namespace(p, labels, namespace_version=version), volatile),
+        (mapping_path, lambda p: _write_mapping(p, mapping), None),
+        (binary_mapping_path, lambda p: _write_binary_mapping(p, mapping), None),
+    ):
+        changed = write_if_changed(path, write, volatile=path_volatile)
+        click.echo(f'{"updated" if changed else "unchanged"} {path}')
+
+    update_manifest(
+        directory, 'belns', [identifiers_path, names_path, mapping_path, binary_mapping_path], terms=len(terms),
+    )
 
 
 @click.command()
@@ -87,13 +120,7 @@ def _write_mapping(path: str) -> None:
 @click.option('--version')
 def belns(directory: str, version):
     """Export CONSO as BELNS."""
-    identifiers_path = os.path.join(directory, 'conso.belns')
-    names_path = os.path.join(directory, 'conso-names.belns')
-    mapping_path = os.path.join(directory, 'conso.belns.mapping')
-
-    _write_namespace(identifiers_path, _get_terms(), namespace_version=version)
-    _write_namespace(names_path, _get_labels(), namespace_version=version)
-    _write_mapping(mapping_path)
+    write_belns(directory, version=version)
 
 
 if __name__ == '__main__':
@@ -7,7 +7,11 @@ import click
 from .belns import belns
 from .html import html
 from .obo import obo
+from .obograph import obograph
 from .owl import owl
+from .parquet import parquet
+from .sqlite import sqlite
+from .verify import verify
 
 
 @click.group()
@@ -18,7 +22,11 @@ def export():
 export.add_command(belns)
 export.add_command(html)
 export.add_command(obo)
+export.add_command(obograph)
 export.add_command(owl)
+export.add_command(parquet)
+export.add_command(sqlite)
+export.add_command(verify)
 
 if __name__ == '__main__':
     export()
@@ -1,59 +1,134 @@
 # -*- coding: utf-8 -*-
 
-"""Export CONSO to HTML."""
+"""Export CONSO to HTML.
 
+The index page doesn't contain the terms. They're written to JSON shards in ``data/`` that the page fetches
+as they're needed, along with a prebuilt search index over the names and synonyms, so the size of the page
+and of the DOM doesn't grow with the terminology.
+"""
+
+import io
+import json
 import os
+import re
 from collections import Counter, defaultdict
+from typing import Collection, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Tuple
 
 import click
 import pandas as pd
 
+from .static import clear_static, hash_asset, write_manifest
 from ...resources import AUTHORS_PATH, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, XREFS_PATH
 
 HERE = os.path.abspath(os.path.dirname(__file__))
 
 CONSO = 'CONSO'
 
+#: The number of terms in each of the JSON shards loaded by the index page
+DEFAULT_SHARD_SIZE = 1000
 
-@click.command()
-@click.argument('directory')
-@click.option('--debug-links', is_flag=True)
-def html(directory: str, debug_links: bool) -> None:
-    """Export CONSO as HTML.
+TOKEN = re.compile(r'[a-z0-9]+')
 
-    :param directory: The output directory where the html goes.
-    :param debug_links: If true, uses links directly to index files instead of by folder.
+
+def _write_json(path: str, data) -> None:
+    with open(path, 'w') as file:
+        json.dump(data, file, ensure_ascii=False, separators=(',', ':'))
+
+
+def write_shards(directory: str, rows: Sequence[Sequence], shard_size: int = DEFAULT_SHARD_SIZE) -> List[str]:
+    """Write the rows of the index table into JSON files of ``shard_size`` rows each.
+
+    :returns: The paths of the shards
     """
-    import matplotlib.pyplot as plt
-    import seaborn as sns
-    from jinja2 import Environment, FileSystemLoader
+    rv = []
+    for i, start in enumerate(range(0, len(rows), shard_size)):
+        path = os.path.join(directory, f'terms-{i}.json')
+        _write_json(path, list(rows[start:start + shard_size]))
+        rv.append(path)
+    return rv
+
+
+def get_search_index(labels: Iterable[Iterable[str]]) -> Mapping[str, List]:
+    """Build an inverted index from the tokens in each term's labels to the positions of the terms.
+
+    :param labels: The name and synonyms of each term, in the same order as the shards
+    :returns: A dictionary with sorted ``tokens`` and the sorted positions of the terms containing each
+        of them in ``postings``
+    """
+    postings = defaultdict(set)
+    for position, term_labels in enumerate(labels):
+        for label in term_labels:
+            for token in TOKEN.findall(label.lower()):
+                postings[token].add(position)
+    tokens = sorted(postings)
+    return {
+        'tokens': tokens,
+        'postings': [sorted(postings[token]) for token in tokens],
+    }
+
+
+#: The tables that the HTML export is built from, as read by :func:`read_table`
+TABLE_PATHS: Mapping[str, str] = {
+    'authors': AUTHORS_PATH,
+    'terms': TERMS_PATH,
+    'synonyms': SYNONYMS_PATH,
+    'xrefs': XREFS_PATH,
+    'relations': RELATIONS_PATH,
+}
 
-    os.makedirs(directory, exist_ok=True)
 
-    environment = Environment(autoescape=True, loader=FileSystemLoader(HERE), trim_blocks=False)
-    index_template = environment.get_template('index.html')
-    summary_template = environment.get_template('summary.html')
-    term_template = environment.get_template('term.html')
+class HTMLData(NamedTuple):
+    """The terms and their synonyms, xrefs, and relations, arranged for the templates."""
 
-    authors_df = pd.read_csv(AUTHORS_PATH, sep='\t')
+    terms_df: pd.DataFrame
+    synonyms_df: pd.DataFrame
+    xrefs_df: pd.DataFrame
+    relations_df: pd.DataFrame
+    synonyms: Mapping[str, List[Tuple[str, str, str]]]
+    xrefs: Mapping[str, List[Tuple[str, str]]]
+    incoming_relations: Mapping[str, List[Tuple[str, str, str, str]]]
+    outgoing_relations: Mapping[str, List[Tuple[str, str, str, str]]]
+
+
+def read_table(name: str, content: Optional[bytes] = None) -> pd.DataFrame:
+    """Read one of the tables in :data:`TABLE_PATHS`.
+
+    :param name: The name of the table
+    :param content: The content of the file, if it was already read
+    """
+    return pd.read_csv(TABLE_PATHS[name] if content is None else io.BytesIO(content), sep='\t')
+
+
+def get_html_data(tables: Optional[Mapping[str, pd.DataFrame]] = None) -> HTMLData:
+    """Arrange the tables for the templates.
+
+    :param tables: The tables in :data:`TABLE_PATHS`, as read by :func:`read_table`. Any that are
+        missing are read from the resources.
+    """
+    tables = dict(tables or {})
+    for name in TABLE_PATHS:
+        if name not in tables:
+            tables[name] = read_table(name)
+
+    authors_df = tables['authors']
     authors = dict(authors_df[['ORCID', 'Name']].values)
 
-    terms_df = pd.read_csv(TERMS_PATH, sep='\t')
-    terms_df = terms_df[terms_df.Name != 'WITHDRAWN']
+    terms_df = tables['terms']
+    terms_df = terms_df[terms_df.Name != 'WITHDRAWN'].copy()
 
     terms_df['author_name'] = terms_df['Author'].map(authors.get)
 
-    synonyms_df = pd.read_csv(SYNONYMS_PATH, sep='\t')
+    synonyms_df = tables['synonyms']
     synonyms = defaultdict(list)
     for _, row in synonyms_df.iterrows():
         synonyms[row.identifier].append((row.synonym, row.reference, row.specificity))
 
-    xrefs_df = pd.read_csv(XREFS_PATH, sep='\t')
+    xrefs_df = tables['xrefs']
     xrefs = defaultdict(list)
     for _, row in xrefs_df.iterrows():
         xrefs[row.identifier].append((row.database, row.database_identifier))
 
-    relations_df = pd.read_csv(RELATIONS_PATH, sep='\t')
+    relations_df = tables['relations']
     incoming_relations = defaultdict(list)
     outgoing_relations = defaultdict(list)
     for _, row in relations_df.iterrows():
@@ -72,40 +147,126 @@ def html(directory: str, debug_links: bool) -> None:
                 row['Relation'],
             ))
 
-    index_html = index_template.render(
+    return HTMLData(
         terms_df=terms_df,
-        incoming_relations=incoming_relations,
-        outgoing_relations=outgoing_relations,
+        synonyms_df=synonyms_df,
+        xrefs_df=xrefs_df,
+        relations_df=relations_df,
         synonyms=synonyms,
         xrefs=xrefs,
+        incoming_relations=incoming_relations,
+        outgoing_relations=outgoing_relations,
+    )
+
+
+def _get_environment():
+    from jinja2 import Environment, FileSystemLoader
+
+    return Environment(autoescape=True, loader=FileSystemLoader(HERE), trim_blocks=False)
+
+
+def write_index(
+    directory: str,
+    data: HTMLData,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    precompress: bool = False,
+    debug_links: bool = False,
+) -> Mapping[str, str]:
+    """Write the index page with its sharded data files and search index.
+
+    :returns: A mapping from the paths of the data files, relative to the directory, to the paths they were
+        written to, which only differ if they were content-hashed
+    """
+    data_directory = os.path.join(directory, 'data')
+    os.makedirs(data_directory, exist_ok=True)
+    for name in os.listdir(data_directory):  # clear out data files from previous exports
+        os.remove(os.path.join(data_directory, name))
+    index_rows = [
+        (
+            row.Identifier,
+            row.Name,
+            row.Type,
+            row.Description,
+            len(data.incoming_relations[row.Identifier]),
+            len(data.outgoing_relations[row.Identifier]),
+            len(data.synonyms[row.Identifier]),
+            len(data.xrefs[row.Identifier]),
+        )
+        for row in data.terms_df.itertuples()
+    ]
+    data_paths = write_shards(data_directory, index_rows, shard_size=shard_size)
+    search_index = get_search_index(
+        [row.Name, *(synonym for synonym, _, _ in data.synonyms[row.Identifier])]
+        for row in data.terms_df.itertuples()
+    )
+    data_paths.append(os.path.join(data_directory, 'search.json'))
+    _write_json(data_paths[-1], search_index)
+
+    assets = {}
+    for path in data_paths:
+        relative_path = os.path.relpath(path, directory).replace(os.sep, '/')
+        assets[relative_path] = (
+            os.path.relpath(hash_asset(path), directory).replace(os.sep, '/')
+            if precompress else
+            relative_path
+        )
+
+    index_html = _get_environment().get_template('index.html').render(
+        n_terms=len(index_rows),
+        shard_size=shard_size,
+        shard_urls=list(assets.values())[:-1],
+        search_url=assets['data/search.json'],
         debug_links=debug_links,
     )
     with open(os.path.join(directory, 'index.html'), 'w') as file:
         print(index_html, file=file)
 
-    summary_df = terms_df.groupby('Type').count().sort_values('Identifier', ascending=False)['Identifier'].reset_index()
-    summary_df['Type'] = summary_df['Type'].map(str.title)
-    summary_df = summary_df[summary_df['Type'] != '?']
-    summary_html = summary_template.render(
-        summary_df=summary_df,
-    )
-    with open(os.path.join(directory, 'summary.html'), 'w') as file:
-        print(summary_html, file=file)
+    return assets
+
 
-    for _, row in terms_df.iterrows():
+def write_term_pages(
+    directory: str,
+    data: HTMLData,
+    identifiers: Optional[Collection[str]] = None,
+    debug_links: bool = False,
+) -> None:
+    """Write a page for each term.
+
+    :param identifiers: If given, only writes the pages for these terms
+    """
+    term_template = _get_environment().get_template('term.html')
+    for _, row in data.terms_df.iterrows():
+        if identifiers is not None and row.Identifier not in identifiers:
+            continue
         subdirectory = os.path.join(directory, row.Identifier)
         os.makedirs(subdirectory, exist_ok=True)
         html = term_template.render(
             row=row,
-            synonyms=synonyms[row.Identifier],
-            xrefs=xrefs[row.Identifier],
-            incoming_relations=incoming_relations[row.Identifier],
-            outgoing_relations=outgoing_relations[row.Identifier],
+            synonyms=data.synonyms[row.Identifier],
+            xrefs=data.xrefs[row.Identifier],
+            incoming_relations=data.incoming_relations[row.Identifier],
+            outgoing_relations=data.outgoing_relations[row.Identifier],
             debug_links=debug_links,
         )
         with open(os.path.join(subdirectory, 'index.html'), 'w') as file:
             print(html, file=file)
 
+
+def write_summary(directory: str, data: HTMLData) -> None:
+    """Write the summary page and plots."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    terms_df = data.terms_df
+    summary_df = terms_df.groupby('Type').count().sort_values('Identifier', ascending=False)['Identifier'].reset_index()
+    summary_df['Type'] = summary_df['Type'].map(str.title)
+    summary_df = summary_df[summary_df['Type'] != '?']
+    summary_html = _get_environment().get_template('summary.html').render(
+        summary_df=summary_df,
+    )
+    with open(os.path.join(directory, 'summary.html'), 'w') as file:
+        print(summary_html, file=file)
+
     # Make some plots
     fig, (lax, rax) = plt.subplots(ncols=2, figsize=(12, 5))
     sns.barplot(data=summary_df, y='Type', x='Identifier', ax=lax)
@@ -113,9 +274,9 @@ def html(directory: str, debug_links: bool) -> None:
     lax.set_ylabel('')
     lax.set_title(f'Entries ({len(terms_df.index)} in {summary_df["Type"].nunique()} classes)')
 
-    relations = Counter(relations_df['Relation'].map(lambda s: s.replace('_', ' ').title()))
-    relations['Has Synonym'] = len(synonyms_df.index)
-    relations['Has Xref'] = len(xrefs_df.index)
+    relations = Counter(data.relations_df['Relation'].map(lambda s: s.replace('_', ' ').title()))
+    relations['Has Synonym'] = len(data.synonyms_df.index)
+    relations['Has Xref'] = len(data.xrefs_df.index)
     relations_summary_df = pd.DataFrame(relations.most_common(), columns=['Type', 'Count'])
     sns.barplot(data=relations_summary_df, x='Count', y='Type', ax=rax)
     rax.set_xscale('log')
@@ -123,6 +284,38 @@ def html(directory: str, debug_links: bool) -> None:
     rax.set_title(f'Relations ({sum(relations.values())})')
     plt.tight_layout()
     plt.savefig(os.path.join(directory, 'summary.png'), dpi=300)
+    plt.close(fig)
+
+
+@click.command()
+@click.argument('directory')
+@click.option('--debug-links', is_flag=True)
+@click.option('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, show_default=True,
+              help='The number of terms in each JSON data file loaded by the index page')
+@click.option('--precompress', is_flag=True,
+              help='Write gzip and brotli variants, content-hashed data files, and a manifest for static hosting')
+def html(directory: str, debug_links: bool, shard_size: int, precompress: bool) -> None:
+    """Export CONSO as HTML.
+
+    :param directory: The output directory where the html goes.
+    :param debug_links: If true, uses links directly to index files instead of by folder.
+    :param shard_size: The number of terms in each JSON data file loaded by the index page
+    :param precompress: If true, prepares the output for static hosting with :mod:`conso.export.html.static`.
+    """
+    os.makedirs(directory, exist_ok=True)
+    clear_static(directory)
+
+    data = get_html_data()
+    assets = write_index(directory, data, shard_size=shard_size, precompress=precompress, debug_links=debug_links)
+    write_summary(directory, data)
+    write_term_pages(directory, data, debug_links=debug_links)
+
+    if precompress:
+        write_manifest(directory, {
+            original: hashed
+            for original, hashed in assets.items()
+            if original != hashed
+        })
 
 
 if __name__ == '__main__':
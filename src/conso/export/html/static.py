@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""Prepare the HTML export for static hosting.
+
+Shared assets are renamed to include a hash of their content, so they can be cached forever, and every text
+file gets gzip and brotli variants written next to it, so the host can serve them without compressing on the
+fly. The manifest lists every file with its hash, size, whether it can be cached forever, and the sizes of its
+compressed variants.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+from typing import Any, Dict, Mapping
+
+__all__ = [
+    'COMPRESSED_EXTENSIONS',
+    'clear_static',
+    'hash_asset',
+    'compress_file',
+    'write_manifest',
+]
+
+#: The files that get compressed variants. Images are already compressed.
+COMPRESSED_EXTENSIONS = {'.html', '.json', '.css', '.js', '.svg', '.txt'}
+MANIFEST_NAME = 'manifest.json'
+HASH_LENGTH = 12
+
+#: The suggested ``Cache-Control`` headers for the files that are and aren't marked immutable in the manifest
+CACHE_CONTROL = {
+    'immutable': 'public, max-age=31536000, immutable',
+    'default': 'no-cache',
+}
+
+
+def _get_digest(path: str) -> str:
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def clear_static(directory: str) -> None:
+    """Remove the compressed variants and manifest of a previous export, which would otherwise be stale."""
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith(('.gz', '.br')) or (root == directory and name == MANIFEST_NAME):
+                os.remove(os.path.join(root, name))
+
+
+def hash_asset(path: str) -> str:
+    """Rename a file to include a hash of its content, like ``search.0123456789ab.json``.
+
+    :returns: The new path
+    """
+    stem, extension = os.path.splitext(path)
+    rv = f'{stem}.{_get_digest(path)[:HASH_LENGTH]}{extension}'
+    os.replace(path, rv)
+    return rv
+
+
+def compress_file(path: str) -> Mapping[str, int]:
+    """Write the gzip and brotli variants of a file next to it.
+
+    :returns: A mapping from the encodings to the sizes of the variants
+    """
+    import brotli
+
+    with open(path, 'rb') as file:
+        content = file.read()
+
+    rv = {}
+    for encoding, extension, compressed in (
+        ('gzip', '.gz', gzip.compress(content, compresslevel=9, mtime=0)),
+        ('br', '.br', brotli.compress(content, quality=11)),
+    ):
+        with open(path + extension, 'wb') as file:
+            file.write(compressed)
+        rv[encoding] = len(compressed)
+    return rv
+
+
+def write_manifest(directory: str, immutable: Mapping[str, str]) -> Mapping[str, Any]:
+    """Compress every text file in the directory and write the manifest.
+
+    :param directory: The output directory of the HTML export
+    :param immutable: A mapping from the original paths of the content-hashed assets, relative to the
+        directory, to their new paths
+    :returns: The manifest
+    """
+    hashed = set(immutable.values())
+    files: Dict[str, Dict[str, Any]] = {}
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            relative_path = os.path.relpath(path, directory).replace(os.sep, '/')
+            extension = os.path.splitext(name)[1]
+            if extension in {'.gz', '.br'} or relative_path == MANIFEST_NAME:
+                continue
+            entry = {
+                'sha256': _get_digest(path),
+                'size': os.path.getsize(path),
+                'immutable': relative_path in hashed,
+            }
+            if extension in COMPRESSED_EXTENSIONS:
+                entry['encodings'] = compress_file(path)
+            files[relative_path] = entry
+
+    manifest = {
+        'cache_control': CACHE_CONTROL,
+        'assets': dict(sorted(immutable.items())),
+        'files': dict(sorted(files.items())),
+    }
+    with open(os.path.join(directory, MANIFEST_NAME), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
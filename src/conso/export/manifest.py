@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+
+"""Write the exports only when their content changes, and keep a manifest of them.
+
+Each export is written to a temporary file next to its target and compared to the existing file by a hash of
+its content. The target is only replaced, atomically, if they differ, so the files in ``export/`` only change
+when something in them did. Lines that only record when a file was generated, like the ``CreatedDateTime`` of
+a BELNS file or the ``date`` of an OBO file, are left out of the comparison.
+
+``MANIFEST.json`` in the same directory lists each export with its hash, size, and number of terms, along
+with the hashes of the resource files it was generated from, so mirrors can tell what needs to be downloaded
+and indexed again.
+
+The HTML export is the exception. It's a whole site rather than a file, so it's not listed here, and its
+``--precompress`` option writes a ``manifest.json`` of its own for static hosting.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from typing import Any, Callable, Iterable, Mapping, Optional, Pattern, Sequence
+
+from ..resources import (
+    AUTHORS_PATH, CLASSES_PATH, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, TYPEDEF_PATH, XREFS_PATH,
+)
+from ..utils import Tables, get_rows
+
+__all__ = [
+    'MANIFEST_NAME',
+    'SOURCES',
+    'get_digest',
+    'count_terms',
+    'write_if_changed',
+    'update_manifest',
+]
+
+MANIFEST_NAME = 'MANIFEST.json'
+
+#: The resource files that each export is generated from
+SOURCES: Mapping[str, Sequence[str]] = {
+    'belns': (CLASSES_PATH, TERMS_PATH),
+    'obo': (AUTHORS_PATH, TYPEDEF_PATH, TERMS_PATH, SYNONYMS_PATH, XREFS_PATH, RELATIONS_PATH),
+    'owl': (CLASSES_PATH, TERMS_PATH, SYNONYMS_PATH, XREFS_PATH),
+    'obograph': (TYPEDEF_PATH, TERMS_PATH, SYNONYMS_PATH, XREFS_PATH, RELATIONS_PATH),
+    'sqlite': (AUTHORS_PATH, CLASSES_PATH, TERMS_PATH, SYNONYMS_PATH, XREFS_PATH, RELATIONS_PATH),
+    'parquet': (AUTHORS_PATH, CLASSES_PATH, TYPEDEF_PATH, TERMS_PATH, SYNONYMS_PATH, XREFS_PATH, RELATIONS_PATH),
+}
+
+#: The lines of a BELNS file that change on every export
+BELNS_VOLATILE = re.compile(rb'^(VersionString|CreatedDateTime)=')
+#: The lines of a BELNS file that change on every export when the version is given explicitly
+BELNS_CREATED = re.compile(rb'^CreatedDateTime=')
+#: The lines of an OBO file that change on every export
+OBO_VOLATILE = re.compile(rb'^date: ')
+
+
+def get_digest(path: str, volatile: Optional[Pattern[bytes]] = None) -> str:
+    """Get the SHA-256 hash of a file, leaving out the lines that match the volatile pattern."""
+    rv = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for line in file:
+            if volatile is None or not volatile.match(line):
+                rv.update(line)
+    return rv.hexdigest()
+
+
+def count_terms(tables: Optional[Tables] = None) -> int:
+    """Count the terms in ``terms.tsv`` that aren't withdrawn, for the manifest."""
+    return sum(1 for _, _, name, *_ in get_rows(tables, 'terms', TERMS_PATH) if name != 'WITHDRAWN')
+
+
+def _get_default_mode() -> int:
+    """Get the mode that a newly created file gets under the current umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_if_changed(
+    path: str,
+    write: Callable[[str], Any],
+    volatile: Optional[Pattern[bytes]] = None,
+) -> bool:
+    """Write a file through a temporary file, replacing the target only if the content changed.
+
+    :param path: The target path
+    :param write: A function that writes the export to the path it's given
+    :param volatile: A pattern for lines that are left out when comparing to the existing file
+    :returns: If the target was replaced
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # A unique name, so concurrent exports to the same target don't write into each other's temporary file
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory or os.curdir, prefix=f'{os.path.basename(path)}.')
+    os.close(descriptor)
+    try:
+        write(temporary_path)
+        if os.path.exists(path) and get_digest(path, volatile) == get_digest(temporary_path, volatile):
+            return False
+        # mkstemp only makes the file readable by its owner
+        os.chmod(temporary_path, _get_default_mode())
+        os.replace(temporary_path, path)
+        return True
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+
+def _write_json(path: str, data: Mapping[str, Any]) -> None:
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=2, sort_keys=True)
+        file.write('\n')
+
+
+def update_manifest(directory: str, name: str, paths: Iterable[str], terms: int) -> Mapping[str, Any]:
+    """Update the entries of an export's files in the manifest, leaving the entries of other exports.
+
+    :param directory: The directory of the exports
+    :param name: The name of the export, one of the keys of :data:`SOURCES`
+    :param paths: The paths of the files written by the export
+    :param terms: The number of terms in the export
+    :returns: The manifest
+    """
+    manifest_path = os.path.join(directory, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        manifest = {}
+
+    sources = {
+        os.path.basename(source_path): get_digest(source_path)
+        for source_path in SOURCES[name]
+    }
+    files = manifest.setdefault('files', {})
+    for path in paths:
+        files[os.path.basename(path)] = {
+            'export': name,
+            'sha256': get_digest(path),
+            'size': os.path.getsize(path),
+            'terms': terms,
+            'sources': sources,
+        }
+
+    write_if_changed(manifest_path, lambda temporary_path: _write_json(temporary_path, manifest))
+    return manifest
@@ -2,21 +2,37 @@
 
 """Export the Curation of Neurodegeneration Supporting Ontology (CONSO) to OBO."""
 
-import csv
-from typing import Dict, Iterable, List, Mapping, Tuple
+import os
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 import click
 from pyobo import Obo, Reference, Synonym, Term, TypeDef
 from pyobo.struct.typedef import has_role, part_of
 
+from .manifest import OBO_VOLATILE, update_manifest, write_if_changed
 from ..resources import AUTHORS_PATH, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, TYPEDEF_PATH, XREFS_PATH
+from ..utils import get_rows
 
 CONSO = 'CONSO'
 
+#: The tables that the OBO export is built from
+TABLE_PATHS: Mapping[str, str] = {
+    'typedefs': TYPEDEF_PATH,
+    'authors': AUTHORS_PATH,
+    'terms': TERMS_PATH,
+    'synonyms': SYNONYMS_PATH,
+    'xrefs': XREFS_PATH,
+    'relations': RELATIONS_PATH,
+}
 
-def get_obo() -> Obo:
-    """Get OBO object."""
-    terms, typedefs = get_content()
+
+def get_obo(tables: Optional[Mapping[str, Iterable[Sequence[str]]]] = None) -> Obo:
+    """Get OBO object.
+
+    :param tables: The rows of the tables in :data:`TABLE_PATHS`, without their headers. Any that are
+        missing are read from the resources.
+    """
+    terms, typedefs = get_content(tables)
     return Obo(
         format_version='1.2',
         auto_generated_by='https://github.com/pharmacome/conso/blob/master/src/conso/export/obo.py',
@@ -34,112 +50,119 @@ def _extract_references(s: str) -> Iterable[Reference]:
             yield reference
 
 
-def get_content() -> Tuple[List[Term], List[TypeDef]]:
-    """Iterate CONSO terms."""
-    with open(TYPEDEF_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        typedefs: Dict[str, TypeDef] = {
-            identifier: TypeDef(
-                reference=Reference(prefix=CONSO, identifier=identifier, name=name),
-                namespace=namespace,
-                xrefs=list(_extract_references(xrefs)),
-                is_transitive=transitive == 'true',
-                comment=comment,
-            )
-            for identifier, name, namespace, xrefs, transitive, comment in reader
-        }
-        typedefs.update(part_of=part_of, has_role=has_role)
-        del typedefs['bel']
-
-    with open(AUTHORS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        authors: Mapping[str, Reference] = {
-            orcid_identifier: Reference(
-                prefix='orcid',
-                identifier=orcid_identifier,
-                name=author,
-            )
-            for orcid_identifier, author in reader
-        }
-
-    with open(TERMS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-
-        terms: Dict[str, Term] = {}
-        for conso_id, author_key, name, namespace, references, description in reader:
-            if name == 'WITHDRAWN':
-                continue
-            terms[conso_id] = Term(
-                reference=Reference(
-                    prefix=CONSO,
-                    identifier=conso_id,
-                    name=name,
-                ),
-                provenance=list(_extract_references(references)),
-                namespace=namespace,
-                definition=description,
-            )
-            terms[conso_id].relationships[typedefs['author']].append(authors[author_key])
-
-    with open(SYNONYMS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        for conso_id, synonym, references, specificity in reader:
-            references = (
-                [r.strip() for r in references.split(',')]
-                if references and references != '?' else
-                []
-            )
-            specificity = (
-                'EXACT' if specificity == '?' else specificity
-            )
-            terms[conso_id].synonyms.append(Synonym(synonym, specificity, provenance=references))
-
-    with open(XREFS_PATH) as file:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-        for conso_id, database, identifier in reader:
-            if database.lower() == 'bel':
-                terms[conso_id].append_property('bel', identifier)
-            else:
-                terms[conso_id].append_xref(Reference(prefix=database, identifier=identifier))
-
-    with open(RELATIONS_PATH) as file:
-        reader = enumerate(csv.reader(file, delimiter='\t'), start=1)
-        _ = next(reader)  # skip the header
-        handled_relations = {'is_a'} | set(typedefs)
-        for line, (source_ns, source_id, _source_name, relation, target_ns, target_id, target_name) in reader:
-            if relation not in handled_relations:
-                print(f'{RELATIONS_PATH} can not handle line {line} because unhandled relation: {relation}')
-                continue
-
-            if source_ns != CONSO and target_ns != CONSO:
-                print(f'{RELATIONS_PATH}: skipping line {line} because neither entity is from {CONSO}')
-                continue
-
-            if source_ns != CONSO:
-                print(f'{RELATIONS_PATH} can not handle line {line} because of'
-                      f' inverse relation definition to external identifier')
-                continue
-
-            target = Reference(prefix=target_ns, identifier=target_id, name=target_name)
-            if relation == 'is_a':
-                terms[source_id].append_parent(target)
-            else:
-                terms[source_id].append_relationship(typedefs[relation], target)
+def get_content(
+    tables: Optional[Mapping[str, Iterable[Sequence[str]]]] = None,
+) -> Tuple[List[Term], List[TypeDef]]:
+    """Iterate CONSO terms.
+
+    :param tables: The rows of the tables in :data:`TABLE_PATHS`, without their headers. Any that are
+        missing are read from the resources.
+    """
+    tables = {
+        table: get_rows(tables, table, path)
+        for table, path in TABLE_PATHS.items()
+    }
+
+    typedefs: Dict[str, TypeDef] = {
+        identifier: TypeDef(
+            reference=Reference(prefix=CONSO, identifier=identifier, name=name),
+            namespace=namespace,
+            xrefs=list(_extract_references(xrefs)),
+            is_transitive=transitive == 'true',
+            comment=comment,
+        )
+        for identifier, name, namespace, xrefs, transitive, comment in tables['typedefs']
+    }
+    typedefs.update(part_of=part_of, has_role=has_role)
+    del typedefs['bel']
+
+    authors: Mapping[str, Reference] = {
+        orcid_identifier: Reference(
+            prefix='orcid',
+            identifier=orcid_identifier,
+            name=author,
+        )
+        for orcid_identifier, author in tables['authors']
+    }
+
+    terms: Dict[str, Term] = {}
+    for conso_id, author_key, name, namespace, references, description in tables['terms']:
+        if name == 'WITHDRAWN':
+            continue
+        terms[conso_id] = Term(
+            reference=Reference(
+                prefix=CONSO,
+                identifier=conso_id,
+                name=name,
+            ),
+            provenance=list(_extract_references(references)),
+            namespace=namespace,
+            definition=description,
+        )
+        terms[conso_id].relationships[typedefs['author']].append(authors[author_key])
+
+    for conso_id, synonym, references, specificity in tables['synonyms']:
+        references = (
+            [r.strip() for r in references.split(',')]
+            if references and references != '?' else
+            []
+        )
+        specificity = (
+            'EXACT' if specificity == '?' else specificity
+        )
+        terms[conso_id].synonyms.append(Synonym(synonym, specificity, provenance=references))
+
+    for conso_id, database, identifier in tables['xrefs']:
+        if database.lower() == 'bel':
+            terms[conso_id].append_property('bel', identifier)
+        else:
+            terms[conso_id].append_xref(Reference(prefix=database, identifier=identifier))
+
+    handled_relations = {'is_a'} | set(typedefs)
+    relations = enumerate(tables['relations'], start=2)  # the header is line 1
+    for line, (source_ns, source_id, _source_name, relation, target_ns, target_id, target_name) in relations:
+        if relation not in handled_relations:
+            print(f'{RELATIONS_PATH} can not handle line {line} because unhandled relation: {relation}')
+            continue
+
+        if source_ns != CONSO and target_ns != CONSO:
+            print(f'{RELATIONS_PATH}: skipping line {line} because neither entity is from {CONSO}')
+            continue
+
+        if source_ns != CONSO:
+            print(f'{RELATIONS_PATH} can not handle line {line} because of'
+                  f' inverse relation definition to external identifier')
+            continue
+
+        target = Reference(prefix=target_ns, identifier=target_id, name=target_name)
+        if relation == 'is_a':
+            terms[source_id].append_parent(target)
+        else:
+            terms[source_id].append_relationship(typedefs[relation], target)
 
     return list(terms.values()), list(typedefs.values())
 
 
+def write_obo(path: str, tables: Optional[Mapping[str, Iterable[Sequence[str]]]] = None) -> bool:
+    """Write the OBO export and list it in the manifest of its directory.
+
+    :param path: The path of the OBO file
+    :param tables: The rows of the tables in :data:`TABLE_PATHS`, as for :func:`get_obo`
+    :returns: If the file was replaced
+    """
+    ontology = get_obo(tables)
+    changed = write_if_changed(path, ontology.write_obo, volatile=OBO_VOLATILE)
+    update_manifest(os.path.dirname(path), 'obo', [path], terms=sum(1 for _ in ontology.iter_terms()))
+    return changed
+
+
 @click.command()
 @click.argument('path')
 @click.option('--check', is_flag=True)
 def obo(path: str, check: bool):
     """Export CONSO as OBO."""
-    get_obo().write_obo(path)
+    changed = write_obo(path)
+    click.echo(f'{"updated" if changed else "unchanged"} {path}')
 
     if check:
         import obonet
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""Export the Curation of Neurodegeneration Supporting Ontology (CONSO) to OBO Graphs JSON.
+
+The terms, synonyms, and cross-references tables are all sorted by CONSO identifier, so they're merge-joined as
+streams and each node is written as soon as it's complete. Edges come straight from ``relations.tsv``. Memory
+use doesn't depend on the size of the terminology.
+
+The JSON Lines variant writes one node or edge object per line. Nodes have an ``id`` key and edges have a
+``sub`` key, so the file can be split and ingested in parallel.
+"""
+
+import itertools as itt
+import json
+import os
+from typing import Any, Dict, Iterable, List, Mapping, TextIO
+
+import click
+
+from .manifest import count_terms, update_manifest, write_if_changed
+from ..resources import RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, TYPEDEF_PATH, XREFS_PATH
+from ..resources.constants import CONSO
+from ..utils import GroupedRows, iterate_rows
+
+__all__ = [
+    'iterate_nodes',
+    'iterate_edges',
+    'write_obograph',
+    'write_obograph_lines',
+    'obograph',
+]
+
+GRAPH_ID = 'https://raw.githubusercontent.com/pharmacome/conso/master/export/conso.json'
+OIO = 'http://www.geneontology.org/formats/oboInOwl#'
+SYNONYM_PREDICATES = {
+    'EXACT': 'hasExactSynonym',
+    'BROAD': 'hasBroadSynonym',
+    'NARROW': 'hasNarrowSynonym',
+    'RELATED': 'hasRelatedSynonym',
+    '?': 'hasExactSynonym',
+}
+
+
+def _split_references(references: str) -> List[str]:
+    return [
+        reference.strip()
+        for reference in references.split(',')
+        if reference.strip() and reference.strip() not in {'?', '.'}
+    ]
+
+
+def _curie(namespace: str, identifier: str) -> str:
+    return f'{namespace}:{identifier}'
+
+
+def iterate_nodes() -> Iterable[Dict[str, Any]]:
+    """Iterate over the OBO Graphs nodes for the typedefs and terms."""
+    for identifier, name, namespace, xrefs, transitive, comment in iterate_rows(TYPEDEF_PATH):
+        meta: Dict[str, Any] = {}
+        if comment:
+            meta['comments'] = [comment]
+        if xrefs:
+            meta['xrefs'] = [{'val': xref} for xref in _split_references(xrefs)]
+        properties = []
+        if namespace:
+            properties.append({'pred': f'{OIO}hasOBONamespace', 'val': namespace})
+        if transitive == 'true':
+            properties.append({'pred': f'{OIO}is_transitive', 'val': 'true'})
+        if properties:
+            meta['basicPropertyValues'] = properties
+        node = {'id': _curie(CONSO, identifier), 'lbl': name, 'type': 'PROPERTY'}
+        if meta:
+            node['meta'] = meta
+        yield node
+
+    synonyms = GroupedRows(iterate_rows(SYNONYMS_PATH))
+    xrefs = GroupedRows(iterate_rows(XREFS_PATH))
+    for identifier, author, name, cls, references, description in iterate_rows(TERMS_PATH):
+        if name == 'WITHDRAWN':
+            yield {'id': _curie(CONSO, identifier), 'type': 'CLASS', 'meta': {'deprecated': True}}
+            continue
+
+        properties = [
+            {'pred': f'{OIO}hasOBONamespace', 'val': cls},
+            {'pred': f'{OIO}created_by', 'val': f'orcid:{author}'},
+        ]
+        xref_values = []
+        for _, database, database_identifier in xrefs.pop(identifier):
+            if database.lower() == 'bel':
+                properties.append({'pred': _curie(CONSO, 'bel'), 'val': database_identifier})
+            else:
+                xref_values.append({'val': _curie(database, database_identifier)})
+
+        meta: Dict[str, Any] = {
+            'definition': {'val': description, 'xrefs': _split_references(references)},
+        }
+        synonym_values = [
+            {'pred': SYNONYM_PREDICATES.get(specificity, 'hasExactSynonym'), 'val': synonym,
+             'xrefs': _split_references(reference)}
+            for _, synonym, reference, specificity in synonyms.pop(identifier)
+        ]
+        if synonym_values:
+            meta['synonyms'] = synonym_values
+        if xref_values:
+            meta['xrefs'] = xref_values
+        meta['basicPropertyValues'] = properties
+
+        yield {'id': _curie(CONSO, identifier), 'lbl': name, 'type': 'CLASS', 'meta': meta}
+
+
+def iterate_edges() -> Iterable[Mapping[str, str]]:
+    """Iterate over the OBO Graphs edges from the relations table."""
+    for source_ns, source_id, _, relation, target_ns, target_id, _ in iterate_rows(RELATIONS_PATH):
+        yield {
+            'sub': _curie(source_ns, source_id),
+            'pred': relation if relation == 'is_a' else _curie(CONSO, relation),
+            'obj': _curie(target_ns, target_id),
+        }
+
+
+def _write_array(file: TextIO, key: str, items: Iterable[Mapping[str, Any]]) -> None:
+    file.write(f'"{key}":[')
+    for i, item in enumerate(items):
+        if i:
+            file.write(',')
+        file.write('\n')
+        json.dump(item, file, ensure_ascii=False)
+    file.write('\n]')
+
+
+def write_obograph(file: TextIO) -> None:
+    """Write CONSO as an OBO Graphs JSON document, one node or edge at a time."""
+    file.write('{"graphs":[{')
+    file.write(f'"id":{json.dumps(GRAPH_ID)},')
+    file.write('"meta":{"basicPropertyValues":[{"pred":"http://purl.org/dc/elements/1.1/title",')
+    file.write('"val":"Curation of Neurodegeneration Supporting Ontology"}]},')
+    _write_array(file, 'nodes', iterate_nodes())
+    file.write(',')
+    _write_array(file, 'edges', iterate_edges())
+    file.write('}]}\n')
+
+
+def write_obograph_lines(file: TextIO) -> None:
+    """Write the OBO Graphs nodes and edges as JSON Lines."""
+    for item in itt.chain(iterate_nodes(), iterate_edges()):
+        json.dump(item, file, ensure_ascii=False)
+        file.write('\n')
+
+
+@click.command()
+@click.argument('path')
+@click.option('--lines', is_flag=True, help='Write JSON Lines with one node or edge per line')
+def obograph(path: str, lines: bool):
+    """Export CONSO as OBO Graphs JSON."""
+    write = write_obograph_lines if lines else write_obograph
+
+    def _write(temporary_path: str) -> None:
+        with open(temporary_path, 'w') as file:
+            write(file)
+
+    changed = write_if_changed(path, _write)
+    click.echo(f'{"updated" if changed else "unchanged"} {path}')
+    update_manifest(os.path.dirname(path), 'obograph', [path], terms=count_terms())
+
+
+if __name__ == '__main__':
+    obograph()
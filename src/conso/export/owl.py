@@ -2,15 +2,16 @@
 
 """Export CONSO to OWL."""
 
-import csv
+import os
 import types
-from typing import Dict, Type
+from typing import Dict, Optional, Type
 
 import click
-import pandas as pd
 from owlready2 import AnnotationProperty, Namespace, Ontology, Thing, get_ontology
 
+from .manifest import count_terms, update_manifest, write_if_changed
 from ..resources import CLASSES_PATH, SYNONYMS_PATH, TERMS_PATH, XREFS_PATH
+from ..utils import Tables, get_rows
 
 CONSO = 'CONSO'
 URL = 'https://raw.githubusercontent.com/pharmacome/conso/master/export/conso.owl'
@@ -20,8 +21,11 @@ URL = 'https://raw.githubusercontent.com/pharmacome/conso/master/export/conso.ow
 # DC_SHORT = 'CONSO'
 
 
-def get_owl() -> Ontology:
-    """Get classes."""
+def get_owl(tables: Optional[Tables] = None) -> Ontology:
+    """Get classes.
+
+    :param tables: The classes, terms, synonyms, and cross-references tables, if they were already read
+    """
     ontology = get_ontology(URL)
 
     skos: Namespace = ontology.get_namespace('http://www.w3.org/2008/05/skos', 'skos')
@@ -43,10 +47,9 @@ def get_owl() -> Ontology:
         class bel(AnnotationProperty):  # noqa: N801
             """Denotes the BEL term corresponding to a given entry."""
 
-    classes_df = pd.read_csv(CLASSES_PATH, sep='\t')
     super_classes = {}
     with ontology:
-        for i, (name, _encoding) in classes_df.iterrows():
+        for i, (name, _encoding) in enumerate(get_rows(tables, 'classes', CLASSES_PATH)):
             super_classes[name] = cls = types.new_class(
                 name=f'{CONSO}C{i}',
                 bases=(Thing,),
@@ -56,12 +59,9 @@ def get_owl() -> Ontology:
     # authors_df = pd.read_csv(AUTHORS_PATH, sep='\t')
     # authors = dict(authors_df[['ORCID', 'Name']].values)
 
-    with open(TERMS_PATH) as file, ontology:
-        reader = csv.reader(file, delimiter='\t')
-        _ = next(reader)  # skip the header
-
+    with ontology:
         classes: Dict[str, Type[Thing]] = {}
-        for conso_id, orcid, name, super_cls_name, references, definition in reader:
+        for conso_id, orcid, name, super_cls_name, references, definition in get_rows(tables, 'terms', TERMS_PATH):
             if name == 'WITHDRAWN':
                 continue
 
@@ -72,19 +72,20 @@ def get_owl() -> Ontology:
             cls.label = name
             cls.comment = definition
             cls.author = f'orcid:{orcid}'
-            cls.related = [reference.strip() for reference in references.split(',')]
+            # appended one at a time since owlready2 adds the new values of a list from a set, which would
+            # make the order in the output depend on the hash seed
+            for reference in references.split(','):
+                cls.related.append(reference.strip())
             classes[conso_id] = cls
 
-    xrefs_df = pd.read_csv(XREFS_PATH, sep='\t')
-    for _, (identifier, database, database_identifier) in xrefs_df.iterrows():
+    for identifier, database, database_identifier in get_rows(tables, 'xrefs', XREFS_PATH):
         cls = classes[identifier]
         if database == 'BEL':
             cls.bel = database_identifier
         else:
             cls.related.append(f'{database}:{database_identifier}')
 
-    synonyms_df = pd.read_csv(SYNONYMS_PATH, sep='\t')
-    for _, (identifier, synonym, reference, _) in synonyms_df.iterrows():
+    for identifier, synonym, reference, _ in get_rows(tables, 'synonyms', SYNONYMS_PATH):
         cls = classes[identifier]
         cls.altLabel.append(synonym)
         related[cls, altLabel, synonym] = reference
@@ -92,11 +93,24 @@ def get_owl() -> Ontology:
     return ontology
 
 
+def write_owl(path: str, tables: Optional[Tables] = None) -> bool:
+    """Write the OWL export and list it in the manifest of its directory.
+
+    :param path: The path of the OWL file
+    :param tables: The tables used by :func:`get_owl`, if they were already read
+    :returns: If the file was replaced
+    """
+    changed = write_if_changed(path, get_owl(tables).save)
+    update_manifest(os.path.dirname(path), 'owl', [path], terms=count_terms(tables))
+    return changed
+
+
 @click.command()
 @click.argument('path')
 def owl(path: str):
     """Export CONSO as OWL."""
-    get_owl().save(path)
+    changed = write_owl(path)
+    click.echo(f'{"updated" if changed else "unchanged"} {path}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""Export the Curation of Neurodegeneration Supporting Ontology (CONSO) to Parquet and Arrow.
+
+Each resource table is written with an explicit schema, so consumers don't depend on pandas' type inference,
+and low-cardinality columns like ``Type``, ``database``, ``specificity``, and ``Relation`` are dictionary
+encoded. Rows are sorted by all columns, so the output is stable between runs.
+"""
+
+import os
+from functools import partial
+from typing import Mapping
+
+import click
+import pandas as pd
+
+from .manifest import count_terms, update_manifest, write_if_changed
+from ..resources import (
+    AUTHORS_PATH, CLASSES_PATH, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, TYPEDEF_PATH, XREFS_PATH,
+)
+
+__all__ = [
+    'get_schemas',
+    'get_arrow_table',
+    'write_parquet',
+    'parquet',
+]
+
+#: The tables that get exported and their resource paths
+TABLES: Mapping[str, str] = {
+    'authors': AUTHORS_PATH,
+    'classes': CLASSES_PATH,
+    'typedefs': TYPEDEF_PATH,
+    'terms': TERMS_PATH,
+    'synonyms': SYNONYMS_PATH,
+    'xrefs': XREFS_PATH,
+    'relations': RELATIONS_PATH,
+}
+
+
+def get_schemas():
+    """Get the Arrow schema for each table."""
+    import pyarrow as pa
+
+    string = pa.string()
+    category = pa.dictionary(pa.int32(), pa.string())
+    return {
+        'authors': pa.schema([('ORCID', string), ('Name', string)]),
+        'classes': pa.schema([('Class Name', string), ('BEL Encoding', category)]),
+        'typedefs': pa.schema([
+            ('Identifier', string),
+            ('Name', string),
+            ('Namespace', category),
+            ('Xrefs', string),
+            ('Transitive', pa.bool_()),
+            ('Comment', string),
+        ]),
+        'terms': pa.schema([
+            ('Identifier', string),
+            ('Author', category),
+            ('Name', string),
+            ('Type', category),
+            ('References', string),
+            ('Description', string),
+        ]),
+        'synonyms': pa.schema([
+            ('identifier', string),
+            ('synonym', string),
+            ('reference', string),
+            ('specificity', category),
+        ]),
+        'xrefs': pa.schema([
+            ('identifier', string),
+            ('database', category),
+            ('database_identifier', string),
+        ]),
+        'relations': pa.schema([
+            ('Source Namespace', category),
+            ('Source Identifier', string),
+            ('Source Name', string),
+            ('Relation', category),
+            ('Target Namespace', category),
+            ('Target Identifier', string),
+            ('Target Name', string),
+        ]),
+    }
+
+
+def get_arrow_table(name: str, schema=None):
+    """Read a resource table into Arrow with its explicit schema, sorted by all columns."""
+    import pyarrow as pa
+
+    schema = schema or get_schemas()[name]
+    df = pd.read_csv(TABLES[name], sep='\t', dtype=str, keep_default_na=False)
+    df = df.apply(lambda column: column.str.strip())
+    df = df.sort_values(list(df.columns), kind='mergesort', ignore_index=True)
+    for field in schema:
+        if pa.types.is_boolean(field.type):
+            df[field.name] = df[field.name] == 'true'
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def write_parquet(directory: str, arrow: bool = False) -> Mapping[str, Mapping[str, bool]]:
+    """Write each table as Parquet (and optionally as uncompressed Arrow IPC, which can be memory-mapped).
+
+    Each file is written to a temporary file first and only replaces the existing one if it changed, so an
+    interrupted export never leaves a truncated file behind. The files are listed in the manifest.
+
+    :returns: A mapping from table names to the paths written for them, and whether each was replaced
+    """
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    os.makedirs(directory, exist_ok=True)
+    rv = {}
+    for name, schema in get_schemas().items():
+        table = get_arrow_table(name, schema)
+        path = os.path.join(directory, f'{name}.parquet')
+        rv[name] = {path: write_if_changed(path, partial(pyarrow.parquet.write_table, table))}
+        if arrow:
+            path = os.path.join(directory, f'{name}.arrow')
+            rv[name][path] = write_if_changed(
+                path, partial(pyarrow.feather.write_feather, table, compression='uncompressed'),
+            )
+    update_manifest(directory, 'parquet', [path for paths in rv.values() for path in paths], terms=count_terms())
+    return rv
+
+
+@click.command()
+@click.argument('directory')
+@click.option('--arrow', is_flag=True, help='Also write uncompressed Arrow IPC files for memory mapping')
+def parquet(directory: str, arrow: bool):
+    """Export CONSO as Parquet."""
+    for paths in write_parquet(directory, arrow=arrow).values():
+        for path, changed in paths.items():
+            click.echo(f'{"updated" if changed else "unchanged"} {path}')
+
+
+if __name__ == '__main__':
+    parquet()
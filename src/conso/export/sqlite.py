@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+
+"""Export the Curation of Neurodegeneration Supporting Ontology (CONSO) to SQLite.
+
+Every resource table becomes a table in the database, with indexes on the columns used for lookups, and
+there's an FTS5 full-text index over the names, synonyms, and descriptions of the terms. Everything is bulk
+loaded in a single transaction before the indexes are built.
+"""
+
+import os
+import sqlite3
+from collections import defaultdict
+from typing import Iterable, List, Tuple
+
+import click
+
+from .manifest import count_terms, update_manifest, write_if_changed
+from ..resources import AUTHORS_PATH, CLASSES_PATH, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, XREFS_PATH
+from ..utils import iterate_rows
+
+__all__ = [
+    'write_sqlite',
+    'sqlite',
+]
+
+SCHEMA = """
+CREATE TABLE authors (
+    orcid TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE classes (
+    name TEXT PRIMARY KEY,
+    bel_encoding TEXT NOT NULL
+);
+CREATE TABLE terms (
+    identifier TEXT PRIMARY KEY,
+    author TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    "references" TEXT NOT NULL,
+    description TEXT NOT NULL
+);
+CREATE TABLE synonyms (
+    identifier TEXT NOT NULL,
+    synonym TEXT NOT NULL,
+    reference TEXT NOT NULL,
+    specificity TEXT NOT NULL
+);
+CREATE TABLE xrefs (
+    identifier TEXT NOT NULL,
+    database TEXT NOT NULL,
+    database_identifier TEXT NOT NULL
+);
+CREATE TABLE relations (
+    source_namespace TEXT NOT NULL,
+    source_identifier TEXT NOT NULL,
+    source_name TEXT NOT NULL,
+    relation TEXT NOT NULL,
+    target_namespace TEXT NOT NULL,
+    target_identifier TEXT NOT NULL,
+    target_name TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE terms_fts USING fts5(
+    identifier UNINDEXED,
+    name,
+    synonyms,
+    description,
+    prefix = '2 3 4'
+);
+"""
+
+INDEXES = """
+CREATE INDEX ix_terms_name ON terms (name);
+CREATE INDEX ix_terms_type ON terms (type);
+CREATE INDEX ix_synonyms_identifier ON synonyms (identifier);
+CREATE INDEX ix_synonyms_synonym ON synonyms (synonym);
+CREATE INDEX ix_xrefs_identifier ON xrefs (identifier);
+CREATE INDEX ix_xrefs_database ON xrefs (database, database_identifier);
+CREATE INDEX ix_relations_source ON relations (source_namespace, source_identifier);
+CREATE INDEX ix_relations_target ON relations (target_namespace, target_identifier);
+CREATE INDEX ix_relations_relation ON relations (relation);
+"""
+
+#: The tables loaded from the resources, their paths, and their number of columns
+TABLES: List[Tuple[str, str, int]] = [
+    ('authors', AUTHORS_PATH, 2),
+    ('classes', CLASSES_PATH, 2),
+    ('terms', TERMS_PATH, 6),
+    ('synonyms', SYNONYMS_PATH, 4),
+    ('xrefs', XREFS_PATH, 3),
+    ('relations', RELATIONS_PATH, 7),
+]
+
+
+def _iterate_stripped_rows(path: str) -> Iterable[List[str]]:
+    for line in iterate_rows(path):
+        yield [column.strip() for column in line]
+
+
+def _iterate_fts_rows() -> Iterable[Tuple[str, str, str, str]]:
+    synonyms = defaultdict(list)
+    for identifier, synonym, _, _ in _iterate_stripped_rows(SYNONYMS_PATH):
+        synonyms[identifier].append(synonym)
+
+    for identifier, _, name, _, _, description in _iterate_stripped_rows(TERMS_PATH):
+        if name == 'WITHDRAWN':
+            continue
+        yield identifier, name, '\n'.join(synonyms[identifier]), description
+
+
+def _write_database(path: str) -> None:
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript('PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;')
+        connection.executescript(SCHEMA)
+        with connection:  # a single transaction for the whole bulk load
+            for table, table_path, n_columns in TABLES:
+                placeholders = ', '.join('?' * n_columns)
+                query = f'INSERT INTO {table} VALUES ({placeholders})'  # noqa: S608
+                connection.executemany(query, _iterate_stripped_rows(table_path))
+            connection.executemany('INSERT INTO terms_fts VALUES (?, ?, ?, ?)', _iterate_fts_rows())
+        connection.executescript(INDEXES)
+        connection.execute("INSERT INTO terms_fts(terms_fts) VALUES ('optimize')")
+        connection.commit()
+        connection.execute('VACUUM')
+    finally:
+        connection.close()
+
+
+def write_sqlite(path: str) -> bool:
+    """Write CONSO to a SQLite database, replacing it atomically if it already exists and changed.
+
+    :returns: If the database was replaced
+    """
+    return write_if_changed(path, _write_database)
+
+
+@click.command()
+@click.argument('path')
+def sqlite(path: str):
+    """Export CONSO as a SQLite database."""
+    changed = write_sqlite(path)
+    click.echo(f'{"updated" if changed else "unchanged"} {path}')
+    update_manifest(os.path.dirname(path), 'sqlite', [path], terms=count_terms())
+
+
+if __name__ == '__main__':
+    sqlite()
@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+
+"""Verify that the exported artifacts agree with the resources.
+
+Each artifact is parsed as a stream, one term at a time, into a record of the fields it carries, like the
+name, class, synonyms, cross-references, and relations. The records expected from the resources are built
+by merge-joining the sorted resource tables, and only a fixed-size digest of each is kept, so memory use
+depends on the number of terms and not on the size of the artifact. Each parsed record's digest is compared
+to the expected one, and only the terms that differ are compared field by field to report exactly what's
+missing from or extra in the artifact.
+
+The artifacts are verified in parallel, one per process.
+"""
+
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+import xml.etree.ElementTree as ElementTree
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+import click
+
+from ..mapping import BinaryMapping
+from ..resolve import normalize_xref
+from ..resources import CLASSES_PATH, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, TYPEDEF_PATH, XREFS_PATH
+from ..resources.constants import CONSO
+from ..utils import GroupedRows, iterate_rows
+
+__all__ = [
+    'Discrepancy',
+    'Report',
+    'ARTIFACTS',
+    'verify_artifact',
+    'verify',
+]
+
+Record = Mapping[str, FrozenSet[str]]
+
+#: The errors raised by the parsers for artifacts that are corrupt or in an unexpected layout
+PARSE_ERRORS = (ValueError, SyntaxError, IndexError, KeyError, struct.error)
+
+RDF = '{http://www.w3.org/1999/02/22-rdf-syntax-ns#}'
+RDFS = '{http://www.w3.org/2000/01/rdf-schema#}'
+OWL = '{http://www.w3.org/2002/07/owl#}'
+SKOS = '{http://www.w3.org/2008/05/skos#}'
+OWL_TERM = re.compile(r'^#(?P<identifier>CONSO\d+)$')
+OWL_CLASS = re.compile(r'^#CONSOC\d+$')
+
+#: The relations that are written as relationships to OBO with external identifiers, by their lowercase CURIEs
+OBO_RELATIONS = {'bfo:0000050': 'part_of', 'ro:0000087': 'has_role'}
+OBO_SYNONYM = re.compile(r'^"(?P<synonym>(?:[^"\\]|\\.)*)"')
+OBO_ESCAPE = re.compile(r'\\(.)')
+OBO_ESCAPES = {'W': ' ', 't': '\t', 'n': '\n'}
+NON_WORD = re.compile(r'\W+')
+
+
+class Discrepancy(NamedTuple):
+    """A value that's missing from or extra in an artifact."""
+
+    #: The identifier of the term, or its name for the names namespace. Empty if the artifact couldn't be parsed.
+    key: str
+    #: The field that differs, ``term`` if the whole term is missing or extra, or ``file`` if the artifact
+    #: couldn't be parsed
+    field: str
+    #: Either ``missing``, ``extra``, or ``could not parse``
+    kind: str
+    value: str
+
+
+class Report(NamedTuple):
+    """The result of verifying one artifact."""
+
+    artifact: str
+    #: The number of terms parsed from the artifact
+    n_terms: int
+    #: The number of terms that differ from the resources, are missing, or are extra
+    n_discrepant: int
+    #: The discrepancies of up to the limit of differing terms
+    discrepancies: List[Discrepancy]
+
+
+class _Term(NamedTuple):
+    identifier: str
+    name: str
+    cls: str
+    references: str
+    synonyms: List[Tuple[str, ...]]
+    xrefs: List[Tuple[str, ...]]
+    relations: List[Tuple[str, ...]]
+
+
+def _iterate_terms() -> Iterable[_Term]:
+    """Iterate over the terms that aren't withdrawn, with their synonyms, xrefs, and outgoing relations."""
+    synonyms = GroupedRows(iterate_rows(SYNONYMS_PATH))
+    xrefs = GroupedRows(iterate_rows(XREFS_PATH))
+    relations = GroupedRows((row for row in iterate_rows(RELATIONS_PATH) if row[0] == CONSO), column=1)
+    for identifier, _, name, cls, references, _ in iterate_rows(TERMS_PATH):
+        if name == 'WITHDRAWN':
+            continue
+        yield _Term(
+            identifier, name, cls, references,
+            synonyms.pop(identifier), xrefs.pop(identifier), relations.pop(identifier),
+        )
+
+
+def _sort_encoding(encoding: str) -> str:
+    """Sort the letters of a BEL encoding, since their order doesn't matter."""
+    return ''.join(sorted(encoding))
+
+
+def _get_encodings() -> Mapping[str, str]:
+    return {cls: _sort_encoding(encoding) for cls, encoding in iterate_rows(CLASSES_PATH)}
+
+
+def _get_digest(record: Record) -> bytes:
+    rv = hashlib.blake2b(digest_size=16)
+    for field in sorted(record):
+        rv.update(field.encode('utf-8') + b'\x1e')
+        for value in sorted(record[field]):
+            rv.update(value.encode('utf-8') + b'\x1f')
+    return rv.digest()
+
+
+def _xref(database: str, identifier: str) -> str:
+    return '{}:{}'.format(*normalize_xref(database, identifier))
+
+
+# Expected records
+
+
+def _expected_belns() -> Iterable[Tuple[str, Record]]:
+    encodings = _get_encodings()
+    for term in _iterate_terms():
+        yield term.identifier, {'class': frozenset([encodings[term.cls]])}
+
+
+def _expected_belns_names() -> Iterable[Tuple[str, Record]]:
+    encodings = _get_encodings()
+    for term in _iterate_terms():
+        yield term.name, {'class': frozenset([encodings[term.cls]])}
+
+
+def _expected_mapping() -> Iterable[Tuple[str, Record]]:
+    for term in _iterate_terms():
+        yield term.identifier, {'name': frozenset([term.name])}
+
+
+def _expected_owl() -> Iterable[Tuple[str, Record]]:
+    for term in _iterate_terms():
+        related = {reference.strip() for reference in term.references.split(',')}
+        related.update(f'{database}:{identifier}' for _, database, identifier in term.xrefs if database != 'BEL')
+        yield term.identifier, {
+            'name': frozenset([term.name]),
+            'class': frozenset([term.cls]),
+            'synonyms': frozenset(synonym for _, synonym, _, _ in term.synonyms),
+            'xrefs': frozenset(related),
+        }
+
+
+def _get_obo_relations() -> Set[str]:
+    """Get the relations that the OBO export can write, like in :func:`conso.export.obo.get_content`."""
+    rv = {'is_a', 'part_of', 'has_role'}
+    rv.update(line[0] for line in iterate_rows(TYPEDEF_PATH))
+    rv.discard('bel')
+    return rv
+
+
+def _get_obo_namespace(cls: str) -> str:
+    """Get the OBO namespace for a class, which only has word characters (so it's empty for ``?``)."""
+    return NON_WORD.sub('_', cls).strip('_')
+
+
+def _expected_obo() -> Iterable[Tuple[str, Record]]:
+    handled_relations = _get_obo_relations()
+    for term in _iterate_terms():
+        namespace = _get_obo_namespace(term.cls)
+        yield term.identifier, {
+            'name': frozenset([term.name]),
+            'class': frozenset([namespace] if namespace else []),
+            'synonyms': frozenset(synonym for _, synonym, _, _ in term.synonyms),
+            'xrefs': frozenset(
+                _xref(database, identifier)
+                for _, database, identifier in term.xrefs
+                if database.lower() != 'bel'
+            ),
+            'relations': frozenset(
+                f'{relation} {_xref(target_namespace, target_identifier)}'
+                for _, _, _, relation, target_namespace, target_identifier, _ in term.relations
+                if relation in handled_relations
+            ),
+        }
+
+
+# Parsed records
+
+
+def _parse_belns(path: str) -> Iterable[Tuple[str, Record]]:
+    delimiter = '|'
+    with open(path) as file:
+        for line in file:
+            if line.startswith('DelimiterString='):
+                delimiter = line.strip()[len('DelimiterString='):]
+            elif line.startswith('[Values]'):
+                break
+        for line in file:
+            line = line.rstrip('\n')
+            if line:
+                value, _, encoding = line.rpartition(delimiter)
+                yield value, {'class': frozenset([_sort_encoding(encoding)])}
+
+
+def _parse_mapping(path: str) -> Iterable[Tuple[str, Record]]:
+    """Parse a JSON mapping one line at a time.
+
+    This relies on the mapping being written by :mod:`conso.export.belns`, with one entry per line. The same
+    JSON in any other layout fails to parse and is reported as such.
+    """
+    with open(path) as file:
+        for line in file:
+            line = line.strip().rstrip(',')
+            if line in {'{', '}', ''}:
+                continue
+            for identifier, name in json.loads(f'{{{line}}}').items():
+                yield identifier, {'name': frozenset([name])}
+
+
+def _parse_binary_mapping(path: str) -> Iterable[Tuple[str, Record]]:
+    with BinaryMapping(path) as mapping:
+        for identifier, name in mapping.items():
+            yield identifier, {'name': frozenset([name])}
+
+
+def _parse_owl(path: str) -> Iterable[Tuple[str, Record]]:
+    class_labels = {}
+    events = ElementTree.iterparse(path, events=('start', 'end'))
+    _, root = next(events)
+    depth = 1
+    for event, element in events:
+        if event == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+        about = element.get(f'{RDF}about', '')
+        if element.tag == f'{OWL}Class' and OWL_CLASS.match(about):
+            class_labels[about] = element.findtext(f'{RDFS}label')
+        elif element.tag == f'{OWL}Class' and OWL_TERM.match(about):
+            parents = [child.get(f'{RDF}resource') for child in element.iter(f'{RDFS}subClassOf')]
+            yield OWL_TERM.match(about).group('identifier'), {
+                'name': frozenset(child.text or '' for child in element.iter(f'{RDFS}label')),
+                'class': frozenset(class_labels.get(parent, parent) for parent in parents),
+                'synonyms': frozenset(child.text or '' for child in element.iter(f'{SKOS}altLabel')),
+                'xrefs': frozenset(child.text or '' for child in element.iter(f'{SKOS}related')),
+            }
+        root.clear()
+
+
+def _unescape_obo(value: str) -> str:
+    return OBO_ESCAPE.sub(lambda match: OBO_ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def _parse_obo_target(value: str) -> str:
+    target = value.split(' !', 1)[0].strip()
+    database, _, identifier = target.partition(':')
+    return _xref(database, identifier)
+
+
+def _parse_obo(path: str) -> Iterable[Tuple[str, Record]]:
+    identifier: Optional[str] = None
+    record: Dict[str, Set[str]] = {}
+    is_term = False
+    with open(path) as file:
+        for line in file:
+            line = line.rstrip('\n')
+            if line.startswith('['):
+                if identifier is not None:
+                    yield identifier, {field: frozenset(values) for field, values in record.items()}
+                identifier = None
+                record = {'name': set(), 'class': set(), 'synonyms': set(), 'xrefs': set(), 'relations': set()}
+                is_term = line == '[Term]'
+                continue
+            tag, _, value = line.partition(': ')
+            if not is_term:
+                continue
+            if tag == 'id':
+                identifier = value[len(f'{CONSO}:'):] if value.startswith(f'{CONSO}:') else value
+            elif tag == 'name':
+                record['name'].add(value)
+            elif tag == 'namespace':
+                record['class'].add(value)
+            elif tag == 'synonym':
+                match = OBO_SYNONYM.match(value)
+                if match is not None:
+                    record['synonyms'].add(match.group('synonym').replace('\\"', '"'))
+            elif tag == 'xref':
+                record['xrefs'].add(_parse_obo_target(_unescape_obo(value.split(' "', 1)[0])))
+            elif tag == 'is_a':
+                record['relations'].add(f'is_a {_parse_obo_target(value)}')
+            elif tag == 'relationship':
+                predicate, _, target = value.partition(' ')
+                if predicate.startswith(f'{CONSO}:'):
+                    relation = predicate[len(f'{CONSO}:'):]
+                else:
+                    relation = OBO_RELATIONS.get(predicate.lower(), predicate)
+                if relation != 'author':
+                    record['relations'].add(f'{relation} {_parse_obo_target(target)}')
+    if identifier is not None:
+        yield identifier, {field: frozenset(values) for field, values in record.items()}
+
+
+class Artifact(NamedTuple):
+    """How to parse an artifact and build the records it should contain."""
+
+    parse: Callable[[str], Iterable[Tuple[str, Record]]]
+    iterate_expected: Callable[[], Iterable[Tuple[str, Record]]]
+
+
+#: The artifacts that can be verified, by their file names in the export directory
+ARTIFACTS: Mapping[str, Artifact] = {
+    'conso.belns': Artifact(_parse_belns, _expected_belns),
+    'conso-names.belns': Artifact(_parse_belns, _expected_belns_names),
+    'conso.belns.mapping': Artifact(_parse_mapping, _expected_mapping),
+    'conso.belns.mapping.bin': Artifact(_parse_binary_mapping, _expected_mapping),
+    'conso.obo': Artifact(_parse_obo, _expected_obo),
+    'conso.owl': Artifact(_parse_owl, _expected_owl),
+}
+
+
+def verify_artifact(path: str, name: Optional[str] = None, limit: int = 20) -> Report:
+    """Verify an artifact against the resources.
+
+    :param path: The path to the artifact
+    :param name: The key of the artifact in :data:`ARTIFACTS`. Defaults to the file name of the path.
+    :param limit: The maximum number of differing terms whose discrepancies are reported
+    """
+    name = name or os.path.basename(path)
+    artifact = ARTIFACTS[name]
+    expected = {key: _get_digest(record) for key, record in artifact.iterate_expected()}
+
+    n_terms = n_discrepant = 0
+    discrepancies = []
+    mismatched: Dict[str, Record] = {}
+    try:
+        for key, record in artifact.parse(path):
+            n_terms += 1
+            digest = expected.pop(key, None)
+            if digest == _get_digest(record):
+                continue
+            n_discrepant += 1
+            if n_discrepant > limit:
+                continue
+            if digest is None:
+                discrepancies.append(Discrepancy(key, 'term', 'extra', ''))
+            else:
+                mismatched[key] = record
+    except PARSE_ERRORS as e:
+        return Report(name, n_terms, n_discrepant + 1, [Discrepancy('', 'file', 'could not parse', f'{e}')])
+
+    for key in expected:
+        n_discrepant += 1
+        if n_discrepant <= limit:
+            discrepancies.append(Discrepancy(key, 'term', 'missing', ''))
+
+    if mismatched:
+        for key, expected_record in artifact.iterate_expected():
+            record = mismatched.pop(key, None)
+            if record is None:
+                continue
+            for field in sorted(set(record) | set(expected_record)):
+                values, expected_values = record.get(field, frozenset()), expected_record.get(field, frozenset())
+                discrepancies.extend(
+                    Discrepancy(key, field, 'missing', value) for value in sorted(expected_values - values)
+                )
+                discrepancies.extend(
+                    Discrepancy(key, field, 'extra', value) for value in sorted(values - expected_values)
+                )
+
+    return Report(name, n_terms, n_discrepant, sorted(discrepancies))
+
+
+def _verify_artifact(args: Tuple[str, str, int]) -> Report:
+    return verify_artifact(*args)
+
+
+@click.command()
+@click.argument('directory', type=click.Path(exists=True, file_okay=False))
+@click.option('--limit', type=int, default=20, show_default=True,
+              help='Maximum number of differing terms to report for each artifact')
+@click.option('--workers', type=int, help='Number of processes. Defaults to one per artifact.')
+def verify(directory: str, limit: int, workers: Optional[int]):
+    """Verify that the exported artifacts in DIRECTORY agree with the resources."""
+    tasks = []
+    for name in ARTIFACTS:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            tasks.append((path, name, limit))
+        else:
+            click.echo(f'{name}: not found, skipping')
+
+    with ProcessPoolExecutor(max_workers=workers or max(1, min(len(tasks), os.cpu_count() or 1))) as executor:
+        reports = list(executor.map(_verify_artifact, tasks))
+
+    for report in reports:
+        click.secho(
+            f'{report.artifact}: {report.n_terms} terms, {report.n_discrepant} with discrepancies',
+            fg='red' if report.n_discrepant else 'green',
+        )
+        for discrepancy in report.discrepancies:
+            click.echo('\t'.join((report.artifact, *discrepancy)))
+
+    if any(report.n_discrepant for report in reports):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    verify()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+"""Membership indexes for the external BEL namespaces in the ``external/`` directory.
+
+Each namespace is compiled once into a sorted, fixed-width NumPy array that gets memory-mapped and queried with
+vectorized binary search, so checking thousands of identifiers doesn't require loading the namespace into a set.
+An index is only rebuilt when the namespace's ``.md5`` file (or, if it has none, its content) changes.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Any, BinaryIO, Callable, Iterable, Optional
+
+import numpy as np
+
+from .resources import EXTERNAL_DIRECTORY
+
+__all__ = [
+    'INDEX_DIRECTORY',
+    'get_namespace_path',
+    'get_index',
+    'contains',
+]
+
+INDEX_DIRECTORY = os.path.join(EXTERNAL_DIRECTORY, '.index')
+
+
+def get_namespace_path(keyword: str, names: bool = False) -> Optional[str]:
+    """Get the path to the local BEL namespace for the given keyword, if it exists."""
+    keyword = keyword.lower()
+    path = os.path.join(EXTERNAL_DIRECTORY, f'{keyword}-names.belns' if names else f'{keyword}.belns')
+    if os.path.exists(path):
+        return path
+    return None
+
+
+def _iterate_values(path: str) -> Iterable[str]:
+    """Iterate over the values in a BEL namespace file."""
+    delimiter = '|'
+    with open(path) as file:
+        for line in file:
+            if line.startswith('DelimiterString='):
+                delimiter = line.strip()[len('DelimiterString='):]
+            elif line.startswith('[Values]'):
+                break
+        for line in file:
+            line = line.rstrip('\n')
+            if line:
+                yield line.rsplit(delimiter, 1)[0]
+
+
+def _get_source_hash(path: str) -> str:
+    md5_path = f'{path}.md5'
+    if os.path.exists(md5_path):
+        with open(md5_path) as file:
+            return file.read().strip()
+
+    md5 = hashlib.md5()  # noqa: S303
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def get_index(path: str, directory: Optional[str] = None) -> np.ndarray:
+    """Get a sorted, memory-mapped array of the values in the given BEL namespace, building it if necessary.
+
+    :param path: The path to a BEL namespace file
+    :param directory: The directory in which the indexes are stored. Defaults to :data:`INDEX_DIRECTORY`.
+    :returns: A read-only array of UTF-8 encoded values with a fixed-width bytes dtype
+    """
+    directory = directory or INDEX_DIRECTORY
+    name = os.path.basename(path)
+    index_path = os.path.join(directory, f'{name}.npy')
+    stamp_path = os.path.join(directory, f'{name}.md5')
+
+    source_hash = _get_source_hash(path)
+    if os.path.exists(index_path) and os.path.exists(stamp_path):
+        with open(stamp_path) as file:
+            if file.read().strip() == source_hash:
+                return np.load(index_path, mmap_mode='r')
+
+    os.makedirs(directory, exist_ok=True)
+    values = np.unique(np.array([value.encode('utf-8') for value in _iterate_values(path)], dtype=bytes))
+    _replace(index_path, lambda file: np.save(file, values))
+    _replace(stamp_path, lambda file: file.write(f'{source_hash}\n'.encode('utf-8')))
+    return np.load(index_path, mmap_mode='r')
+
+
+def _replace(path: str, write: Callable[[BinaryIO], Any]) -> None:
+    """Write a file through a uniquely named temporary file, so concurrent builds don't clobber each other."""
+    file = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix=f'{os.path.basename(path)}.', delete=False)
+    try:
+        with file:
+            write(file)
+        os.replace(file.name, path)
+    finally:
+        if os.path.exists(file.name):
+            os.remove(file.name)
+
+
+def contains(index: np.ndarray, values: Iterable[str]) -> np.ndarray:
+    """Check which of the given values are in the index with a vectorized binary search."""
+    queries = np.array([value.encode('utf-8') for value in values], dtype=bytes)
+    if not len(queries):
+        return np.zeros(0, dtype=bool)
+    if not len(index):
+        return np.zeros(len(queries), dtype=bool)
+
+    # values longer than the index's fixed width would get truncated, and can't be in it anyway
+    fits = np.char.str_len(queries) <= index.dtype.itemsize
+    queries = queries.astype(index.dtype)
+    positions = np.minimum(np.searchsorted(index, queries), len(index) - 1)
+    return fits & (index[positions] == queries)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""Graph-level integrity checks for the relations in CONSO.
+
+The relations table is read once into an adjacency list per relation. Cycles are found with Tarjan's
+strongly connected components algorithm on the graphs of ``is_a`` and each relation declared transitive in
+``typedefs.tsv``, and self-loops, duplicate edges, and edges to withdrawn terms are found in the same pass
+over the rows, so everything is linear in the number of terms and relations.
+"""
+
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+from .resources import RELATIONS_PATH, TERMS_PATH, TYPEDEF_PATH
+from .resources.constants import CONSO
+from .utils import Tables, get_lines, get_rows
+
+__all__ = [
+    'GraphProblems',
+    'get_transitive_relations',
+    'get_strongly_connected_components',
+    'get_cycle',
+    'get_graph_problems',
+]
+
+
+Node = Tuple[str, str]
+Row = Tuple[str, ...]
+
+
+class GraphProblems(NamedTuple):
+    """The integrity problems found in the relations table."""
+
+    #: Pairs of a relation and a cycle in its graph, given as the nodes visited before returning to the first
+    cycles: List[Tuple[str, List[Node]]]
+    #: Pairs of line numbers and rows whose source and target are the same
+    self_loops: List[Tuple[int, Row]]
+    #: Triples of the line number, the line number of the first occurrence, and the row of repeated edges
+    duplicates: List[Tuple[int, int, Row]]
+    #: Pairs of line numbers and rows with a withdrawn CONSO term as the source or target
+    withdrawn: List[Tuple[int, Row]]
+
+    def __bool__(self) -> bool:  # noqa: D105
+        return any((self.cycles, self.self_loops, self.duplicates, self.withdrawn))
+
+
+def get_transitive_relations(tables: Optional[Tables] = None) -> Set[str]:
+    """Get ``is_a`` and the relations declared transitive in ``typedefs.tsv``."""
+    return {'is_a'} | {
+        line[0]
+        for line in get_rows(tables, 'typedefs', TYPEDEF_PATH)
+        if len(line) > 4 and line[4] == 'true'
+    }
+
+
+def _get_withdrawn(tables: Optional[Tables] = None) -> Set[str]:
+    return {
+        line[0]
+        for line in get_rows(tables, 'terms', TERMS_PATH)
+        if len(line) > 2 and line[2] == 'WITHDRAWN'
+    }
+
+
+def get_strongly_connected_components(graph: Mapping[Node, Iterable[Node]]) -> List[List[Node]]:
+    """Get the strongly connected components of a directed graph with Tarjan's algorithm.
+
+    The recursion is unrolled onto an explicit stack so deep hierarchies don't hit Python's recursion limit.
+
+    >>> graph = {'a': ['b'], 'b': ['c'], 'c': ['a', 'd'], 'd': []}
+    >>> sorted(sorted(component) for component in get_strongly_connected_components(graph))
+    [['a', 'b', 'c'], ['d']]
+    """
+    index: Dict[Node, int] = {}
+    low: Dict[Node, int] = {}
+    on_stack: Set[Node] = set()
+    stack: List[Node] = []
+    rv = []
+
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, iter(graph.get(root, ())))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = len(index)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(graph.get(child, ()))))
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    rv.append(component)
+    return rv
+
+
+def get_cycle(graph: Mapping[Node, Iterable[Node]], component: List[Node]) -> List[Node]:
+    """Get a shortest cycle through the first node of a strongly connected component.
+
+    >>> get_cycle({'a': ['b'], 'b': ['c'], 'c': ['a']}, ['a', 'b', 'c'])
+    ['a', 'b', 'c']
+    """
+    members = set(component)
+    start = component[0]
+    parents = {start: start}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        for child in graph.get(node, ()):
+            if child == start:
+                cycle = [node]
+                while cycle[-1] != start:
+                    cycle.append(parents[cycle[-1]])
+                return cycle[::-1]
+            if child in members and child not in parents:
+                parents[child] = node
+                queue.append(child)
+    raise ValueError('not a strongly connected component')
+
+
+def get_graph_problems(tables: Optional[Tables] = None) -> GraphProblems:
+    """Build the relation graphs and check their integrity.
+
+    Rows that don't have the right number of fields are skipped, since they're reported by
+    :func:`conso.check.check_relations_file`.
+
+    :param tables: The typedefs, terms, and relations tables, if they were already read
+    """
+    transitive = get_transitive_relations(tables)
+    withdrawn_ids = _get_withdrawn(tables)
+
+    graphs: Dict[str, Dict[Node, List[Node]]] = defaultdict(lambda: defaultdict(list))
+    first_lines: Dict[Tuple[Node, str, Node], int] = {}
+    self_loops, duplicates, withdrawn = [], [], []
+    for i, line in get_lines(tables, 'relations', RELATIONS_PATH):
+        if len(line) != 7:
+            continue
+        row = tuple(line)
+        source, relation, target = (line[0], line[1]), line[3], (line[4], line[5])
+
+        if source == target:
+            self_loops.append((i, row))
+
+        key = source, relation, target
+        if key in first_lines:
+            duplicates.append((i, first_lines[key], row))
+            continue
+        first_lines[key] = i
+
+        if any(namespace == CONSO and identifier in withdrawn_ids for namespace, identifier in (source, target)):
+            withdrawn.append((i, row))
+
+        if relation in transitive:
+            graphs[relation][source].append(target)
+
+    cycles = []
+    for relation, graph in sorted(graphs.items()):
+        for component in get_strongly_connected_components(graph):
+            if len(component) > 1:
+                cycles.append((relation, get_cycle(graph, component)))
+
+    return GraphProblems(cycles=cycles, self_loops=self_loops, duplicates=duplicates, withdrawn=withdrawn)
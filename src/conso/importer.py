@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+
+"""Import new terms into CONSO in bulk.
+
+The input is a TSV, CSV, or Excel spreadsheet with one row per new term and the same ``Author``, ``Name``,
+``Type``, ``References``, and ``Description`` columns as ``terms.tsv``. It can also have these columns, whose
+entries are separated by ``|``:
+
+``Synonyms``
+    Synonyms, added with unknown reference and specificity
+``Xrefs``
+    Cross-references written as ``database:identifier``
+``Relations``
+    Relations written as ``relation namespace:identifier``, optionally followed by ``! target name`` for
+    external targets. A CONSO target can be given by the name of another term in the same import, like
+    ``is_a CONSO:tau aggregate``.
+
+While holding a lock, the next CONSO identifiers are allocated, the whole batch is validated against the
+existing terms, and every resource file is merged into a temporary file next to it. The originals are only
+replaced once all of them have been written, so a failed validation or merge never changes the resources.
+
+The replacement itself is one :func:`os.replace` per file, which is atomic for each file but not across them.
+The originals are kept as backups until all of the files have been replaced and are restored if one of the
+replacements fails. If the process is killed between two replacements, the backups (``*.bak``) are left next
+to the resource files so they can be restored by hand.
+"""
+
+import csv
+import hashlib
+import os
+import re
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Dict, List, Mapping, NamedTuple, Optional, Set, Tuple
+
+import click
+import pandas as pd
+
+from .check import get_authors, get_types, is_ascii
+from .resources import HERE as RESOURCES_DIRECTORY, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, TYPEDEF_PATH, XREFS_PATH
+from .resources.constants import CONSO, CONSO_IDENTIFIER, VALID_SOURCES
+from .sort_table import stage_merge
+
+__all__ = [
+    'ImportValidationError',
+    'Batch',
+    'read_import',
+    'get_batch',
+    'import_terms',
+    'import_',
+]
+
+#: The lock is kept outside of the resources, which might be installed read-only. It's named after the
+#: resources directory so imports into different checkouts don't wait for each other.
+LOCK_PATH = os.path.join(
+    tempfile.gettempdir(),
+    f'conso-{hashlib.sha256(RESOURCES_DIRECTORY.encode()).hexdigest()[:16]}.lock',
+)
+TERM_COLUMNS = ['Author', 'Name', 'Type', 'References', 'Description']
+SEPARATOR = '|'
+RELATION_ENTRY = re.compile(r'^(?P<relation>\S+)\s+(?P<namespace>[^:\s]+):(?P<identifier>[^!]+?)(?:\s*!\s*(?P<name>.+))?$')
+
+Row = Tuple[str, ...]
+
+
+class ImportValidationError(ValueError):
+    """Raised when a batch of new terms doesn't validate."""
+
+    def __init__(self, messages: List[str]):  # noqa: D107
+        super().__init__(f'{len(messages)} problems in import')
+        self.messages = messages
+
+
+class Batch(NamedTuple):
+    """The rows to add to each of the resource files."""
+
+    terms: List[Row]
+    synonyms: List[Row]
+    xrefs: List[Row]
+    relations: List[Row]
+
+
+@contextmanager
+def _locked():
+    with open(LOCK_PATH, 'a') as file:
+        if os.name == 'nt':
+            import msvcrt
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def _replace_all(staged: List[Tuple[str, str]]) -> None:
+    """Replace each file with its staged version, restoring all of them if one of the replacements fails."""
+    backups = []
+    try:
+        for path, output_path in staged:
+            backup_path = f'{path}.bak'
+            shutil.copy2(path, backup_path)
+            backups.append((path, backup_path))
+            os.replace(output_path, path)
+    except BaseException:
+        for path, backup_path in backups:
+            os.replace(backup_path, path)
+        for _, output_path in staged:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+        raise
+    for _, backup_path in backups:
+        os.remove(backup_path)
+
+
+def read_import(path: str) -> pd.DataFrame:
+    """Read a spreadsheet of new terms, without type inference."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in {'.xls', '.xlsx'}:
+        df = pd.read_excel(path, dtype=str, keep_default_na=False)
+    else:
+        df = pd.read_csv(
+            path, sep=',' if extension == '.csv' else '\t', dtype=str, keep_default_na=False,
+            quoting=csv.QUOTE_NONE if extension != '.csv' else csv.QUOTE_MINIMAL,
+        )
+    for column in ('Synonyms', 'Xrefs', 'Relations'):
+        if column not in df.columns:
+            df[column] = ''
+    return df
+
+
+def _split(cell: str) -> List[str]:
+    return [entry.strip() for entry in cell.split(SEPARATOR) if entry.strip()]
+
+
+def _get_existing() -> Tuple[int, Mapping[str, str], Set[str]]:
+    """Get the last CONSO number, the names of the live terms, and the identifiers of the withdrawn ones."""
+    last, names, withdrawn = 0, {}, set()
+    with open(TERMS_PATH) as file:
+        reader = csv.reader(file, delimiter='\t', quoting=csv.QUOTE_NONE)
+        _ = next(reader)  # skip the header
+        for line in reader:
+            if not line:
+                continue
+            match = CONSO_IDENTIFIER.match(line[0])
+            if match is not None:
+                last = max(last, int(match.group('number')))
+            if line[2] == 'WITHDRAWN':
+                withdrawn.add(line[0])
+            else:
+                names[line[0]] = line[2]
+    return last, names, withdrawn
+
+
+def _get_relations() -> Set[str]:
+    rv = {'is_a'}
+    for path, column in ((TYPEDEF_PATH, 0), (RELATIONS_PATH, 3)):
+        with open(path) as file:
+            reader = csv.reader(file, delimiter='\t', quoting=csv.QUOTE_NONE)
+            _ = next(reader)  # skip the header
+            rv.update(line[column] for line in reader if line)
+    return rv
+
+
+def get_batch(df: pd.DataFrame, start: int) -> Batch:  # noqa: C901
+    """Validate the new terms and build the rows for each resource file.
+
+    :param df: The new terms, as returned by :func:`read_import`
+    :param start: The number of the first CONSO identifier to allocate
+    :raises ImportValidationError: If anything doesn't validate. All of the problems are collected first.
+    """
+    missing_columns = [column for column in TERM_COLUMNS if column not in df.columns]
+    if missing_columns:
+        raise ImportValidationError([f'Missing columns: {", ".join(missing_columns)}'])
+
+    classes, authors, relations = get_types(), get_authors(), _get_relations()
+    _, existing_names, withdrawn = _get_existing()
+    existing_by_name = {name.casefold(): identifier for identifier, name in existing_names.items()}
+
+    identifiers = [f'CONSO{number:05}' for number in range(start, start + len(df.index))]
+    new_names = dict(zip(identifiers, df['Name']))
+    new_by_name: Dict[str, str] = {}
+    messages = []
+    for i, (identifier, name) in enumerate(zip(identifiers, df['Name']), start=2):
+        key = name.strip().casefold()
+        if not key:
+            continue
+        if key in existing_by_name:
+            messages.append(f'line {i}: Name already used by {existing_by_name[key]}: {name}')
+        elif key in new_by_name:
+            messages.append(f'line {i}: Name used twice in import: {name}')
+        new_by_name[key] = identifier
+
+    batch = Batch([], [], [], [])
+    for i, (identifier, row) in enumerate(zip(identifiers, df.itertuples(index=False)), start=2):
+        row = row._asdict()
+        term = [row[column] for column in TERM_COLUMNS]
+        if any(value != value.strip() for value in term):
+            messages.append(f'line {i}: Extra white space: {term}')
+        if any(not value for value in term):
+            messages.append(f'line {i}: Missing entries: {term}')
+        author, name, cls, references, description = term
+        if author not in authors:
+            messages.append(f'line {i}: Invalid curator: {author}')
+        if not is_ascii(name):
+            messages.append(f'line {i}: Name contains non-ascii: {name}')
+        if cls not in classes:
+            messages.append(f'line {i}: Invalid class: {cls}')
+        for reference in references.split(','):
+            prefix, delimiter, rest = reference.strip().partition(':')
+            if not delimiter or ':' in rest:
+                messages.append(f'line {i}: Problematic reference: {reference.strip()}')
+            elif prefix not in VALID_SOURCES:
+                messages.append(f'line {i}: Invalid reference type: {reference.strip()}')
+        if '"' in description:
+            messages.append(f'line {i}: Can not use double quote in description')
+        batch.terms.append((identifier, author, name, cls, references, description))
+
+        for synonym in _split(row['Synonyms']):
+            batch.synonyms.append((identifier, synonym, '?', '?'))
+
+        for xref in _split(row['Xrefs']):
+            database, delimiter, database_identifier = xref.partition(':')
+            if not delimiter or not database or not database_identifier:
+                messages.append(f'line {i}: Malformed xref: {xref}')
+                continue
+            batch.xrefs.append((identifier, database, database_identifier))
+
+        for entry in _split(row['Relations']):
+            match = RELATION_ENTRY.match(entry)
+            if match is None:
+                messages.append(f'line {i}: Malformed relation: {entry}')
+                continue
+            relation, namespace, target = match.group('relation', 'namespace', 'identifier')
+            target_name = match.group('name')
+            if relation not in relations:
+                messages.append(f'line {i}: Unknown relation: {relation}')
+            if namespace == CONSO:
+                target = new_by_name.get(target.casefold(), target)
+                if target in withdrawn:
+                    messages.append(f'line {i}: Relation to withdrawn term: {entry}')
+                    continue
+                target_name = existing_names.get(target, new_names.get(target))
+                if target_name is None:
+                    messages.append(f'line {i}: Unknown CONSO target: {entry}')
+                    continue
+            batch.relations.append((CONSO, identifier, name, relation, namespace, target, target_name or '?'))
+
+    if messages:
+        raise ImportValidationError(messages)
+    return batch
+
+
+def import_terms(df: pd.DataFrame, dry_run: bool = False) -> Batch:
+    """Allocate identifiers for new terms and add them to the resource files.
+
+    :param df: The new terms, as returned by :func:`read_import`
+    :param dry_run: Validate and allocate identifiers without changing any files
+    :returns: The rows that were added to each resource file
+    :raises ImportValidationError: If the batch doesn't validate, in which case nothing is changed
+    """
+    with _locked():
+        last, _, _ = _get_existing()
+        batch = get_batch(df, last + 1)
+        if dry_run:
+            return batch
+
+        staged: List[Tuple[str, Optional[str]]] = []
+        try:
+            for path, rows in ((TERMS_PATH, batch.terms), (SYNONYMS_PATH, batch.synonyms),
+                               (XREFS_PATH, batch.xrefs), (RELATIONS_PATH, batch.relations)):
+                staged.append((path, stage_merge(path, rows)[0]))
+        except BaseException:
+            for _, output_path in staged:
+                if output_path is not None:
+                    os.remove(output_path)
+            raise
+
+        _replace_all([(path, output_path) for path, output_path in staged if output_path is not None])
+    return batch
+
+
+@click.command(name='import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Validate the import and allocate identifiers without saving')
+def import_(path: str, dry_run: bool):
+    """Import new terms, with their synonyms, xrefs, and relations, from a spreadsheet."""
+    try:
+        batch = import_terms(read_import(path), dry_run=dry_run)
+    except ImportValidationError as e:
+        for message in e.messages:
+            click.echo(f'{path}, {message}')
+        click.echo(f'Found {len(e.messages)} errors. Nothing was imported.')
+        sys.exit(1)
+
+    if batch.terms:
+        click.echo(f'allocated {len(batch.terms)} identifiers: {batch.terms[0][0]}-{batch.terms[-1][0]}')
+    click.echo(f'{len(batch.synonyms)} synonyms, {len(batch.xrefs)} xrefs, and {len(batch.relations)} relations')
+
+
+if __name__ == '__main__':
+    import_()
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""Find names and synonyms that are shared between CONSO terms.
+
+A label that normalizes to the same string as a label of another term makes grounding that string depend on
+which term a tool happens to see first. The names in ``terms.tsv`` and the synonyms in ``synonyms.tsv`` are
+read once into a hash index from normalized labels to the terms that use them, so finding every collision
+group is linear in the number of labels. Labels of withdrawn terms aren't indexed.
+"""
+
+import re
+import unicodedata
+from collections import defaultdict
+from typing import List, Mapping, NamedTuple, Optional
+
+from .resources import SYNONYMS_PATH, TERMS_PATH
+from .utils import Tables, get_rows
+
+__all__ = [
+    'NAME',
+    'Label',
+    'Collision',
+    'LabelIndex',
+    'normalize_label',
+    'get_label_index',
+]
+
+#: The specificity given to the primary names of terms in the index
+NAME = 'NAME'
+
+_SEPARATORS = re.compile(r'[\s\-_]+')
+
+
+def normalize_label(label: str) -> str:
+    """Normalize a label for comparison.
+
+    >>> normalize_label('Tau  antibody, AGG-5759')
+    'tau antibody, agg 5759'
+    """
+    return _SEPARATORS.sub(' ', unicodedata.normalize('NFKC', label).casefold()).strip()
+
+
+class Label(NamedTuple):
+    """A name or synonym of a term."""
+
+    identifier: str
+    label: str
+    #: :data:`NAME` for primary names, otherwise the specificity from ``synonyms.tsv``
+    specificity: str
+
+    @property
+    def is_name(self) -> bool:
+        """Check if the label is the primary name of the term."""
+        return self.specificity == NAME
+
+
+class Collision(NamedTuple):
+    """A normalized label that's used by more than one term."""
+
+    key: str
+    labels: List[Label]
+
+    @property
+    def has_name(self) -> bool:
+        """Check if the label collides with the primary name of one of the terms."""
+        return any(label.is_name for label in self.labels)
+
+
+class LabelIndex:
+    """An index from normalized labels to the names and synonyms that normalize to them."""
+
+    def __init__(self, labels: Mapping[str, List[Label]]):  # noqa: D107
+        self.labels = labels
+
+    @classmethod
+    def from_resources(
+        cls,
+        terms_path: Optional[str] = None,
+        synonyms_path: Optional[str] = None,
+        tables: Optional[Tables] = None,
+    ) -> 'LabelIndex':
+        """Build the index with a single pass over the terms and the synonyms.
+
+        :param tables: The terms and synonyms tables, if they were already read
+        """
+        labels = defaultdict(list)
+        withdrawn = set()
+        for identifier, _, name, *_ in get_rows(tables, 'terms', terms_path or TERMS_PATH):
+            if name == 'WITHDRAWN':
+                withdrawn.add(identifier)
+            else:
+                labels[normalize_label(name)].append(Label(identifier, name, NAME))
+        for identifier, synonym, _, specificity in get_rows(tables, 'synonyms', synonyms_path or SYNONYMS_PATH):
+            if identifier not in withdrawn:
+                labels[normalize_label(synonym)].append(Label(identifier, synonym, specificity))
+        return cls(dict(labels))
+
+    def get(self, label: str) -> List[Label]:
+        """Get the names and synonyms that a label normalizes to the same string as."""
+        return self.labels.get(normalize_label(label), [])
+
+    def get_collisions(self) -> List[Collision]:
+        """Get the normalized labels used by more than one term, sorted by the normalized label."""
+        return sorted(
+            Collision(key, labels)
+            for key, labels in self.labels.items()
+            if any(label.identifier != labels[0].identifier for label in labels)
+        )
+
+
+def get_label_index(tables: Optional[Tables] = None) -> LabelIndex:
+    """Get the index of the names and synonyms in the resources."""
+    return LabelIndex.from_resources(tables=tables)
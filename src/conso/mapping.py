@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""A compact binary format for the mapping between CONSO identifiers and names.
+
+The JSON mapping file has to be parsed in full by every process that uses it. This format is instead
+memory-mapped and searched in place, so many processes can share it through the page cache. The layout is:
+
+1. A header with a magic string, the format version, the number of entries, and the width of the identifiers
+2. The identifiers, sorted and null-padded to a fixed width
+3. The offsets of each name in the string pool, in the same order as the identifiers, plus the end offset
+4. A permutation of the entries sorted by name, for looking up identifiers by name
+5. The string pool of UTF-8 encoded names
+
+All integers are little-endian.
+"""
+
+import mmap
+import os
+import struct
+from typing import Iterable, Mapping, Optional, Tuple
+
+__all__ = [
+    'write_binary_mapping',
+    'BinaryMapping',
+]
+
+MAGIC = b'CONSOMAP'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sIII')
+OFFSET = struct.Struct('<Q')
+POSITION = struct.Struct('<I')
+
+
+def write_binary_mapping(mapping: Mapping[str, str], path: str) -> None:
+    """Write a mapping from identifiers to names in the binary format."""
+    identifiers = sorted(mapping, key=lambda identifier: identifier.encode('utf-8'))
+    encoded_identifiers = [identifier.encode('utf-8') for identifier in identifiers]
+    encoded_names = [mapping[identifier].encode('utf-8') for identifier in identifiers]
+    width = max(map(len, encoded_identifiers), default=0)
+    by_name = sorted(range(len(identifiers)), key=lambda i: (encoded_names[i], encoded_identifiers[i]))
+
+    temporary_path = f'{path}.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(identifiers), width))
+        for identifier in encoded_identifiers:
+            file.write(identifier.ljust(width, b'\0'))
+        offset = 0
+        for name in encoded_names:
+            file.write(OFFSET.pack(offset))
+            offset += len(name)
+        file.write(OFFSET.pack(offset))
+        for i in by_name:
+            file.write(POSITION.pack(i))
+        for name in encoded_names:
+            file.write(name)
+    os.replace(temporary_path, path)
+
+
+class BinaryMapping:
+    """A memory-mapped reader for files written by :func:`write_binary_mapping`.
+
+    >>> mapping = BinaryMapping('export/conso.belns.mapping.bin')  # doctest: +SKIP
+    >>> mapping.get_name('CONSO00001')  # doctest: +SKIP
+    'microtubule-binding region'
+    """
+
+    def __init__(self, path: str):
+        """Open the mapping file."""
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self.width = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a version {FORMAT_VERSION} CONSO binary mapping')
+        self._identifiers_start = HEADER.size
+        self._offsets_start = self._identifiers_start + self.count * self.width
+        self._by_name_start = self._offsets_start + (self.count + 1) * OFFSET.size
+        self._pool_start = self._by_name_start + self.count * POSITION.size
+
+    def __len__(self) -> int:  # noqa: D105
+        return self.count
+
+    def close(self) -> None:
+        """Close the memory map."""
+        self._mmap.close()
+
+    def __enter__(self):  # noqa: D105
+        return self
+
+    def __exit__(self, *args):  # noqa: D105
+        self.close()
+
+    def _get_identifier_bytes(self, i: int) -> bytes:
+        start = self._identifiers_start + i * self.width
+        return self._mmap[start:start + self.width].rstrip(b'\0')
+
+    def _get_name_bytes(self, i: int) -> bytes:
+        start, end = struct.unpack_from('<QQ', self._mmap, self._offsets_start + i * OFFSET.size)
+        return self._mmap[self._pool_start + start:self._pool_start + end]
+
+    def _get_by_name(self, i: int) -> int:
+        return POSITION.unpack_from(self._mmap, self._by_name_start + i * POSITION.size)[0]
+
+    def items(self) -> Iterable[Tuple[str, str]]:
+        """Iterate over the pairs of identifiers and names, sorted by identifier."""
+        for i in range(self.count):
+            yield self._get_identifier_bytes(i).decode('utf-8'), self._get_name_bytes(i).decode('utf-8')
+
+    def get_name(self, identifier: str) -> Optional[str]:
+        """Look up the name for a CONSO identifier with a binary search."""
+        query = identifier.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_identifier_bytes(middle) < query:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._get_identifier_bytes(low) == query:
+            return self._get_name_bytes(low).decode('utf-8')
+        return None
+
+    def get_identifier(self, name: str) -> Optional[str]:
+        """Look up the CONSO identifier for a name with a binary search."""
+        query = name.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_name_bytes(self._get_by_name(middle)) < query:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count:
+            i = self._get_by_name(low)
+            if self._get_name_bytes(i) == query:
+                return self._get_identifier_bytes(i).decode('utf-8')
+        return None
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""Resolve external identifiers to CONSO identifiers through the cross-references.
+
+The cross-references in ``xrefs.tsv`` are turned around into a hash index from ``(database, identifier)``
+to the CONSO identifiers that reference it, so mapping a stream of external CURIEs onto CONSO is a single
+hashed join. Databases are matched case-insensitively and a redundant prefix in the identifier (like the
+``CHEBI:`` in ``CHEBI:65329``) is ignored on both sides. Cross-references from withdrawn terms aren't indexed.
+"""
+
+import csv
+import sys
+from collections import defaultdict
+from typing import Iterable, List, Mapping, NamedTuple, Optional, TextIO, Tuple
+
+import click
+
+from .resources import TERMS_PATH, XREFS_PATH
+
+__all__ = [
+    'Key',
+    'Resolution',
+    'XrefIndex',
+    'strip_prefix',
+    'normalize_xref',
+    'get_xref_index',
+    'resolve',
+]
+
+Key = Tuple[str, str]
+
+
+class Resolution(NamedTuple):
+    """The result of resolving one external CURIE."""
+
+    curie: str
+    #: The CONSO identifiers that cross-reference the CURIE. Empty if it's unmatched.
+    identifiers: Tuple[str, ...]
+
+    @property
+    def is_ambiguous(self) -> bool:
+        """Check if the CURIE is cross-referenced by more than one CONSO term."""
+        return len(self.identifiers) > 1
+
+
+def strip_prefix(database: str, identifier: str) -> str:
+    """Remove a redundant prefix for the database from an identifier.
+
+    >>> strip_prefix('chebi', 'CHEBI:65329')
+    '65329'
+    >>> strip_prefix('chebi', '65329')
+    '65329'
+    """
+    prefix, delimiter, rest = identifier.partition(':')
+    if delimiter and prefix.lower() == database.lower():
+        return rest
+    return identifier
+
+
+def normalize_xref(database: str, identifier: str) -> Key:
+    """Normalize a database and identifier into the key used by :class:`XrefIndex`.
+
+    >>> normalize_xref(' CHEBI', 'CHEBI:65329')
+    ('chebi', '65329')
+    """
+    database, identifier = database.strip(), identifier.strip()
+    return database.lower(), strip_prefix(database, identifier)
+
+
+def _split_curie(curie: str) -> Optional[Key]:
+    database, delimiter, identifier = curie.strip().partition(':')
+    if not delimiter or not database or not identifier:
+        return None
+    return normalize_xref(database, identifier)
+
+
+class XrefIndex:
+    """A reverse index from external identifiers to CONSO identifiers."""
+
+    def __init__(self, index: Mapping[Key, Tuple[str, ...]], names: Mapping[str, str]):
+        """Build an index from a mapping of normalized ``(database, identifier)`` keys to CONSO identifiers."""
+        self.index = index
+        self.names = names
+
+    @classmethod
+    def from_resources(cls) -> 'XrefIndex':
+        """Build the index from ``terms.tsv`` and ``xrefs.tsv``."""
+        names = {}
+        with open(TERMS_PATH) as file:
+            reader = csv.reader(file, delimiter='\t', quoting=csv.QUOTE_NONE)
+            _ = next(reader)  # skip the header
+            for line in reader:
+                if line and line[2] != 'WITHDRAWN':
+                    names[line[0]] = line[2]
+
+        index = defaultdict(list)
+        with open(XREFS_PATH) as file:
+            reader = csv.reader(file, delimiter='\t', quoting=csv.QUOTE_NONE)
+            _ = next(reader)  # skip the header
+            for line in reader:
+                if not line or line[0] not in names:
+                    continue
+                identifiers = index[normalize_xref(line[1], line[2])]
+                if line[0] not in identifiers:
+                    identifiers.append(line[0])
+
+        return cls({key: tuple(sorted(value)) for key, value in index.items()}, names)
+
+    def __len__(self) -> int:  # noqa: D105
+        return len(self.index)
+
+    def get(self, database: str, identifier: str) -> Tuple[str, ...]:
+        """Get the CONSO identifiers that cross-reference the given external identifier."""
+        return self.index.get(normalize_xref(database, identifier), ())
+
+    def resolve(self, curies: Iterable[str]) -> List[Resolution]:
+        """Resolve many CURIEs at once.
+
+        Malformed CURIEs (without a ``:``) are returned as unmatched.
+        """
+        return [self.resolve_curie(curie) for curie in curies]
+
+    def resolve_curie(self, curie: str) -> Resolution:
+        """Resolve a CURIE, or return it as unmatched if it's malformed (without a ``:``)."""
+        key = _split_curie(curie)
+        return Resolution(curie, self.index.get(key, ()) if key is not None else ())
+
+    def get_collisions(self) -> Mapping[Key, Tuple[str, ...]]:
+        """Get the external identifiers that are cross-referenced by more than one CONSO term."""
+        return {
+            key: identifiers
+            for key, identifiers in self.index.items()
+            if len(identifiers) > 1
+        }
+
+
+def get_xref_index() -> XrefIndex:
+    """Build the reverse cross-reference index from the resources."""
+    return XrefIndex.from_resources()
+
+
+def _write_resolutions(
+    index: XrefIndex,
+    lines: Iterable[List[str]],
+    file: TextIO,
+    unmatched: bool,
+) -> Tuple[int, int, int]:
+    writer = csv.writer(file, delimiter='\t', quoting=csv.QUOTE_NONE, lineterminator='\n')
+    n_lines = n_matched = n_ambiguous = 0
+    for line in lines:
+        n_lines += 1
+        resolution = index.resolve_curie(line[0])
+        if not resolution.identifiers:
+            if unmatched:
+                writer.writerow([*line, '', '', 'unmatched'])
+            continue
+        n_matched += 1
+        status = 'ambiguous' if resolution.is_ambiguous else 'unique'
+        n_ambiguous += resolution.is_ambiguous
+        for identifier in resolution.identifiers:
+            writer.writerow([*line, identifier, index.names[identifier], status])
+    return n_lines, n_matched, n_ambiguous
+
+
+@click.command()
+@click.argument('file', type=click.File(), default=sys.stdin)
+@click.option('--unmatched', is_flag=True, help='Also output the CURIEs that could not be resolved')
+@click.option('--collisions', is_flag=True, help='List external identifiers cross-referenced by several terms')
+def resolve(file: TextIO, unmatched: bool, collisions: bool):
+    """Resolve external CURIEs to CONSO identifiers.
+
+    Reads one CURIE per line from FILE (or stdin). Any further tab-separated columns are passed through,
+    followed by the CONSO identifier, its name, and whether the match is unique or ambiguous. A CURIE
+    cross-referenced by several terms gets one output line per term.
+    """
+    index = get_xref_index()
+
+    if collisions:
+        for (database, identifier), identifiers in sorted(index.get_collisions().items()):
+            click.echo(f'{database}:{identifier}\t{", ".join(identifiers)}')
+        return
+
+    lines = (line.rstrip('\n').split('\t') for line in file if line.strip())
+    n_lines, n_matched, n_ambiguous = _write_resolutions(index, lines, sys.stdout, unmatched)
+    click.echo(f'resolved {n_matched}/{n_lines} CURIEs ({n_ambiguous} ambiguous)', err=True)
+
+
+if __name__ == '__main__':
+    resolve()
@@ -13,3 +13,7 @@ TERMS_PATH = os.path.join(HERE, 'terms.tsv')
 SYNONYMS_PATH = os.path.join(HERE, 'synonyms.tsv')
 XREFS_PATH = os.path.join(HERE, 'xrefs.tsv')
 RELATIONS_PATH = os.path.join(HERE, 'relations.tsv')
+RULES_PATH = os.path.join(HERE, 'rules.tsv')
+
+#: The external namespaces live next to the source tree, so they're only available in a development install
+EXTERNAL_DIRECTORY = os.path.abspath(os.path.join(HERE, os.pardir, os.pardir, os.pardir, 'external'))
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+"""Constants describing the layout of the CONSO resources."""
+
+import re
+
+__all__ = [
+    'CONSO',
+    'CONSO_IDENTIFIER',
+    'IDENTIFIER_COLUMN',
+    'CURATOR_COLUMN',
+    'WITHDRAWN_COLUMN',
+    'NAME_COLUMN',
+    'TYPE_COLUMN',
+    'REFERENCES_COLUMN',
+    'DESCRIPTION_COLUMN',
+    'NUMBER_TERM_COLUMNS',
+    'NUMBER_SYNONYM_COLUMNS',
+    'VALID_SOURCES',
+    'VALID_SYNONYM_TYPES',
+]
+
+CONSO = 'CONSO'
+CONSO_IDENTIFIER = re.compile(r'^CONSO(?P<number>\d{5})$')
+
+#: The columns of ``terms.tsv``
+IDENTIFIER_COLUMN = 0
+CURATOR_COLUMN = 1
+WITHDRAWN_COLUMN = 2
+NAME_COLUMN = 2
+TYPE_COLUMN = 3
+REFERENCES_COLUMN = 4
+DESCRIPTION_COLUMN = 5
+NUMBER_TERM_COLUMNS = 6
+
+#: The number of columns of ``synonyms.tsv``
+NUMBER_SYNONYM_COLUMNS = 4
+
+VALID_SOURCES = {'pmc', 'pubmed', 'doi', 'pubchem.compound', 'ncit'}
+VALID_SYNONYM_TYPES = {'EXACT', 'BROAD', 'NARROW', 'RELATED', '?'}
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+"""Class-level completeness rules for CONSO.
+
+The rules live in ``rules.tsv``. Each says how many cross-references to the given databases, or how many
+relations of the given types, every member of a class should have. When there are several comma-separated
+targets, they're counted together, so a chemical with any kind of role satisfies the role rule. An empty
+maximum means there's no upper bound.
+
+The terms, cross-references, and relations are each read once into indexes by class and by
+``(identifier, target)``, then all of the rules are evaluated against them, so adding a rule doesn't add a
+pass over the files.
+"""
+
+from collections import Counter, defaultdict
+from typing import Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+from .resources import RELATIONS_PATH, RULES_PATH, TERMS_PATH, XREFS_PATH
+from .resources.constants import CONSO
+from .utils import Tables, get_rows, iterate_rows
+
+__all__ = [
+    'Rule',
+    'Violation',
+    'RuleIndex',
+    'get_rules',
+    'get_violations',
+]
+
+KINDS = {'xref', 'relation'}
+MISSING_XREF_VALUES = {'?', '', 'N/A', 'n/a'}
+
+
+class Rule(NamedTuple):
+    """A completeness rule for the members of a class."""
+
+    cls: str
+    #: Either ``xref`` or ``relation``
+    kind: str
+    #: The databases or relations that are counted
+    targets: Tuple[str, ...]
+    minimum: int = 1
+    maximum: Optional[int] = None
+    #: The namespace of the targets of a relation, used to suggest lines for ``relations.tsv``
+    target_namespace: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        """Get a label for the targets of the rule."""
+        return ' or '.join(self.targets)
+
+
+class Violation(NamedTuple):
+    """A term that has the wrong number of cross-references or relations for a rule."""
+
+    identifier: str
+    name: str
+    count: int
+
+
+class RuleIndex(NamedTuple):
+    """The indexes that the rules are evaluated against."""
+
+    #: A mapping from classes to pairs of identifiers and names of their (non-withdrawn) members
+    members: Mapping[str, List[Tuple[str, str]]]
+    #: A counter of ``(identifier, database)`` pairs from ``xrefs.tsv``
+    xrefs: Mapping[Tuple[str, str], int]
+    #: A counter of ``(identifier, relation)`` pairs for CONSO sources in ``relations.tsv``
+    relations: Mapping[Tuple[str, str], int]
+
+    @classmethod
+    def from_resources(cls, tables: Optional[Tables] = None) -> 'RuleIndex':
+        """Build the indexes with a single pass over each of the resource files.
+
+        :param tables: The terms, cross-references, and relations tables, if they were already read
+        """
+        members = defaultdict(list)
+        for identifier, _, name, term_cls, _, _ in get_rows(tables, 'terms', TERMS_PATH):
+            if name != 'WITHDRAWN':
+                members[term_cls].append((identifier, name))
+
+        xrefs = Counter(
+            (identifier, database)
+            for identifier, database, database_identifier in get_rows(tables, 'xrefs', XREFS_PATH)
+            if database_identifier not in MISSING_XREF_VALUES
+        )
+        relations = Counter(
+            (source_id, relation)
+            for source_ns, source_id, _, relation, _, _, _ in get_rows(tables, 'relations', RELATIONS_PATH)
+            if source_ns == CONSO
+        )
+        return cls(members=dict(members), xrefs=xrefs, relations=relations)
+
+    def count(self, rule: Rule, identifier: str) -> int:
+        """Count the cross-references or relations of a term that a rule applies to."""
+        counter = self.xrefs if rule.kind == 'xref' else self.relations
+        return sum(counter.get((identifier, target), 0) for target in rule.targets)
+
+
+def get_rules(path: Optional[str] = None, tables: Optional[Tables] = None) -> List[Rule]:
+    """Load the completeness rules.
+
+    :param path: The rules file. Defaults to ``rules.tsv`` in the resources.
+    :param tables: The rules table, if it was already read. Only used if no path is given.
+    """
+    rows = iterate_rows(path) if path else get_rows(tables, 'rules', RULES_PATH)
+    path = path or RULES_PATH
+    rv = []
+    for i, (cls, kind, targets, minimum, maximum, target_namespace) in enumerate(rows, start=2):
+        if kind not in KINDS:
+            raise ValueError(f'{path}: Invalid kind on line {i}: {kind}')
+        rv.append(Rule(
+            cls=cls,
+            kind=kind,
+            targets=tuple(target.strip() for target in targets.split(',')),
+            minimum=int(minimum) if minimum else 0,
+            maximum=int(maximum) if maximum else None,
+            target_namespace=target_namespace or None,
+        ))
+    return rv
+
+
+def get_violations(
+    rules: Iterable[Rule],
+    index: Optional[RuleIndex] = None,
+) -> List[Tuple[Rule, int, List[Violation]]]:
+    """Evaluate the rules.
+
+    :returns: Triples of each rule, the number of members of its class, and the members that violate it
+    """
+    if index is None:
+        index = RuleIndex.from_resources()
+
+    rv = []
+    for rule in rules:
+        members = index.members.get(rule.cls, [])
+        violations = []
+        for identifier, name in members:
+            count = index.count(rule, identifier)
+            if count < rule.minimum or (rule.maximum is not None and count > rule.maximum):
+                violations.append(Violation(identifier, name, count))
+        rv.append((rule, len(members), violations))
+    return rv
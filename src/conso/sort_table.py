@@ -1,18 +1,251 @@
 # -*- coding: utf-8 -*-
 
-"""A script form sorting all tables."""
+"""A script form sorting all tables.
+
+Tables are sorted row-wise by all of their columns and deduplicated with an external merge sort, so they
+never have to fit in memory. A file is only rewritten if its content actually changes.
+"""
+
+import heapq
+import itertools as itt
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
 
 import click
-import pandas as pd
+
+from .resources import CLASSES_PATH, RELATIONS_PATH, SYNONYMS_PATH, TERMS_PATH, XREFS_PATH
+
+__all__ = [
+    'SORTED_PATHS',
+    'check_sorted',
+    'sort_file',
+    'merge_sorted',
+    'merge_into',
+    'stage_merge',
+]
+
+#: The resource tables that are kept sorted by all of their columns
+SORTED_PATHS = [
+    CLASSES_PATH,
+    TERMS_PATH,
+    SYNONYMS_PATH,
+    XREFS_PATH,
+    RELATIONS_PATH,
+]
+
+#: The number of lines sorted in memory before spilling to a temporary file
+DEFAULT_CHUNK_SIZE = 500_000
+
+
+def _key(line: str) -> List[str]:
+    return line.rstrip('\n').split('\t')
+
+
+def _iterate_lines(file: TextIO) -> Iterator[str]:
+    for line in file:
+        if not line.endswith('\n'):
+            line += '\n'
+        yield line
+
+
+def _unique(lines: Iterable[str]) -> Iterator[str]:
+    """Remove adjacent duplicates from sorted lines."""
+    for line, _ in itt.groupby(lines):
+        yield line
+
+
+def merge_sorted(*iterables: Iterable[str]) -> Iterator[str]:
+    """Merge several sorted and deduplicated iterables of lines into one."""
+    return _unique(heapq.merge(*iterables, key=_key))
+
+
+def check_sorted(path: str) -> Optional[Tuple[int, str]]:
+    """Check in a single pass that a table is sorted and has no duplicate rows.
+
+    :returns: None if the table is sorted and unique, otherwise the line number and
+        a description of the first problem
+    """
+    with open(path) as file:
+        _ = next(file, None)  # skip the header
+        last_key = None
+        for i, line in enumerate(file, start=2):
+            key = _key(line)
+            if last_key is not None:
+                if key == last_key:
+                    return i, 'duplicate row'
+                if key < last_key:
+                    return i, 'not sorted'
+            last_key = key
+    return None
+
+
+def _write_chunk(lines: List[str], directory: str) -> str:
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tsv', delete=False) as file:
+        file.writelines(_unique(sorted(lines, key=_key)))
+        return file.name
+
+
+def _write_sorted(path: str, chunk_size: Optional[int] = None) -> str:
+    """Write a sorted and deduplicated copy of a table to a temporary file next to it.
+
+    :returns: The path to the temporary file
+    """
+    chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+    directory = os.path.dirname(os.path.abspath(path))
+    chunk_paths = []
+    try:
+        with open(path) as file:
+            header = file.readline()
+            lines = _iterate_lines(file)
+            while True:
+                chunk = list(itt.islice(lines, chunk_size))
+                if not chunk:
+                    break
+                chunk_paths.append(_write_chunk(chunk, directory))
+
+        chunk_files = [open(chunk_path) for chunk_path in chunk_paths]
+        try:
+            with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tsv', delete=False) as file:
+                try:
+                    file.write(header)
+                    file.writelines(merge_sorted(*chunk_files))
+                except BaseException:
+                    file.close()
+                    os.remove(file.name)
+                    raise
+                return file.name
+        finally:
+            for chunk_file in chunk_files:
+                chunk_file.close()
+    finally:
+        for chunk_path in chunk_paths:
+            os.remove(chunk_path)
+
+
+def sort_file(path: str, chunk_size: Optional[int] = None) -> bool:
+    """Sort and deduplicate a table, keeping its header.
+
+    :param path: The path to the table
+    :param chunk_size: The number of lines to sort in memory at once. Defaults to :data:`DEFAULT_CHUNK_SIZE`.
+    :returns: If the file was changed
+    """
+    if check_sorted(path) is None:
+        return False
+
+    output_path = _write_sorted(path, chunk_size=chunk_size)
+    if _same_content(path, output_path):
+        os.remove(output_path)
+        return False
+
+    os.replace(output_path, path)
+    return True
+
+
+def merge_into(path: str, rows: Iterable[Sequence[str]]) -> List[Tuple[str, ...]]:
+    """Merge new rows into a sorted table in a single streaming pass.
+
+    Only the new rows get sorted. They're merge-joined with the table, skipping any that are already in it,
+    and the table is only rewritten if at least one row was added.
+
+    :param path: The path to the table. If it isn't sorted, the result is sorted, but the table is only
+        rewritten if rows were added.
+    :param rows: The rows to add
+    :returns: The rows that were added, in sorted order
+    """
+    output_path, added = stage_merge(path, rows)
+    if output_path is not None:
+        os.replace(output_path, path)
+    return added
+
+
+def stage_merge(path: str, rows: Iterable[Sequence[str]]) -> Tuple[Optional[str], List[Tuple[str, ...]]]:
+    """Write the result of :func:`merge_into` to a temporary file next to the table without replacing it.
+
+    This lets several tables be prepared before any of them are replaced. The table itself is never changed,
+    so if it isn't sorted, a sorted copy is merged instead.
+
+    :returns: The path to the temporary file (or None if there was nothing to add) and the rows that were added
+    """
+    new_lines = sorted({'\t'.join(map(str, row)) + '\n' for row in rows}, key=_key)
+    if not new_lines:
+        return None, []
+
+    sorted_path = None if check_sorted(path) is None else _write_sorted(path)
+    try:
+        return _stage_merge(sorted_path or path, new_lines)
+    finally:
+        if sorted_path is not None:
+            os.remove(sorted_path)
+
+
+def _stage_merge(path: str, new_lines: List[str]) -> Tuple[Optional[str], List[Tuple[str, ...]]]:
+    added = []
+    directory = os.path.dirname(os.path.abspath(path))
+    with open(path) as file, tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tsv', delete=False) as output:
+        try:
+            output.write(file.readline())  # copy the header
+            merged = heapq.merge(
+                ((line, 0) for line in _iterate_lines(file)),
+                ((line, 1) for line in new_lines),
+                key=lambda pair: (_key(pair[0]), pair[1]),
+            )
+            for line, group in itt.groupby(merged, key=lambda pair: pair[0]):
+                _, source = next(group)
+                if source == 1:  # the existing row would have come first
+                    added.append(tuple(_key(line)))
+                output.write(line)
+        except BaseException:
+            output.close()
+            os.remove(output.name)
+            raise
+
+    if added:
+        return output.name, added
+    os.remove(output.name)
+    return None, added
+
+
+def _same_content(left: str, right: str) -> bool:
+    with open(left, 'rb') as left_file, open(right, 'rb') as right_file:
+        return all(
+            left_chunk == right_chunk
+            for left_chunk, right_chunk in itt.zip_longest(
+                iter(lambda: left_file.read(1 << 20), b''),
+                iter(lambda: right_file.read(1 << 20), b''),
+            )
+        )
 
 
 @click.command()
-@click.argument('path')
-def sort(path: str) -> None:
-    """Sort the table."""
-    df = pd.read_csv(path, sep='\t')
-    df.drop_duplicates(inplace=True)
-    df.sort_values(list(df.columns)).to_csv(path, sep='\t', index=False)
+@click.argument('paths', nargs=-1)
+@click.option('--all', 'sort_all', is_flag=True, help='Process all of the sorted resource tables.')
+@click.option('--check', is_flag=True, help='Only check that the tables are sorted and unique.')
+def sort(paths: Sequence[str], sort_all: bool, check: bool) -> None:
+    """Sort the tables."""
+    paths = list(paths)
+    if sort_all:
+        paths.extend(SORTED_PATHS)
+    if not paths:
+        raise click.UsageError('give at least one path or use --all')
+
+    func = check_sorted if check else sort_file
+    with ProcessPoolExecutor() as executor:
+        results = list(executor.map(func, paths))
+
+    failed = False
+    for path, result in zip(paths, results):
+        if check and result is not None:
+            i, problem = result
+            click.echo(f'{path}: {problem} on line {i}')
+            failed = True
+        elif not check and result:
+            click.echo(f'{path}: sorted')
+
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == '__main__':
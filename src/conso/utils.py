@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""Utilities for reading the CONSO resources."""
+
+import csv
+import itertools as itt
+from typing import Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+__all__ = [
+    'Tables',
+    'iterate_rows',
+    'read_lines',
+    'get_rows',
+    'get_lines',
+    'GroupedRows',
+]
+
+#: Resource tables that were already read, by name (like ``terms``). Each has the rows after the header, with
+#: empty lines kept as empty rows so line numbers can still be reported.
+Tables = Mapping[str, Sequence[Sequence[str]]]
+
+
+def iterate_rows(path: str) -> Iterator[List[str]]:
+    """Iterate over the non-empty rows of a TSV file, skipping its header."""
+    with open(path) as file:
+        reader = csv.reader(file, delimiter='\t', quoting=csv.QUOTE_NONE)
+        _ = next(reader)  # skip the header
+        for line in reader:
+            if line:
+                yield line
+
+
+def read_lines(lines: Iterable[str]) -> List[List[str]]:
+    r"""Parse the lines of a TSV file after its header, keeping empty lines as empty rows.
+
+    >>> read_lines(['a\tb\n', 'CONSO00001\tx\n', '\n', 'CONSO00002\ty\n'])
+    [['CONSO00001', 'x'], [], ['CONSO00002', 'y']]
+    """
+    reader = csv.reader(lines, delimiter='\t', quoting=csv.QUOTE_NONE)
+    _ = next(reader, None)  # skip the header
+    return list(reader)
+
+
+def get_rows(tables: Optional[Tables], name: str, path: str) -> Iterable[Sequence[str]]:
+    """Iterate over the non-empty rows of a table, from the tables that were already read or else from its file."""
+    if tables is not None and name in tables:
+        return (row for row in tables[name] if row)
+    return iterate_rows(path)
+
+
+def get_lines(tables: Optional[Tables], name: str, path: str) -> Iterator[Tuple[int, Sequence[str]]]:
+    """Iterate over the rows of a table with their line numbers, including empty rows.
+
+    The header is line 1, so the first row is line 2.
+    """
+    if tables is not None and name in tables:
+        yield from enumerate(tables[name], start=2)
+        return
+    with open(path) as file:
+        yield from enumerate(read_lines(file), start=2)
+
+
+class GroupedRows:
+    """Rows sorted by one of their columns (the first by default), consumed in step with the terms table.
+
+    >>> rows = GroupedRows([('CONSO00001', 'a'), ('CONSO00001', 'b'), ('CONSO00003', 'c')])
+    >>> rows.pop('CONSO00001')
+    [('CONSO00001', 'a'), ('CONSO00001', 'b')]
+    >>> rows.pop('CONSO00002')
+    []
+    >>> rows.pop('CONSO00003')
+    [('CONSO00003', 'c')]
+    """
+
+    def __init__(self, rows: Iterable[Sequence[str]], column: int = 0):  # noqa: D107
+        self.groups = itt.groupby(rows, key=lambda row: row[column])
+        self.current: Optional[Tuple[str, Iterable[Sequence[str]]]] = next(self.groups, None)
+
+    def pop(self, identifier: str) -> List[Sequence[str]]:
+        """Get the rows for the given identifier, skipping any for earlier identifiers."""
+        while self.current is not None and self.current[0] < identifier:
+            self.current = next(self.groups, None)
+        if self.current is None or self.current[0] != identifier:
+            return []
+        rv = list(self.current[1])
+        self.current = next(self.groups, None)
+        return rv
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+
+"""Column-wise validation of the CONSO resources.
+
+Instead of checking the terms and synonyms tables line by line, each rule is applied to a whole column (or to
+the raw bytes of the file) at once and reports the line numbers of the offending rows. Line numbers are
+1-indexed and count the header, so they can be used directly in messages to curators.
+"""
+
+import csv
+import io
+from typing import Collection, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .resources.constants import (
+    CONSO_IDENTIFIER, CURATOR_COLUMN, DESCRIPTION_COLUMN, IDENTIFIER_COLUMN, NAME_COLUMN, NUMBER_SYNONYM_COLUMNS,
+    NUMBER_TERM_COLUMNS, REFERENCES_COLUMN, TYPE_COLUMN, WITHDRAWN_COLUMN,
+)
+
+__all__ = [
+    'Table',
+    'read_table',
+    'validate_terms',
+    'validate_synonyms',
+    'get_term_messages',
+    'get_synonym_messages',
+    'TERM_RULES',
+    'SYNONYM_RULES',
+]
+
+TAB = ord('\t')
+NEWLINE = ord('\n')
+SPACE = ord(' ')
+#: ASCII white space that can appear inside of a field (tabs and newlines are delimiters)
+FIELD_WHITESPACE = [SPACE, ord('\v'), ord('\f')]
+
+#: Names are only required to be ASCII after this line, since the rule was introduced later
+ASCII_NAME_START = 346
+
+#: The rules applied by :func:`validate_terms`, in the order they're evaluated. Rules marked
+#: as blocking exclude the offending rows from all subsequent rules.
+TERM_RULES: List[Tuple[str, bool]] = [
+    ('trailing_whitespace', False),
+    ('extra_whitespace', False),
+    ('invalid_identifier', True),
+    ('broken_indexing', True),
+    ('non_ascii_name', False),
+    ('invalid_curator', False),
+    ('not_enough_fields', True),
+    ('too_many_fields', True),
+    ('malformed_withdrawn', True),
+    ('withdrawn', True),
+    ('missing_entries', True),
+    ('invalid_class', True),
+    ('malformed_references', True),
+    ('invalid_reference_prefix', True),
+    ('double_quote', True),
+]
+_BLOCKING = dict(TERM_RULES)
+
+#: The rules applied by :func:`validate_synonyms`, in the order they're evaluated. Rules marked
+#: as blocking exclude the offending rows from all subsequent rules.
+SYNONYM_RULES: List[Tuple[str, bool]] = [
+    ('trailing_whitespace', False),
+    ('wrong_number_fields', True),
+    ('missing_entries', True),
+    ('invalid_identifier', True),
+    ('not_monotonic', False),
+    ('invalid_specificity', False),
+]
+_SYNONYM_BLOCKING = dict(SYNONYM_RULES)
+
+
+class Table(NamedTuple):
+    """A TSV file prepared for column-wise validation."""
+
+    #: The path to the file
+    path: str
+    #: The raw bytes of the file
+    buffer: np.ndarray
+    #: The offset of the first byte of each line
+    starts: np.ndarray
+    #: The offset of the newline ending each line
+    ends: np.ndarray
+    #: The offset of each tab in the file
+    tabs: np.ndarray
+    #: The fields of each non-empty line after the header, indexed by line number. Missing fields are empty.
+    fields: pd.DataFrame
+    #: The number of fields on each non-empty line after the header, indexed by line number
+    n_fields: pd.Series
+
+    def get_line(self, i: int) -> List[str]:
+        """Get the fields on the given line."""
+        return list(self.fields.loc[i, :self.n_fields[i] - 1])
+
+    def get_lines(self, offsets: np.ndarray) -> np.ndarray:
+        """Get the unique line numbers containing the given byte offsets."""
+        return np.unique(np.searchsorted(self.ends, offsets) + 1)
+
+    def get_columns(self, offsets: np.ndarray) -> np.ndarray:
+        """Get the 0-indexed column containing each of the given byte offsets."""
+        starts = self.starts[np.searchsorted(self.ends, offsets)]
+        return np.searchsorted(self.tabs, offsets) - np.searchsorted(self.tabs, starts)
+
+
+def read_table(path: str, content: Optional[bytes] = None) -> Table:
+    """Read a TSV without type inference, keeping ragged lines.
+
+    :param path: The path to the file, which is also used in messages
+    :param content: The content of the file, if it was already read
+    """
+    if content is None:
+        with open(path, 'rb') as file:
+            content = file.read()
+    buffer = np.frombuffer(content, dtype=np.uint8)
+
+    ends = np.flatnonzero(buffer == NEWLINE)
+    if len(buffer) and buffer[-1] != NEWLINE:
+        ends = np.append(ends, len(buffer))
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    tabs = np.flatnonzero(buffer == TAB)
+
+    n_fields = np.searchsorted(tabs, ends) - np.searchsorted(tabs, starts) + 1
+    line_numbers = np.arange(1, len(ends) + 1)
+    non_empty = (starts != ends)[1:]  # skip the header
+
+    fields = pd.read_csv(
+        io.BytesIO(content),
+        sep='\t',
+        header=None,
+        skiprows=1,
+        names=range(max(NUMBER_TERM_COLUMNS, n_fields.max(initial=0))),
+        dtype=str,
+        keep_default_na=False,
+        na_values=[],
+        quoting=csv.QUOTE_NONE,
+        skip_blank_lines=False,
+    )
+    fields.index = line_numbers[1:len(fields) + 1]
+    fields = fields[non_empty[:len(fields)]]
+
+    return Table(
+        path=path,
+        buffer=buffer,
+        starts=starts,
+        ends=ends,
+        tabs=tabs,
+        fields=fields,
+        n_fields=pd.Series(n_fields[1:], index=line_numbers[1:])[non_empty],
+    )
+
+
+def _get_whitespace_lines(table: Table) -> Tuple[np.ndarray, np.ndarray]:
+    """Find lines with trailing white space and lines with white space around any field."""
+    buffer = table.buffer
+    offsets = np.flatnonzero(np.isin(buffer, FIELD_WHITESPACE))
+    before = np.full(len(offsets), NEWLINE, dtype=np.uint8)
+    before[offsets > 0] = buffer[offsets[offsets > 0] - 1]
+    after = np.full(len(offsets), NEWLINE, dtype=np.uint8)
+    after[offsets < len(buffer) - 1] = buffer[offsets[offsets < len(buffer) - 1] + 1]
+
+    trailing = table.get_lines(offsets[(buffer[offsets] == SPACE) & (after == NEWLINE)])
+    extra = table.get_lines(offsets[np.isin(before, [TAB, NEWLINE]) | np.isin(after, [TAB, NEWLINE])])
+
+    # Unicode white space is rare, so only lines that have any non-ASCII bytes get the slow check
+    unicode_lines = np.setdiff1d(table.get_lines(np.flatnonzero(buffer >= 0x80)), extra)
+    extra_unicode = [
+        i
+        for i in unicode_lines
+        if i in table.n_fields.index and any(column != column.strip() for column in table.get_line(i))
+    ]
+    return trailing, np.union1d(extra, extra_unicode)
+
+
+def _get_non_ascii_lines(table: Table, column: int) -> np.ndarray:
+    offsets = np.flatnonzero(table.buffer >= 0x80)
+    return table.get_lines(offsets[table.get_columns(offsets) == column])
+
+
+def _invalid_references(references: pd.Series, valid_sources: Collection[str]) -> Tuple[pd.Index, pd.Index]:
+    """Find rows whose references aren't all ``prefix:identifier`` pairs, and those with invalid prefixes."""
+    exploded = references.str.split(',').explode().str.strip()
+    n_parts = exploded.str.count(':') + 1
+    malformed = exploded.index[n_parts != 2].unique()
+    prefixes = exploded.str.split(':', n=1).str[0]
+    invalid = exploded.index[~prefixes.isin(valid_sources)].unique()
+    return malformed, invalid
+
+
+def validate_terms(
+    table: Table,
+    *,
+    classes: Collection[str],
+    authors: Collection[str],
+    valid_sources: Collection[str],
+) -> Dict[str, np.ndarray]:
+    """Apply the rules in :data:`TERM_RULES` column-wise over the terms table.
+
+    :param table: The terms table, as returned by :func:`read_table`
+    :param classes: The valid classes
+    :param authors: The valid curators' ORCID identifiers
+    :param valid_sources: The valid prefixes for references
+    :returns: A mapping from each rule's name to the sorted line numbers that violate it. The line
+        numbers under ``valid`` passed all rules.
+    """
+    fields = table.fields
+    line_numbers = fields.index.to_series()
+    rv: Dict[str, pd.Index] = {}
+    alive = pd.Series(True, index=fields.index)
+
+    def _flag(rule: str, mask: pd.Series) -> None:
+        mask = mask.eq(True) & alive
+        rv[rule] = mask.index[mask]
+        if _BLOCKING[rule]:
+            alive[mask] = False
+
+    trailing, extra = _get_whitespace_lines(table)
+    _flag('trailing_whitespace', line_numbers.isin(trailing))
+    _flag('extra_whitespace', line_numbers.isin(extra))
+
+    numbers = fields[IDENTIFIER_COLUMN].str.extract(CONSO_IDENTIFIER, expand=False)
+    _flag('invalid_identifier', numbers.isna())
+    _flag('broken_indexing', pd.to_numeric(numbers, errors='coerce') != line_numbers - 1)
+
+    non_ascii = _get_non_ascii_lines(table, NAME_COLUMN)
+    _flag('non_ascii_name', (line_numbers > ASCII_NAME_START) & line_numbers.isin(non_ascii))
+    _flag('invalid_curator', ~fields[CURATOR_COLUMN].isin(authors))
+    _flag('not_enough_fields', table.n_fields < NUMBER_TERM_COLUMNS)
+    _flag('too_many_fields', table.n_fields > NUMBER_TERM_COLUMNS)
+
+    withdrawn = fields[WITHDRAWN_COLUMN] == 'WITHDRAWN'
+    placeholders = (fields[list(range(WITHDRAWN_COLUMN + 1, NUMBER_TERM_COLUMNS))] == '.').all(axis=1)
+    _flag('malformed_withdrawn', withdrawn & ~placeholders)
+    _flag('withdrawn', withdrawn)
+
+    _flag('missing_entries', (fields[list(range(NUMBER_TERM_COLUMNS))] == '').any(axis=1))
+    _flag('invalid_class', ~fields[TYPE_COLUMN].isin(classes))
+
+    malformed, invalid = _invalid_references(fields.loc[alive, REFERENCES_COLUMN], valid_sources)
+    _flag('malformed_references', line_numbers.isin(malformed))
+    _flag('invalid_reference_prefix', line_numbers.isin(invalid))
+
+    _flag('double_quote', fields[DESCRIPTION_COLUMN].str.contains('"', regex=False))
+
+    rv['valid'] = alive.index[alive]
+    return {key: value.to_numpy() for key, value in rv.items()}
+
+
+def validate_synonyms(
+    table: Table,
+    *,
+    identifiers: Collection[str],
+    valid_synonym_types: Collection[str],
+) -> Dict[str, np.ndarray]:
+    """Apply the rules in :data:`SYNONYM_RULES` column-wise over the synonyms table.
+
+    :param table: The synonyms table, as returned by :func:`read_table`
+    :param identifiers: The valid CONSO identifiers
+    :param valid_synonym_types: The valid specificities
+    :returns: A mapping from each rule's name to the sorted line numbers that violate it
+    """
+    fields = table.fields
+    line_numbers = fields.index.to_series()
+    rv: Dict[str, pd.Index] = {}
+    alive = pd.Series(True, index=fields.index)
+
+    def _flag(rule: str, mask: pd.Series) -> None:
+        mask = mask.eq(True) & alive
+        rv[rule] = mask.index[mask]
+        if _SYNONYM_BLOCKING[rule]:
+            alive[mask] = False
+
+    trailing, _ = _get_whitespace_lines(table)
+    _flag('trailing_whitespace', line_numbers.isin(trailing))
+    _flag('wrong_number_fields', table.n_fields != NUMBER_SYNONYM_COLUMNS)
+    _flag('missing_entries', (fields[list(range(NUMBER_SYNONYM_COLUMNS))] == '').any(axis=1))
+    _flag('invalid_identifier', ~fields[0].isin(identifiers))
+
+    numbers = pd.to_numeric(fields.loc[alive, 0].str.extract(CONSO_IDENTIFIER, expand=False))
+    _flag('not_monotonic', line_numbers.isin(numbers.index[numbers < numbers.cummax()]))
+    _flag('invalid_specificity', ~fields[3].isin(valid_synonym_types))
+
+    return {key: value.to_numpy() for key, value in rv.items()}
+
+
+def get_synonym_messages(table: Table, results: Mapping[str, np.ndarray]) -> List[Tuple[int, str]]:
+    """Get the human-readable failure messages for the results of :func:`validate_synonyms`, ordered by line."""
+    rv = [
+        (i, _format_synonym_message(table.path, rule, i, table.get_line(i)))
+        for rule, _ in SYNONYM_RULES
+        for i in results[rule]
+    ]
+    return sorted(rv, key=lambda pair: pair[0])
+
+
+def get_term_messages(table: Table, results: Mapping[str, np.ndarray]) -> List[Tuple[int, str]]:
+    """Get the human-readable failure messages for the results of :func:`validate_terms`, ordered by line."""
+    rv = [
+        (i, _format_message(table.path, rule, i, table.get_line(i)))
+        for rule, _ in TERM_RULES
+        if rule != 'withdrawn'
+        for i in results[rule]
+    ]
+    return sorted(rv, key=lambda pair: pair[0])
+
+
+def _format_message(path: str, rule: str, i: int, line: List[str]) -> str:  # noqa: C901
+    if rule == 'trailing_whitespace':
+        return f'{path}: Trailing whitespace on line {i}'
+    if rule == 'extra_whitespace':
+        return '\n'.join(
+            f'{path}, line {i}, column {column_number}: Extra white space: {column}'
+            for column_number, column in enumerate(line, start=1)
+            if column != column.strip()
+        )
+    if rule == 'invalid_identifier':
+        return f'{path}, line {i}: Invalid identifier chosen: {line}'
+    if rule == 'broken_indexing':
+        return f'{path}, line {i}: Indexing scheme broken: {line[IDENTIFIER_COLUMN]}'
+    if rule == 'non_ascii_name':
+        return f'{path}, line {i}: Name contains non-ascii: {line[NAME_COLUMN]}'
+    if rule == 'invalid_curator':
+        return f'{path}, line {i}: Invalid curator: {line[CURATOR_COLUMN]}'
+    if rule == 'not_enough_fields':
+        return f'{path}, line {i}: Not enough fields (only found {len(line)}/{NUMBER_TERM_COLUMNS}): {line}'
+    if rule == 'too_many_fields':
+        return f'{path}, line {i}: Too many fields (found {len(line)}/{NUMBER_TERM_COLUMNS}): {line}'
+    if rule == 'malformed_withdrawn':
+        return f'{path}: Wrong formatting for withdrawn term line {i}: Use periods as placeholders.'
+    if rule == 'missing_entries':
+        return f'{path}, line {i}: Missing entries: {line}'
+    if rule == 'invalid_class':
+        return f'{path}, line {i}: Invalid class: {line[TYPE_COLUMN]}.'
+    if rule == 'malformed_references':
+        return f'{path}, line {i}: problematic references: {line[REFERENCES_COLUMN]}'
+    if rule == 'invalid_reference_prefix':
+        return (
+            f'{path}, line {i} : invalid reference type '
+            f'(note: always use lowercase pubmed, pmc, etc.): {line[REFERENCES_COLUMN]}'
+        )
+    if rule == 'double_quote':
+        return f'{path}, line {i}: can not use double quote in description column'
+    raise ValueError(f'unhandled rule: {rule}')
+
+
+def _format_synonym_message(path: str, rule: str, i: int, line: List[str]) -> str:
+    if rule == 'trailing_whitespace':
+        return f'{path}: Trailing whitespace on line {i}'
+    if rule == 'wrong_number_fields':
+        return f'{path}: Not the right number fields (found {len(line)}) on line {i}: {line}'
+    if rule == 'missing_entries':
+        return f'{path}: Missing entries on line {i}: {line}'
+    if rule == 'invalid_identifier':
+        return f'{path}: Invalid identifier on line {i}: {line[0]}'
+    if rule == 'not_monotonic':
+        return f'{path}: Not monotonic increasing on line {i}: {line[0]}'
+    if rule == 'invalid_specificity':
+        return f'{path}: Invalid specificity on line {i}: {line[3]}'
+    raise ValueError(f'unhandled rule: {rule}')
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+
+"""Watch the CONSO resources and re-run the checks and exports as they're edited.
+
+The content and the parsed rows of every table are kept in memory, and when one of the resource files is
+saved, only that file is read and parsed again. Only the checks from :mod:`conso.check` that depend on it are
+run, and if they pass, only the exports that depend on it are regenerated. The checks and exports are given
+the tables from memory instead of reading the files. (Only the source hashes in the export manifest are still
+computed from the files.) For the HTML export, only the pages of the terms whose rows changed are rewritten,
+along with the index.
+"""
+
+import csv
+import io
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+import click
+
+from . import check as checks
+from .export.manifest import SOURCES as EXPORT_SOURCES
+from .resources import (
+    AUTHORS_PATH, CLASSES_PATH, HERE as RESOURCES_DIRECTORY, RELATIONS_PATH, RULES_PATH, SYNONYMS_PATH,
+    TERMS_PATH, TYPEDEF_PATH, XREFS_PATH,
+)
+from .resources.constants import CONSO
+from .utils import read_lines
+from .validate import Table, read_table
+
+__all__ = [
+    'Model',
+    'watch',
+]
+
+
+#: The watched tables and their paths
+TABLE_PATHS: Mapping[str, str] = {
+    'authors': AUTHORS_PATH,
+    'classes': CLASSES_PATH,
+    'typedefs': TYPEDEF_PATH,
+    'terms': TERMS_PATH,
+    'synonyms': SYNONYMS_PATH,
+    'xrefs': XREFS_PATH,
+    'relations': RELATIONS_PATH,
+    'rules': RULES_PATH,
+}
+_PATH_TO_TABLE = {os.path.basename(path): table for table, path in TABLE_PATHS.items()}
+
+#: The :mod:`watchdog` events that mean a file's content might have changed. Others, like files being
+#: opened for reading by the checks themselves, are ignored.
+CHANGE_EVENTS = {'modified', 'created', 'moved', 'closed'}
+
+#: The tables that the identifier to name mapping used by the other checks is built from
+TERM_TABLES = {'authors', 'classes', 'terms'}
+
+#: The checks from :mod:`conso.check` that depend on each table, besides the checks of the terms themselves
+#: (which depend on :data:`TERM_TABLES`). Checks run in the same order as in :func:`conso.check.check`.
+CHECKS: List[Tuple[str, Set[str]]] = [
+    ('synonyms', {'terms', 'synonyms'}),
+    ('synonym_collisions', {'terms', 'synonyms'}),
+    ('xrefs', {'terms', 'xrefs'}),
+    ('relations_graph', {'terms', 'typedefs', 'relations'}),
+    ('relations', {'terms', 'relations'}),
+    ('xrefs_external', {'xrefs'}),
+    ('bel_xrefs', {'xrefs'}),
+    ('rules', {'terms', 'xrefs', 'relations', 'rules'}),
+]
+
+#: The tables that each of the regenerated exports in ``export/`` depend on
+EXPORTS: Mapping[str, Set[str]] = {
+    name: {_PATH_TO_TABLE[os.path.basename(path)] for path in EXPORT_SOURCES[name]}
+    for name in ('belns', 'obo', 'owl')
+}
+
+#: The tables the HTML export depends on, with the columns holding the CONSO identifiers of each row
+HTML_IDENTIFIER_COLUMNS: Mapping[str, List[int]] = {
+    'terms': [0],
+    'synonyms': [0],
+    'xrefs': [0],
+    'relations': [1, 5],
+}
+
+
+class Model:
+    """The resource tables, kept in memory between changes."""
+
+    def __init__(self):
+        """Read all of the tables."""
+        #: The content of each table's file
+        self.contents: Dict[str, bytes] = {}
+        #: The rows of each table after the header, as used by the checks and exports
+        self.tables: Dict[str, List[List[str]]] = {}
+        for table in TABLE_PATHS:
+            self._read(table)
+        self.identifier_to_name: Optional[Mapping[str, str]] = None
+
+    def _read(self, table: str) -> None:
+        with open(TABLE_PATHS[table], 'rb') as file:
+            content = file.read()
+        self.tables[table] = read_lines(io.StringIO(content.decode('utf-8'), newline=''))
+        self.contents[table] = content
+
+    def get_table(self, table: str) -> Table:
+        """Prepare a table for the column-wise validation from its content in memory."""
+        return read_table(TABLE_PATHS[table], content=self.contents[table])
+
+    def reload(self, table: str) -> Set[str]:
+        """Read a table again after it was changed.
+
+        :returns: The CONSO identifiers in the rows that were added or removed, if the table is used by
+            the HTML export
+        """
+        old = self.tables[table]
+        try:
+            self._read(table)
+        except (csv.Error, UnicodeDecodeError) as e:
+            click.secho(f'could not read {TABLE_PATHS[table]}: {e}', fg='red')
+            return set()
+        if table in TERM_TABLES:
+            self.identifier_to_name = None
+
+        columns = HTML_IDENTIFIER_COLUMNS.get(table)
+        if columns is None:
+            return set()
+        changed = set(map(tuple, old)) ^ set(map(tuple, self.tables[table]))
+        return {
+            row[i]
+            for row in changed
+            for i in columns
+            if i < len(row) and row[i].startswith(CONSO)
+        }
+
+    def get_identifier_to_name(self) -> Mapping[str, str]:
+        """Get the mapping from identifiers to names, validating the terms if they changed."""
+        if self.identifier_to_name is None:
+            self.identifier_to_name = checks.get_identifier_to_name(
+                classes=checks.get_types(self.tables),
+                authors=checks.get_authors(self.tables),
+                table=self.get_table('terms'),
+            )
+        return self.identifier_to_name
+
+    def run_checks(self, tables: Set[str]) -> bool:
+        """Run the checks that depend on the changed tables.
+
+        :returns: If all of the checks passed
+        """
+        functions: Mapping[str, Callable[[], object]] = {
+            'synonyms': lambda: checks.check_synonyms_file(
+                identifier_to_name=self.get_identifier_to_name(),
+                table=self.get_table('synonyms'),
+            ),
+            'synonym_collisions': lambda: checks.check_synonym_collisions(self.tables),
+            'xrefs': lambda: checks.check_xrefs_file(
+                identifier_to_name=self.get_identifier_to_name(),
+                tables=self.tables,
+            ),
+            'relations_graph': lambda: checks.check_relations_graph(self.tables),
+            'relations': lambda: checks.check_relations_file(
+                identifier_to_name=self.get_identifier_to_name(),
+                tables=self.tables,
+            ),
+            'xrefs_external': lambda: checks.check_xrefs_external(self.tables),
+            'bel_xrefs': lambda: checks.check_bel_xrefs(self.tables),
+            'rules': lambda: checks.check_rules(self.tables),
+        }
+        try:
+            if tables & TERM_TABLES:
+                self.get_identifier_to_name()
+            for name, dependencies in CHECKS:
+                if tables & dependencies:
+                    functions[name]()
+        except (Exception, SystemExit) as e:
+            if not isinstance(e, SystemExit):
+                click.secho(str(e), fg='red')
+            self.identifier_to_name = None
+            return False
+        return True
+
+
+def _export(model: Model, tables: Set[str], directory: str) -> None:
+    from .export.belns import write_belns
+    from .export.obo import write_obo
+    from .export.owl import write_owl
+
+    functions: Mapping[str, Callable[[], object]] = {
+        'belns': lambda: write_belns(directory, tables=model.tables),
+        'obo': lambda: write_obo(os.path.join(directory, 'conso.obo'), tables=model.tables),
+        'owl': lambda: write_owl(os.path.join(directory, 'conso.owl'), tables=model.tables),
+    }
+    for name, dependencies in EXPORTS.items():
+        if not tables & dependencies:
+            continue
+        try:
+            functions[name]()
+        except Exception as e:
+            click.secho(f'could not export {name}: {e}', fg='red')
+        else:
+            click.echo(f'exported {name}')
+
+
+def _export_html(model: Model, tables: Set[str], identifiers: Set[str], directory: str) -> None:
+    from .export.html.html import (
+        TABLE_PATHS as HTML_TABLE_PATHS, get_html_data, read_table as read_html_table, write_index,
+        write_term_pages,
+    )
+
+    if not tables & set(HTML_TABLE_PATHS):
+        return
+    data = get_html_data({table: read_html_table(table, model.contents[table]) for table in HTML_TABLE_PATHS})
+    write_index(directory, data)
+    # A change to the authors changes the author names on every page
+    write_term_pages(directory, data, identifiers=None if 'authors' in tables else identifiers)
+    click.echo(f'exported html ({"all" if "authors" in tables else len(identifiers)} term pages)')
+
+
+class _Handler:
+    """Collects the names of the changed tables from :mod:`watchdog` events."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: Set[str] = set()
+        self.last_event = 0.0
+
+    def dispatch(self, event) -> None:
+        for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+            table = _PATH_TO_TABLE.get(os.path.basename(path or ''))
+            if table is not None and not event.is_directory and event.event_type in CHANGE_EVENTS:
+                with self.lock:
+                    self.pending.add(table)
+                    self.last_event = time.monotonic()
+
+    def pop(self, debounce: float) -> Set[str]:
+        with self.lock:
+            if not self.pending or time.monotonic() - self.last_event < debounce:
+                return set()
+            rv, self.pending = self.pending, set()
+            return rv
+
+
+@click.command()
+@click.option('--export-directory', type=click.Path(file_okay=False),
+              help='Regenerate the BELNS, OBO, and OWL exports in this directory')
+@click.option('--html-directory', type=click.Path(file_okay=False), help='Regenerate the HTML export in this directory')
+@click.option('--debounce', type=float, default=0.2, show_default=True,
+              help='Seconds to wait for more changes after a file is saved')
+def watch(export_directory: Optional[str], html_directory: Optional[str], debounce: float):
+    """Watch the resources and re-run the affected checks and exports on every change."""
+    from watchdog.observers import Observer
+
+    model = Model()
+    if model.run_checks(set(TABLE_PATHS)):
+        click.secho('all checks passed', fg='green')
+
+    handler = _Handler()
+    observer = Observer()
+    observer.schedule(handler, RESOURCES_DIRECTORY)
+    observer.start()
+    click.echo(f'watching {RESOURCES_DIRECTORY}')
+    # Changes are kept until the checks pass, so the ones saved while they're failing are exported later
+    pending_tables: Set[str] = set()
+    pending_identifiers: Set[str] = set()
+    try:
+        while True:
+            time.sleep(debounce / 2)
+            tables = handler.pop(debounce)
+            if not tables:
+                continue
+
+            start = time.perf_counter()
+            click.echo(f'changed: {", ".join(sorted(tables))}')
+            for table in tables:
+                pending_identifiers |= model.reload(table)
+            pending_tables |= tables
+            if not model.run_checks(pending_tables):
+                click.secho('checks failed, skipping exports', fg='red')
+                continue
+            if export_directory:
+                _export(model, pending_tables, export_directory)
+            if html_directory:
+                _export_html(model, pending_tables, pending_identifiers, html_directory)
+            pending_tables, pending_identifiers = set(), set()
+            click.secho(f'done in {time.perf_counter() - start:.2f}s', fg='green')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observer.stop()
+        observer.join()
+
+
+if __name__ == '__main__':
+    watch()